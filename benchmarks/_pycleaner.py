@@ -0,0 +1,13 @@
+"""Carga py-cleaner.py como módulo para los benchmarks (el nombre con guion no es importable)."""
+import importlib.util
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_pycleaner():
+    """Importa py-cleaner.py y devuelve el módulo."""
+    spec = importlib.util.spec_from_file_location("pycleaner", os.path.join(ROOT, "py-cleaner.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,78 @@
+"""Benchmark: limpieza de bytecode con recorrido paralelo vs un solo hilo.
+
+Genera un árbol sintético con módulos, __pycache__ de la versión actual y de otra,
+.pyc huérfanos y paquetes borrados de los que solo queda el __pycache__; mide la
+simulación con 1 hilo y con el pool, y comprueba que ambos cuentan lo mismo, que la
+vista previa del modo 'obsoleto' coincide con lo que borra y que conserva el bytecode
+válido.
+
+Uso:
+    python benchmarks/bench_bytecode.py [--dirs 2000] [--modules 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from _pycleaner import load_pycleaner
+
+
+def build_tree(root: str, dirs: int, modules: int) -> None:
+    """Crea `dirs` paquetes con `modules` módulos, su bytecode y restos obsoletos."""
+    tag = sys.implementation.cache_tag
+    for i in range(dirs):
+        package = os.path.join(root, f"pkg_{i // 100:03d}", f"sub_{i:05d}")
+        cache = os.path.join(package, "__pycache__")
+        os.makedirs(cache)
+        for j in range(modules):
+            with open(os.path.join(package, f"mod_{j}.py"), "w", encoding="utf-8") as f:
+                f.write("VALUE = 1\n")
+            for name in (f"mod_{j}.{tag}.pyc", f"mod_{j}.cpython-27.pyc"):
+                with open(os.path.join(cache, name), "wb") as f:
+                    f.write(b"\0" * 256)
+        with open(os.path.join(cache, f"deleted.{tag}.pyc"), "wb") as f:
+            f.write(b"\0" * 256)
+        if i % 10 == 0:
+            # Subpaquete borrado: su __pycache__ queda vacío y debe eliminarse
+            orphan_cache = os.path.join(package, "gone", "__pycache__")
+            os.makedirs(orphan_cache)
+            with open(os.path.join(orphan_cache, f"old.{tag}.pyc"), "wb") as f:
+                f.write(b"\0" * 256)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dirs", type=int, default=2000)
+    parser.add_argument("--modules", type=int, default=5)
+    args = parser.parse_args()
+
+    pycleaner = load_pycleaner()
+    tag = sys.implementation.cache_tag
+    with tempfile.TemporaryDirectory() as tmp:
+        build_tree(tmp, args.dirs, args.modules)
+
+        results = {}
+        for label, workers in (("1 hilo", 1), (f"{pycleaner.WALK_WORKERS} hilos", pycleaner.WALK_WORKERS)):
+            start = time.perf_counter()
+            results[label] = pycleaner.clean_bytecode([tmp], tag, dry_run=True, workers=workers)
+            print(f"{label:>10}: {time.perf_counter() - start:7.2f}s  archivos={results[label]['files']} "
+                  f"dirs={results[label]['dirs']} bytes={results[label]['bytes']}")
+
+        orphans = len(range(0, args.dirs, 10))
+        preview = pycleaner.clean_bytecode([tmp], tag, dry_run=True, stale_only=True)
+        stale = pycleaner.clean_bytecode([tmp], tag, dry_run=False, stale_only=True)
+        expected_stale = args.dirs * (args.modules + 1) + orphans
+        remaining = pycleaner.clean_bytecode([tmp], tag, dry_run=True)
+        print(f"obsoletos: vista previa {preview['files']} archivos/{preview['dirs']} dirs, "
+              f"eliminados {stale['files']}/{stale['dirs']} (esperados {expected_stale}/{orphans}), "
+              f"válidos restantes={remaining['files']} (esperados {args.dirs * args.modules})")
+
+        counts = {(r["files"], r["dirs"]) for r in results.values()}
+        ok = (len(counts) == 1 and (preview["files"], preview["dirs"]) == (stale["files"], stale["dirs"])
+              == (expected_stale, orphans) and remaining["files"] == args.dirs * args.modules)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Benchmark: ejecución de comandos como la consola embebida (salida en streaming).
+
+Lanza los comandos con las mismas opciones que TrueEmbeddedConsole._start_command
+(sin timeout, sin plaza del semáforo, PYTHONUNBUFFERED) y comprueba:
+  - que la primera línea llega antes de que el proceso termine,
+  - que una única línea muy larga (como `pip list --format=json` en un entorno grande)
+    llega entera y sin matar el proceso,
+  - que cancelar el future mata el proceso.
+Sale con 1 si alguna comprobación falla.
+
+Uso:
+    python benchmarks/bench_console_stream.py [--json-packages 20000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from _pycleaner import load_pycleaner
+
+
+def console_run(pycleaner, code: str, lines: list):
+    """Lanza `python -c code` como lo hace la consola y devuelve el future."""
+    def on_stdout(line):
+        if line.strip():
+            lines.append((time.perf_counter(), line))
+    return pycleaner.subprocess_runner.submit([sys.executable, "-c", code], on_stdout=on_stdout, limit=False,
+                                              env=dict(os.environ, PYTHONUNBUFFERED="1"))
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json-packages", type=int, default=20_000)
+    args = parser.parse_args()
+
+    pycleaner = load_pycleaner()
+    failures = 0
+
+    lines = []
+    start = time.perf_counter()
+    result = console_run(pycleaner, "import time\nprint('uno')\ntime.sleep(0.5)\nprint('dos')", lines).result()
+    first = lines[0][0] - start if lines else float("inf")
+    ok = result.returncode == 0 and first < 0.4 and [line for _, line in lines] == ["uno", "dos"]
+    failures += not ok
+    print(f"streaming:      primera línea a los {first * 1000:.0f}ms de un proceso de "
+          f"{(time.perf_counter() - start) * 1000:.0f}ms  {'ok' if ok else 'FALLO'}")
+
+    lines = []
+    code = ("import json\nprint(json.dumps([{'name': f'paquete-{i}', 'version': '1.0.0'} "
+            f"for i in range({args.json_packages})]))")
+    start = time.perf_counter()
+    try:
+        result = console_run(pycleaner, code, lines).result()
+        packages = json.loads(lines[0][1]) if len(lines) == 1 else []
+        ok = result.returncode == 0 and len(packages) == args.json_packages
+        detail = f"{len(lines[0][1]) if lines else 0:,} caracteres en {len(lines)} línea(s)"
+    except Exception as e:
+        ok, detail = False, f"{type(e).__name__}: {e}"
+    failures += not ok
+    print(f"línea larga:    {detail} en {(time.perf_counter() - start) * 1000:.0f}ms  {'ok' if ok else 'FALLO'}")
+
+    lines = []
+    future = console_run(pycleaner, "import os, time\nprint(os.getpid())\ntime.sleep(30)", lines)
+    while not lines:
+        time.sleep(0.01)
+    pid = int(lines[0][1])
+    start = time.perf_counter()
+    future.cancel()
+    while pid_alive(pid) and time.perf_counter() - start < 2:
+        time.sleep(0.01)
+    ok = future.cancelled() and not pid_alive(pid)
+    failures += not ok
+    print(f"cancelación:    proceso terminado en {(time.perf_counter() - start) * 1000:.0f}ms  {'ok' if ok else 'FALLO'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Benchmark: construcción del grafo de dependencias a partir de Requires-Dist.
+
+Genera un site-packages sintético con N distribuciones cuyas dependencias incluyen
+marcadores de entorno, extras y algún ciclo, y mide la construcción del grafo en
+frío (escaneo + grafo) y en caliente (solo grafo). Falla si la construcción en
+caliente supera el presupuesto indicado.
+
+Uso:
+    python benchmarks/bench_dependency_graph.py [--packages 2000] [--budget-ms 1000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from _pycleaner import load_pycleaner
+
+
+def build_fake_site_packages(root: str, count: int) -> str:
+    """Crea `count` distribuciones con entre 0 y 6 dependencias cada una."""
+    site_packages = os.path.join(root, "site-packages")
+    os.makedirs(site_packages)
+    for i in range(count):
+        name = f"graph_pkg_{i:05d}"
+        requires = [f"graph_pkg_{(i * 7 + k) % count:05d}>=1.0" for k in range(1, i % 5 + 1)]
+        requires.append(f'graph_pkg_{(i + 1) % count:05d}; python_version < "3.0"')
+        requires.append(f'graph_pkg_{(i + 3) % count:05d}[extra]; sys_platform == "{sys.platform}"')
+        requires.append(f'graph_pkg_{(i + 11) % count:05d}; extra == "extra"')
+        info_dir = os.path.join(site_packages, f"{name}-1.0.dist-info")
+        os.makedirs(info_dir)
+        with open(os.path.join(info_dir, "METADATA"), "w", encoding="utf-8") as f:
+            f.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\nProvides-Extra: extra\n")
+            f.write("".join(f"Requires-Dist: {requirement}\n" for requirement in requires))
+            f.write("\n")
+    return site_packages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packages", type=int, default=2000)
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    pycleaner = load_pycleaner()
+    with tempfile.TemporaryDirectory() as tmp:
+        site_packages = build_fake_site_packages(tmp, args.packages)
+
+        start = time.perf_counter()
+        inventory = pycleaner.PackageInventory(sys.executable, paths=[site_packages]).load()
+        graph = pycleaner.DependencyGraph.from_inventory(inventory)
+        cold = time.perf_counter() - start
+
+        warm = float("inf")
+        for _ in range(3):
+            pycleaner._marker_parse_cache.clear()
+            start = time.perf_counter()
+            graph = pycleaner.DependencyGraph.from_inventory(inventory)
+            graph.topological_order()
+            graph.find_cycles()
+            warm = min(warm, time.perf_counter() - start)
+
+    print(f"paquetes={len(graph.nodes)} aristas={graph.edge_count()} ciclos={len(graph.find_cycles())}")
+    print(f"en frío (escaneo + grafo): {cold * 1000:8.1f} ms")
+    print(f"en caliente (grafo + orden): {warm * 1000:8.1f} ms  (presupuesto {args.budget_ms:.0f} ms)")
+    return 0 if warm * 1000 <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Benchmark: reporte .txt → diff contra el mismo entorno (debe salir sin diferencias).
+
+Crea un venv sin pip con `--packages` distribuciones normales y las que 'pip freeze'
+escribe de forma especial (editable sin VCS, instalación desde URL y versión legacy
+con '==='), genera `report --venv` y compara el .txt con el entorno en vivo en ambos
+sentidos. Sale con 1 si `diff` no devuelve 0 o si un cambio real no se detecta.
+
+Uso:
+    python benchmarks/bench_diff_roundtrip.py [--packages 500]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "py-cleaner.py")
+
+
+def add_distribution(site_packages: str, name: str, version: str, direct_url: dict = None) -> str:
+    """Crea una distribución *.dist-info mínima y devuelve su directorio."""
+    info_dir = os.path.join(site_packages, f"{name}-{version}.dist-info")
+    os.makedirs(info_dir)
+    with open(os.path.join(info_dir, "METADATA"), "w", encoding="utf-8") as f:
+        f.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n\n")
+    with open(os.path.join(info_dir, "INSTALLER"), "w", encoding="utf-8") as f:
+        f.write("pip\n")
+    with open(os.path.join(info_dir, "RECORD"), "w", encoding="utf-8") as f:
+        f.write(f"{name}-{version}.dist-info/METADATA,,\n")
+    if direct_url:
+        with open(os.path.join(info_dir, "direct_url.json"), "w", encoding="utf-8") as f:
+            json.dump(direct_url, f)
+    return info_dir
+
+
+def py_cleaner(*args: str, env: dict) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, SCRIPT, *args], env=env, stdin=subprocess.DEVNULL,
+                          capture_output=True, text=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packages", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, XDG_CACHE_HOME=os.path.join(tmp, "cache"))
+        venv = os.path.join(tmp, "venv")
+        subprocess.run([sys.executable, "-m", "venv", "--without-pip", venv], check=True)
+        python = os.path.join(venv, "Scripts", "python.exe") if os.name == "nt" else os.path.join(venv, "bin", "python")
+        site_packages = subprocess.run([python, "-c", "import sysconfig; print(sysconfig.get_paths()['purelib'])"],
+                                       capture_output=True, text=True, check=True).stdout.strip()
+        source = os.path.join(tmp, "src")
+        for i in range(args.packages):
+            add_distribution(site_packages, f"bench_pkg_{i:05d}", f"{i % 7}.{i % 13}.{i % 5}")
+        edit_dir = add_distribution(site_packages, "editpkg", "3.0",
+                                    {"url": f"file://{source}/editpkg", "dir_info": {"editable": True}})
+        add_distribution(site_packages, "urlpkg", "2.0", {"url": f"file://{source}/urlpkg", "dir_info": {}})
+        add_distribution(site_packages, "legacypkg", "1.0-foo.bar")
+
+        report = os.path.join(tmp, "r.txt")
+        start = time.perf_counter()
+        generated = py_cleaner("report", "--venv", venv, "--output", report, env=env)
+        report_time = time.perf_counter() - start
+        failures = generated.returncode != 0
+        for old, new in ((report, venv), (venv, report)):
+            start = time.perf_counter()
+            result = py_cleaner("diff", old, new, env=env)
+            ok = result.returncode == 0
+            failures += not ok
+            print(f"diff {os.path.basename(old):<6} {os.path.basename(new):<6} {(time.perf_counter() - start) * 1000:6.0f}ms  "
+                  f"salida {result.returncode}  {'ok' if ok else 'FALLO'}")
+            if not ok:
+                print(result.stdout + result.stderr)
+
+        # Un cambio real sí debe aparecer (como pip: nuevo *.dist-info, que cambia la huella)
+        shutil.rmtree(edit_dir)
+        add_distribution(site_packages, "editpkg", "3.1", {"url": f"file://{source}/editpkg", "dir_info": {"editable": True}})
+        result = py_cleaner("diff", report, venv, env=env)
+        ok = result.returncode == 1 and "editpkg" in result.stdout
+        failures += not ok
+        print(f"cambio real detectado: {result.stdout.strip() or result.stderr.strip()}  {'ok' if ok else 'FALLO'}")
+        print(f"reporte de {args.packages + 3} paquetes en {report_time * 1000:.0f}ms")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
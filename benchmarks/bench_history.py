@@ -0,0 +1,80 @@
+"""Benchmark: historial de instantáneas en SQLite con reportes horarios de una flota.
+
+Simula `--envs` entornos con un reporte por hora durante `--days` días (con cambios
+ocasionales de versiones), mide las consultas indexadas y el efecto de la compactación
+sobre el tamaño de la base.
+
+Uso:
+    python benchmarks/bench_history.py [--envs 20] [--days 120] [--packages 300]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from _pycleaner import load_pycleaner
+
+
+def time_call(func, repeat: int = 20) -> float:
+    """Mejor tiempo (segundos) de `repeat` ejecuciones."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--envs", type=int, default=20)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--packages", type=int, default=300)
+    args = parser.parse_args()
+
+    pycleaner = load_pycleaner()
+    rng = random.Random(0)
+    now = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.sqlite3")
+        store = pycleaner.SnapshotStore(path)
+        environments = [{f"pkg-{i:04d}": f"1.{i % 9}.0" for i in range(args.packages)} for _ in range(args.envs)]
+        hours = args.days * 24
+        start = time.perf_counter()
+        for hour in range(hours):
+            taken_at = now - (hours - hour) * 3600
+            for index, packages in enumerate(environments):
+                if rng.random() < 0.05:
+                    name = f"pkg-{rng.randrange(args.packages):04d}"
+                    packages[name] = f"{rng.randrange(1, 5)}.{rng.randrange(10)}.0"
+                if hour == hours // 2 and index == 0:
+                    packages["tensorflow"] = "2.17.0"
+                total = 50_000_000 + sum(int(version[0]) for version in packages.values()) * 100_000
+                store.record(f"/venvs/{index}", f"venv-{index}", packages, total, "", taken_at)
+        elapsed = time.perf_counter() - start
+        count = hours * args.envs
+        print(f"{count} reportes grabados en {elapsed:.1f}s ({elapsed / count * 1e6:.0f} µs/reporte)")
+        print(f"tamaño antes de compactar: {pycleaner.format_bytes(os.path.getsize(path))}")
+
+        env_id = store.environment_id("/venvs/0")
+        gained = store.package_history(env_id, "tensorflow")
+        print(f"¿cuándo apareció tensorflow?   {time_call(lambda: store.package_history(env_id, 'tensorflow')) * 1000:7.2f}ms"
+              f"  → hace {(now - gained[0][0]) / 86400:.1f} días")
+        print(f"tendencia de tamaño (90 días)  {time_call(lambda: store.size_trend(env_id, 90)) * 1000:7.2f}ms"
+              f"  → {len(store.size_trend(env_id, 90))} puntos")
+        print(f"entornos con pkg-0001==1.1.0   {time_call(lambda: store.environments_with('pkg-0001', '1.1.0')) * 1000:7.2f}ms")
+
+        start = time.perf_counter()
+        stats = store.compact(keep_all_days=7, max_age_days=90, now=now)
+        print(f"compactación en {time.perf_counter() - start:.2f}s: {stats['thinned']} reducidas, {stats['expired']} caducadas, "
+              f"{stats['sets']} conjuntos liberados")
+        print(f"tamaño después de compactar: {pycleaner.format_bytes(os.path.getsize(path))}")
+        ok = bool(store.package_history(env_id, "tensorflow"))
+        store.close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Benchmark: inventario en proceso vs 'pip freeze' en subproceso.
+
+Genera site-packages sintéticos con 50, 500 y 5.000 distribuciones y compara
+el tiempo de ambos caminos, verificando además que la salida sea idéntica.
+
+Uso:
+    python benchmarks/bench_inventory.py [--sizes 50 500 5000] [--repeat 3]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from _pycleaner import load_pycleaner
+
+
+def build_fake_site_packages(root: str, count: int) -> str:
+    """Crea un directorio site-packages con `count` distribuciones *.dist-info."""
+    site_packages = os.path.join(root, f"site-packages-{count}")
+    os.makedirs(site_packages)
+    for i in range(count):
+        name = f"bench_pkg_{i:05d}"
+        version = f"{i % 7}.{i % 13}.{i % 5}"
+        info_dir = os.path.join(site_packages, f"{name}-{version}.dist-info")
+        os.makedirs(info_dir)
+        with open(os.path.join(info_dir, "METADATA"), "w", encoding="utf-8") as f:
+            f.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\nSummary: benchmark\n\n")
+        with open(os.path.join(info_dir, "INSTALLER"), "w", encoding="utf-8") as f:
+            f.write("pip\n")
+        with open(os.path.join(info_dir, "RECORD"), "w", encoding="utf-8") as f:
+            f.write(f"{name}/__init__.py,,\n{name}-{version}.dist-info/METADATA,,\n")
+    return site_packages
+
+
+def time_call(func, repeat: int) -> float:
+    """Mejor tiempo (segundos) de `repeat` ejecuciones."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pycleaner = load_pycleaner()
+    failures = 0
+    print(f"{'paquetes':>9} {'pip freeze':>12} {'inventario':>12} {'speedup':>9}  idéntico")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            site_packages = build_fake_site_packages(tmp, size)
+            pip_cmd = [sys.executable, "-m", "pip", "freeze", "--path", site_packages]
+
+            pip_output = subprocess.run(pip_cmd, capture_output=True, text=True).stdout
+            inventory = pycleaner.PackageInventory(sys.executable, paths=[site_packages])
+            engine_output = "".join(line + "\n" for line in inventory.load().freeze_lines())
+            identical = engine_output == pip_output
+            failures += not identical
+
+            pip_time = time_call(lambda: subprocess.run(pip_cmd, capture_output=True, text=True), args.repeat)
+            engine_time = time_call(lambda: pycleaner.PackageInventory(sys.executable, paths=[site_packages]).load().freeze_lines(), args.repeat)
+            print(f"{size:>9} {pip_time * 1000:>10.1f}ms {engine_time * 1000:>10.1f}ms {pip_time / engine_time:>8.1f}x  {'sí' if identical else 'NO'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
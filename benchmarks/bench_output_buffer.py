@@ -0,0 +1,76 @@
+"""Benchmark: salida masiva en la consola embebida (búfer por lotes y acotado).
+
+Simula un `pip` muy verboso que escribe `--lines` líneas desde un hilo mientras el
+hilo principal vacía el búfer a GUI_OUTPUT_FPS, como hace el QTimer de la GUI. Mide
+el rendimiento, el número de lotes pintados, la memoria máxima y la exportación desde
+el volcado a disco. Si PySide6 está instalado pinta además los lotes en un
+QPlainTextEdit real (plataforma offscreen).
+
+Uso:
+    python benchmarks/bench_output_buffer.py [--lines 100000] [--max-lines 10000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from _pycleaner import load_pycleaner
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--max-lines", type=int, default=10_000)
+    args = parser.parse_args()
+
+    pycleaner = load_pycleaner()
+    widget = app = None
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    if pycleaner.load_gui():
+        app = pycleaner.QApplication.instance() or pycleaner.QApplication([])
+        widget = pycleaner.QPlainTextEdit()
+        widget.setMaximumBlockCount(args.max_lines)
+
+    buffer = pycleaner.OutputBuffer(max_lines=args.max_lines)
+    tracemalloc.start()
+    producer = threading.Thread(target=lambda: [buffer.push(f"Collecting paquete-{i} (línea de log {i})")
+                                                for i in range(args.lines)])
+    start = time.perf_counter()
+    producer.start()
+    batches = painted = 0
+    while producer.is_alive() or batches == 0:
+        time.sleep(1 / pycleaner.GUI_OUTPUT_FPS)
+        lines = buffer.drain()
+        if lines:
+            batches += 1
+            painted += len(lines)
+            if widget is not None:
+                widget.appendPlainText("\n".join(lines))
+                app.processEvents()
+    lines = buffer.drain()
+    painted += len(lines)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"{args.lines} líneas en {elapsed:.2f}s ({args.lines / elapsed:,.0f} líneas/s), "
+          f"{batches} lotes pintados ({painted} líneas), "
+          f"widget: {'QPlainTextEdit' if widget is not None else 'sin PySide6'}")
+    print(f"memoria máxima: {pycleaner.format_bytes(peak)} · historial: {len(buffer.history)} líneas")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "log.txt")
+        start = time.perf_counter()
+        ok, err = buffer.export(path)
+        with open(path, encoding="utf-8") as f:
+            exported = sum(1 for _ in f)
+        print(f"exportación: {exported} líneas en {(time.perf_counter() - start) * 1000:.0f}ms {err or ''}")
+    buffer.close()
+    return 0 if ok and exported == args.lines else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Benchmark: tiempo de arranque de py-cleaner con presupuesto por comando.
+
+Para cada comando mide el arranque en frío (caché de bytecode vacía vía
+PYTHONPYCACHEPREFIX), el mejor de `--repeat` arranques en caliente y el tiempo de
+importación según `-X importtime`. Falla (salida 1) si algún comando supera su
+presupuesto o importa módulos que no le corresponden (Qt fuera de --gui, Rich en los
+subcomandos sin salida decorada).
+
+Uso:
+    python benchmarks/bench_startup.py [--repeat 5] [--budget-scale 1.5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "py-cleaner.py")
+
+# comando: (presupuesto en caliente ms, presupuesto de importación ms, prefijos de módulos prohibidos)
+BUDGETS = {
+    "--version": (350, 120, ("PySide6", "rich.markdown", "rich.syntax")),
+    "--help": (500, 200, ("PySide6",)),
+    "env --json": (300, 80, ("PySide6", "rich")),
+    "list --json": (300, 80, ("PySide6", "rich")),
+}
+
+
+def run(command: str, env: dict, importtime: bool = False) -> subprocess.CompletedProcess:
+    """Lanza py-cleaner con el comando dado y devuelve el proceso terminado."""
+    flags = ["-X", "importtime"] if importtime else []
+    return subprocess.run([sys.executable, *flags, SCRIPT, *command.split()], env=env,
+                          stdin=subprocess.DEVNULL, capture_output=True, text=True)
+
+
+def wall_time(command: str, env: dict) -> float:
+    """Tiempo de pared (segundos) de un arranque completo."""
+    start = time.perf_counter()
+    run(command, env)
+    return time.perf_counter() - start
+
+
+def import_profile(command: str, env: dict) -> tuple:
+    """(ms de importación de nivel superior, módulos importados, 3 más pesados) según -X importtime."""
+    modules, top_level = [], []
+    for line in run(command, env, importtime=True).stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append(name.strip())
+        if not name.startswith("  "):  # Sin sangría extra: importado directamente por el script
+            top_level.append((int(cumulative) / 1000, name.strip()))
+    heaviest = sorted(top_level, reverse=True)[:3]
+    return sum(ms for ms, _ in top_level), modules, heaviest
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-scale", type=float, default=1.0,
+                        help="multiplica los presupuestos (máquinas lentas o CI compartida)")
+    args = parser.parse_args()
+
+    env = dict(os.environ, XDG_CACHE_HOME=tempfile.mkdtemp())
+    failures = 0
+    print(f"{'comando':<13} {'frío':>8} {'caliente':>9} {'imports':>9}  presupuesto  más pesados")
+    for command, (wall_budget, import_budget, forbidden) in BUDGETS.items():
+        with tempfile.TemporaryDirectory() as pycache:
+            cold = wall_time(command, dict(env, PYTHONPYCACHEPREFIX=pycache))
+        warm = min(wall_time(command, env) for _ in range(args.repeat))
+        import_ms, modules, heaviest = import_profile(command, env)
+        leaked = sorted({name for name in modules for prefix in forbidden
+                         if name == prefix or name.startswith(prefix + ".")})
+        wall_budget *= args.budget_scale
+        import_budget *= args.budget_scale
+        ok = warm * 1000 <= wall_budget and import_ms <= import_budget and not leaked
+        failures += not ok
+        print(f"{command:<13} {cold * 1000:>6.0f}ms {warm * 1000:>7.0f}ms {import_ms:>7.0f}ms  "
+              f"{wall_budget:>4.0f}/{import_budget:<4.0f}ms  {', '.join(name for _, name in heaviest)}"
+              f"  {'ok' if ok else 'EXCEDIDO'}")
+        if leaked:
+            print(f"{'':<13} importa módulos prohibidos: {', '.join(leaked[:5])}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Benchmark: consulta de un paquete en pyREPORT.jsonl vs releer pyREPORT.txt completo.
+
+Escribe reportes sintéticos con el escritor en streaming y compara el tiempo de
+responder consultas sueltas con StructuredReport.get() (búsqueda binaria perezosa)
+frente a cargar y partir todas las líneas del reporte de texto.
+
+Uso:
+    python benchmarks/bench_structured_report.py [--sizes 1000 10000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from _pycleaner import load_pycleaner
+
+
+def build_reports(pycleaner, root: str, count: int):
+    """Crea pyREPORT.txt y pyREPORT.jsonl equivalentes con `count` paquetes."""
+    names = sorted(f"bench-pkg-{i:06d}" for i in range(count))
+    text_path = os.path.join(root, f"pyREPORT-{count}.txt")
+    jsonl_path = os.path.join(root, f"pyREPORT-{count}.jsonl")
+    with open(text_path, "w", encoding="utf-8") as report_file:
+        report_file.write("# Reporte de Dependencias - py-cleaner\n#\n")
+        report_file.writelines(f"{name}=={i % 7}.{i % 13}.0\n" for i, name in enumerate(names))
+    with pycleaner.StructuredReportWriter(jsonl_path) as writer:
+        writer.write_header({"schema": pycleaner.STRUCTURED_REPORT_SCHEMA, "generated": "2025-01-01T00:00:00",
+                             "environment": "bench", "python": "3.12.0", "executable": sys.executable,
+                             "prefix": sys.prefix, "fingerprint": "-", "packages": count, "sorted": True})
+        for i, name in enumerate(names):
+            writer.write_package({"name": name, "canonical_name": name, "version": f"{i % 7}.{i % 13}.0",
+                                  "location": "/site-packages", "installer": "pip", "requested": i % 3 == 0,
+                                  "bytes": i * 1000, "files": i % 50, "requires": names[max(0, i - 3):i],
+                                  "requirement": f"{name}=={i % 7}.{i % 13}.0"})
+    return names, text_path, jsonl_path
+
+
+def lookup_text(text_path: str, name: str):
+    """Camino clásico: leer todo el reporte y partir cada línea."""
+    _, dependencies = pycleaner.read_report(text_path)
+    for dependency in dependencies:
+        package, _, version = dependency.partition("==")
+        if package == name:
+            return version
+    return None
+
+
+def main() -> int:
+    global pycleaner
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    pycleaner = load_pycleaner()
+    failures = 0
+    print(f"{'paquetes':>9} {'texto/consulta':>15} {'jsonl/consulta':>15} {'speedup':>9}  correcto")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            names, text_path, jsonl_path = build_reports(pycleaner, tmp, size)
+            queries = random.Random(size).sample(names, min(args.queries, size)) + ["no-existe"]
+            report = pycleaner.StructuredReport(jsonl_path)
+
+            correct = all((report.get(name) or {}).get("version") == lookup_text(text_path, name) for name in queries[:20])
+            correct = correct and report.get("no-existe") is None and sum(1 for _ in report.packages()) == size
+            failures += not correct
+
+            start = time.perf_counter()
+            for name in queries:
+                lookup_text(text_path, name)
+            text_time = (time.perf_counter() - start) / len(queries)
+            start = time.perf_counter()
+            for name in queries:
+                report.get(name)
+            jsonl_time = (time.perf_counter() - start) / len(queries)
+            print(f"{size:>9} {text_time * 1000:>13.2f}ms {jsonl_time * 1000:>13.3f}ms {text_time / jsonl_time:>8.1f}x  {'sí' if correct else 'NO'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
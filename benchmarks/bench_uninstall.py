@@ -0,0 +1,130 @@
+"""Benchmark: desinstalación por lotes, en paralelo y nativa vs un proceso pip por paquete.
+
+Crea un venv temporal, lo puebla con paquetes sintéticos (dist-info + RECORD; uno
+de cada diez comparte el namespace `bench_ns/`) y mide el tiempo real de
+desinstalarlos con el bucle clásico (lote de 1, un trabajo a la vez), con el
+planificador en paralelo, con lotes del tamaño indicado y con el motor nativo
+(RECORD + hilos, sin pip). Verifica además que todos los paquetes desaparezcan y
+que, si el motor nativo no puede borrar un archivo, el *.dist-info (METADATA y
+RECORD) se conserve y la desinstalación pueda reintentarse.
+
+Uso:
+    python benchmarks/bench_uninstall.py [--packages 100] [--chunk-size 50] [--workers 8]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from _pycleaner import load_pycleaner
+
+
+def venv_python(venv_dir: str) -> str:
+    """Ruta del intérprete dentro del venv."""
+    if os.name == "nt":
+        return os.path.join(venv_dir, "Scripts", "python.exe")
+    return os.path.join(venv_dir, "bin", "python")
+
+
+def site_packages_of(python: str) -> str:
+    """Directorio purelib del intérprete."""
+    return subprocess.run([python, "-c", "import sysconfig; print(sysconfig.get_paths()['purelib'])"],
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+
+def populate(site_packages: str, count: int, files_per_package: int = 5) -> list:
+    """Instala `count` paquetes sintéticos desinstalables por pip y devuelve sus nombres."""
+    names = []
+    for i in range(count):
+        name = f"bench_uninstall_{i:04d}"
+        info_dir = f"{name}-1.0.dist-info"
+        package_rel = f"bench_ns/{name}" if i % 10 == 0 else name
+        os.makedirs(os.path.join(site_packages, package_rel))
+        os.makedirs(os.path.join(site_packages, info_dir))
+        record = []
+        for j in range(files_per_package):
+            rel = f"{package_rel}/mod_{j}.py"
+            with open(os.path.join(site_packages, rel), "w", encoding="utf-8") as f:
+                f.write("VALUE = 1\n")
+            record.append(f"{rel},,")
+        for meta, content in (("METADATA", f"Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\n\n"),
+                              ("INSTALLER", "pip\n")):
+            with open(os.path.join(site_packages, info_dir, meta), "w", encoding="utf-8") as f:
+                f.write(content)
+            record.append(f"{info_dir}/{meta},,")
+        record.append(f"{info_dir}/RECORD,,")
+        with open(os.path.join(site_packages, info_dir, "RECORD"), "w", encoding="utf-8") as f:
+            f.write("\n".join(record) + "\n")
+        names.append(name)
+    return names
+
+
+def check_native_failure(pycleaner, python: str, site_packages: str) -> bool:
+    """Simula un archivo imposible de borrar y comprueba que el paquete siga registrado y reintentable."""
+    name = populate(site_packages, 1)[0]
+    info_dir = os.path.join(site_packages, f"{name}-1.0.dist-info")
+    remove_file = pycleaner._remove_file
+    package_dir = next(path for path in (os.path.join(site_packages, name),
+                                         os.path.join(site_packages, "bench_ns", name))
+                       if os.path.isdir(path))
+    locked = os.path.normcase(os.path.join(package_dir, "mod_0.py"))
+    pycleaner._remove_file = lambda path: f"{path}: bloqueado" if path == locked else remove_file(path)
+    try:
+        stats = pycleaner.uninstall_packages(python, [name], "nativo")
+    finally:
+        pycleaner._remove_file = remove_file
+    kept = all(os.path.exists(os.path.join(info_dir, meta)) for meta in ("METADATA", "RECORD"))
+    listed = any(package == name for package, _ in pycleaner.get_installed_packages(python))
+    retry = pycleaner.uninstall_packages(python, [name], "nativo")
+    ok = (stats["failed"] == [name] and kept and listed and retry["successful"] == [name]
+          and not os.path.exists(info_dir) and not os.path.exists(package_dir))
+    print(f"fallo nativo: dist-info conservado={kept} sigue listado={listed} "
+          f"reintento={'ok' if retry['successful'] else 'fallido'}  {'ok' if ok else 'FALLO'}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packages", type=int, default=100)
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    pycleaner = load_pycleaner()
+    with tempfile.TemporaryDirectory() as tmp:
+        venv_dir = os.path.join(tmp, "venv")
+        subprocess.run([sys.executable, "-m", "venv", venv_dir], check=True)
+        python = venv_python(venv_dir)
+        site_packages = site_packages_of(python)
+
+        results = {}
+        for label, backend, chunk_size, workers in (
+                ("uno a uno", "pip", 1, 1),
+                (f"uno a uno ∥{args.workers}", "pip", 1, args.workers),
+                (f"lotes de {args.chunk_size} ∥{args.workers}", "pip", args.chunk_size, args.workers),
+                (f"nativo ∥{args.workers}", "nativo", args.chunk_size, args.workers)):
+            names = populate(site_packages, args.packages)
+            stats = pycleaner.uninstall_packages(python, names, backend, chunk_size, max_workers=workers)
+            leftovers = [n for n in names
+                         if os.path.exists(os.path.join(site_packages, n))
+                         or os.path.exists(os.path.join(site_packages, "bench_ns", n))]
+            results[label] = stats["elapsed"]
+            print(f"{label:>18}: {stats['elapsed']:7.2f}s  procesos pip={stats['pip_calls']:4d}  "
+                  f"pico={stats['peak_workers']:2d}  ok={len(stats['successful'])} "
+                  f"fallidos={len(stats['failed'])} restos={len(leftovers)}")
+            leftovers += [n for n in names if os.path.exists(os.path.join(site_packages, f"{n}-1.0.dist-info"))]
+            if stats["failed"] or leftovers:
+                return 1
+
+        if not check_native_failure(pycleaner, python, site_packages):
+            return 1
+
+        sequential = results.pop("uno a uno")
+        print("Aceleración real: " + " · ".join(f"{label} {sequential / elapsed:.1f}x"
+                                                for label, elapsed in results.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,9 @@
 # --- CLI Moderno con Rich ---
+import atexit
 import os
+import re
+import json
+import hashlib
 import subprocess
 import sys
 import signal
@@ -7,39 +11,87 @@ from typing import List, Optional, Tuple
 from pathlib import Path
 import time
 
+import importlib
+
+# Importaciones diferidas: --version, --help y los subcomandos no pagan Qt ni los módulos
+# de Rich que no dibujan. Cada nombre se importa en su primer uso y se sustituye en los
+# globales del módulo por el objeto real, así que los usos siguientes no pasan por el proxy.
+class _LazyGlobal:
+    """Marcador de un global del módulo que se resuelve (importa) en el primer acceso."""
+    
+    __slots__ = ("_name", "_loader")
+    
+    def __init__(self, name: str, loader):
+        self._name = name
+        self._loader = loader
+    
+    def _resolve(self):
+        value = self._loader()
+        globals()[self._name] = value
+        return value
+    
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+    
+    def __getattr__(self, attribute):
+        return getattr(self._resolve(), attribute)
+
+def _lazy_import(module: str, name: Optional[str] = None) -> _LazyGlobal:
+    """`from module import name` diferido (o `import module` si no se indica nombre)."""
+    if name is None:
+        return _LazyGlobal(module.rsplit(".", 1)[-1], lambda: importlib.import_module(module))
+    return _LazyGlobal(name, lambda: getattr(importlib.import_module(module), name))
+
 # Rich imports para interfaz moderna
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.prompt import Prompt, Confirm
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
-from rich.layout import Layout
-from rich.live import Live
-from rich.align import Align
-from rich.columns import Columns
-from rich.text import Text
-from rich import box
-from rich.rule import Rule
-from rich.tree import Tree
-from rich.syntax import Syntax
-from rich.markdown import Markdown
-
-# PySide6 imports para GUI
-try:
-    from PySide6.QtWidgets import (
-        QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTextEdit,
-        QTableWidget, QTableWidgetItem, QStatusBar, QDialog, QMessageBox, QCheckBox, QGroupBox, 
-        QGridLayout, QLineEdit, QTabWidget, QPlainTextEdit
-    )
-    from PySide6.QtGui import QIcon, QColor, QPalette
-    from PySide6.QtCore import Qt, QTimer, QDateTime
-    GUI_AVAILABLE = True
-except ImportError:
-    GUI_AVAILABLE = False
-    print("⚠️ PySide6 no disponible. Modo CLI únicamente.")
+Console = _lazy_import("rich.console", "Console")
+Group = _lazy_import("rich.console", "Group")
+Table = _lazy_import("rich.table", "Table")
+Panel = _lazy_import("rich.panel", "Panel")
+Prompt = _lazy_import("rich.prompt", "Prompt")
+Confirm = _lazy_import("rich.prompt", "Confirm")
+Progress = _lazy_import("rich.progress", "Progress")
+SpinnerColumn = _lazy_import("rich.progress", "SpinnerColumn")
+TextColumn = _lazy_import("rich.progress", "TextColumn")
+BarColumn = _lazy_import("rich.progress", "BarColumn")
+Layout = _lazy_import("rich.layout", "Layout")
+Live = _lazy_import("rich.live", "Live")
+Align = _lazy_import("rich.align", "Align")
+Columns = _lazy_import("rich.columns", "Columns")
+Text = _lazy_import("rich.text", "Text")
+box = _lazy_import("rich.box")
+Rule = _lazy_import("rich.rule", "Rule")
+Tree = _lazy_import("rich.tree", "Tree")
+Syntax = _lazy_import("rich.syntax", "Syntax")
+Markdown = _lazy_import("rich.markdown", "Markdown")
+
+# PySide6 imports para GUI: solo se cargan al abrir la GUI (ver load_gui())
+GUI_AVAILABLE = None
+_QT_NAMES = {
+    "PySide6.QtWidgets": ("QApplication", "QMainWindow", "QWidget", "QVBoxLayout", "QHBoxLayout", "QPushButton",
+                          "QLabel", "QTextEdit", "QTableWidget", "QTableWidgetItem", "QStatusBar", "QDialog",
+                          "QMessageBox", "QCheckBox", "QGroupBox", "QGridLayout", "QLineEdit", "QTabWidget",
+                          "QPlainTextEdit", "QTableView"),
+    "PySide6.QtGui": ("QIcon", "QColor", "QPalette", "QTextCursor"),
+    "PySide6.QtCore": ("Qt", "QTimer", "QDateTime", "QAbstractTableModel", "QSortFilterProxyModel", "QModelIndex"),
+}
+
+def load_gui() -> bool:
+    """Importa PySide6 y define las clases de la GUI la primera vez. Devuelve si la GUI está disponible."""
+    global GUI_AVAILABLE
+    if GUI_AVAILABLE is None:
+        try:
+            for module_name, names in _QT_NAMES.items():
+                module = importlib.import_module(module_name)
+                globals().update({name: getattr(module, name) for name in names})
+        except ImportError:
+            GUI_AVAILABLE = False
+        else:
+            GUI_AVAILABLE = True
+            _define_gui_classes()
+    return GUI_AVAILABLE
 
 # Configuración de consola
-console = Console()
+console = _LazyGlobal("console", lambda: Console())
 
 # --- Gestión de Ambientes ---
 class EnvironmentManager:
@@ -87,15 +139,9 @@ class EnvironmentManager:
         if self.current_env == "system":
             return sys.executable
         elif self.current_env == "local_venv":
-            if os.name == 'nt':  # Windows
-                return os.path.join(self.venv_path, "Scripts", "python.exe")
-            else:  # Unix/Linux/Mac
-                return os.path.join(self.venv_path, "bin", "python")
+            return self.venv_python(self.venv_path)
         elif self.current_env == "external_venv" and self.external_venv_path:
-            if os.name == 'nt':  # Windows
-                return os.path.join(self.external_venv_path, "Scripts", "python.exe")
-            else:  # Unix/Linux/Mac
-                return os.path.join(self.external_venv_path, "bin", "python")
+            return self.venv_python(self.external_venv_path)
         else:
             return sys.executable
     
@@ -103,54 +149,3788 @@ class EnvironmentManager:
         """Cambia al ambiente sistema/global."""
         self.current_env = "system"
         self.python_executable = sys.base_prefix + ("/python.exe" if os.name == 'nt' else "/bin/python")
+        interpreter_helper(self.get_pip_executable())
         console.print("[bold yellow]⚠️ Cambiado a ambiente SISTEMA/GLOBAL[/bold yellow]")
         return True
     
     def switch_to_local_venv(self) -> bool:
         """Cambia al venv local (.venv en directorio actual)."""
         local_venv_path = os.path.join(os.getcwd(), ".venv")
-        
-        if os.name == 'nt':  # Windows
-            python_exe = os.path.join(local_venv_path, "Scripts", "python.exe")
-        else:  # Unix/Linux/Mac
-            python_exe = os.path.join(local_venv_path, "bin", "python")
+        python_exe = self.venv_python(local_venv_path)
             
         if os.path.exists(python_exe):
             self.current_env = "local_venv"
             self.venv_path = local_venv_path
             self.python_executable = python_exe
+            self.remember_environment(local_venv_path)
+            interpreter_helper(python_exe)
             console.print(f"[bold green]✅ Cambiado a VENV LOCAL: {local_venv_path}[/bold green]")
             return True
         else:
             console.print(f"[bold red]❌ No se encontró VENV local en: {local_venv_path}[/bold red]")
             return False
     
-    def switch_to_external_venv(self, venv_path: str) -> bool:
-        """Cambia a un venv externo especificado."""
-        if not os.path.exists(venv_path):
-            console.print(f"[bold red]❌ Ruta de VENV no existe: {venv_path}[/bold red]")
-            return False
-            
-        if os.name == 'nt':  # Windows
-            python_exe = os.path.join(venv_path, "Scripts", "python.exe")
-        else:  # Unix/Linux/Mac
-            python_exe = os.path.join(venv_path, "bin", "python")
-            
-        if os.path.exists(python_exe):
-            self.current_env = "external_venv"
-            self.external_venv_path = venv_path
-            self.python_executable = python_exe
-            console.print(f"[bold green]✅ Cambiado a VENV EXTERNO: {venv_path}[/bold green]")
-            return True
-        else:
-            console.print(f"[bold red]❌ No se encontró Python ejecutable en: {python_exe}[/bold red]")
-            return False
+    def switch_to_external_venv(self, venv_path: str) -> bool:
+        """Cambia a un venv externo especificado."""
+        if not os.path.exists(venv_path):
+            console.print(f"[bold red]❌ Ruta de VENV no existe: {venv_path}[/bold red]")
+            return False
+            
+        python_exe = self.venv_python(venv_path)
+            
+        if os.path.exists(python_exe):
+            self.current_env = "external_venv"
+            self.external_venv_path = venv_path
+            self.python_executable = python_exe
+            self.remember_environment(venv_path)
+            interpreter_helper(python_exe)
+            console.print(f"[bold green]✅ Cambiado a VENV EXTERNO: {venv_path}[/bold green]")
+            return True
+        else:
+            console.print(f"[bold red]❌ No se encontró Python ejecutable en: {python_exe}[/bold red]")
+            return False
+    
+    @staticmethod
+    def venv_python(venv_path: str) -> str:
+        """Ruta del ejecutable Python dentro de un venv."""
+        if os.name == 'nt':  # Windows
+            return os.path.join(venv_path, "Scripts", "python.exe")
+        return os.path.join(venv_path, "bin", "python")  # Unix/Linux/Mac
+    
+    def remember_environment(self, venv_path: str) -> None:
+        """Añade un venv a la lista persistente de ambientes usados (environments.json)."""
+        venv_path = os.path.abspath(venv_path)
+        remembered = self.remembered_environments()
+        if venv_path in remembered:
+            return
+        try:
+            cache_path = os.path.join(get_cache_dir(), "environments.json")
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(remembered + [venv_path], cache_file)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # Recordar ambientes es opcional
+    
+    def remembered_environments(self) -> List[str]:
+        """Venvs usados en sesiones anteriores, en el orden en que se registraron."""
+        try:
+            with open(os.path.join(get_cache_dir(), "environments.json"), 'r', encoding='utf-8') as cache_file:
+                remembered = json.load(cache_file)
+        except (OSError, ValueError):
+            return []
+        return [path for path in remembered if isinstance(path, str)] if isinstance(remembered, list) else []
+    
+    def known_environments(self) -> List[str]:
+        """Ejecutables Python de los venvs conocidos que siguen existiendo.
+
+        Incluye el venv en ejecución, el .venv local, el venv externo configurado y los
+        recordados de sesiones anteriores, sin duplicados.
+        """
+        candidates = []
+        if sys.prefix != sys.base_prefix:
+            candidates.append(sys.prefix)
+        candidates += [os.path.join(os.getcwd(), ".venv"), self.venv_path, self.external_venv_path]
+        candidates += self.remembered_environments()
+        pythons = []
+        seen = set()
+        for venv_path in candidates:
+            if not venv_path:
+                continue
+            key = os.path.normcase(os.path.realpath(venv_path))
+            python_exe = self.venv_python(venv_path)
+            if key not in seen and os.path.exists(python_exe):
+                seen.add(key)
+                pythons.append(python_exe)
+        return pythons
+
+# Instancia global del gestor de ambientes
+env_manager = EnvironmentManager()
+
+# --- Ejecución Asíncrona de Subprocesos ---
+SUBPROCESS_CONCURRENCY = max(2, min(8, os.cpu_count() or 2))
+SUBPROCESS_HISTORY = 500
+SUBPROCESS_READ_CHUNK = 64 * 1024
+
+class SubprocessRunner:
+    """Capa única para lanzar pip y los intérpretes objetivo sobre asyncio.
+
+    Un bucle de eventos en un hilo propio ejecuta todos los subprocesos con
+    asyncio.create_subprocess_exec: la concurrencia se limita con un semáforo, stdout y
+    stderr se leen línea a línea (con callbacks opcionales), cada llamada tiene su propio
+    timeout y cancel_all() mata los procesos en curso (Ctrl+C, cierre de la GUI). Cada
+    llamada queda registrada en `calls` con su duración.
+    """
+    
+    def __init__(self, concurrency: int = SUBPROCESS_CONCURRENCY, history: int = SUBPROCESS_HISTORY):
+        import collections
+        import threading
+        self.concurrency = concurrency
+        self.calls = collections.deque(maxlen=history)
+        self.trace = bool(os.environ.get("PYCLEANER_TRACE_SUBPROCESS"))
+        self._lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+        self._tasks = set()
+    
+    def _ensure_loop(self):
+        import asyncio
+        import threading
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="py-cleaner-subprocess", daemon=True).start()
+        return self._loop
+    
+    async def run(self, args: List[str], timeout: Optional[float] = None, on_stdout=None, on_stderr=None,
+                  cwd: Optional[str] = None, env: Optional[dict] = None, limit: bool = True) -> subprocess.CompletedProcess:
+        """Ejecuta `args` y devuelve un CompletedProcess con stdout/stderr como texto.
+
+        `on_stdout(línea)` y `on_stderr(línea)` reciben cada línea al llegar. Si se supera
+        `timeout` se mata el proceso y se lanza subprocess.TimeoutExpired con la salida parcial.
+        Con `limit=False` no ocupa plaza del semáforo (comandos interactivos de larga duración).
+        """
+        import asyncio
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        stdout, stderr = [], []
+        status, returncode = "ok", None
+        start = time.perf_counter()
+        
+        async def pump(stream, chunks: list, callback) -> None:
+            # Lectura por trozos y corte de líneas a mano: readline() falla con líneas de más
+            # de 64 KiB (p. ej. 'pip list --format=json' en un entorno grande)
+            def emit(line: bytes) -> None:
+                text = line.decode("utf-8", errors="replace")
+                chunks.append(text)
+                if callback:
+                    callback(text.rstrip("\r\n"))
+            
+            pending = bytearray()
+            while True:
+                data = await stream.read(SUBPROCESS_READ_CHUNK)
+                if not data:
+                    if pending:
+                        emit(bytes(pending))
+                    return
+                end = data.rfind(b"\n")
+                if end < 0:  # Línea aún incompleta: solo se busca el salto en lo recién leído
+                    pending += data
+                    continue
+                pending += data[:end + 1]
+                for line in bytes(pending).split(b"\n")[:-1]:
+                    emit(line + b"\n")
+                pending = bytearray(data[end + 1:])
+        
+        try:
+            if limit:
+                await self._semaphore.acquire()
+            try:
+                start = time.perf_counter()
+                process = await asyncio.create_subprocess_exec(
+                    *args, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE, cwd=cwd, env=env)
+                try:
+                    await asyncio.wait_for(asyncio.gather(pump(process.stdout, stdout, on_stdout),
+                                                          pump(process.stderr, stderr, on_stderr),
+                                                          process.wait()), timeout)
+                except BaseException as e:
+                    status = "timeout" if isinstance(e, asyncio.TimeoutError) else "cancelled"
+                    if process.returncode is None:
+                        process.kill()
+                    await asyncio.shield(process.wait())
+                    if status == "timeout":
+                        raise subprocess.TimeoutExpired(list(args), timeout, output="".join(stdout),
+                                                        stderr="".join(stderr)) from None
+                    raise
+                returncode = process.returncode
+            finally:
+                if limit:
+                    self._semaphore.release()
+        except OSError:
+            status = "error"
+            raise
+        finally:
+            self._tasks.discard(task)
+            duration = time.perf_counter() - start
+            self.calls.append({"args": list(args), "returncode": returncode, "status": status, "duration": duration})
+            if self.trace:
+                print(f"[subproceso] {duration * 1000:7.1f}ms {status:<9} {' '.join(map(str, args))[:160]}", file=sys.stderr)
+        return subprocess.CompletedProcess(list(args), returncode, "".join(stdout), "".join(stderr))
+    
+    def submit(self, args: List[str], **options):
+        """Programa `args` en el bucle y devuelve un concurrent.futures.Future con el CompletedProcess."""
+        import asyncio
+        return asyncio.run_coroutine_threadsafe(self.run(args, **options), self._ensure_loop())
+    
+    @staticmethod
+    def _result(future) -> subprocess.CompletedProcess:
+        import concurrent.futures
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            raise RuntimeError("Operación cancelada") from None
+    
+    def run_sync(self, args: List[str], timeout: Optional[float] = None, **options) -> subprocess.CompletedProcess:
+        """Equivalente a subprocess.run(args, capture_output=True, text=True, timeout=timeout)."""
+        return self._result(self.submit(args, timeout=timeout, **options))
+    
+    def run_many(self, commands: List[List[str]], timeout: Optional[float] = None) -> list:
+        """Ejecuta varias órdenes independientes a la vez (hasta `concurrency`).
+
+        Devuelve, en el mismo orden, un CompletedProcess o la excepción de cada una.
+        """
+        futures = [self.submit(args, timeout=timeout) for args in commands]
+        results = []
+        for future in futures:
+            try:
+                results.append(self._result(future))
+            except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+                results.append(e)
+        return results
+    
+    def cancel_all(self) -> None:
+        """Cancela todas las llamadas en curso; sus procesos se matan y quien espera recibe RuntimeError."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(lambda: [task.cancel() for task in list(self._tasks)])
+
+subprocess_runner = SubprocessRunner()
+
+# --- Motor de Inventario de Paquetes (sin pip) ---
+# Patrón de versión PEP 440 (equivalente al de packaging.version)
+_PEP440_VERSION_PATTERN = r"""
+    v?
+    (?:
+        (?:(?P<epoch>[0-9]+)!)?
+        (?P<release>[0-9]+(?:\.[0-9]+)*)
+        (?P<pre>
+            [-_\.]?
+            (?P<pre_l>alpha|a|beta|b|preview|pre|c|rc)
+            [-_\.]?
+            (?P<pre_n>[0-9]+)?
+        )?
+        (?P<post>
+            (?:-(?P<post_n1>[0-9]+))
+            |
+            (?:
+                [-_\.]?
+                (?P<post_l>post|rev|r)
+                [-_\.]?
+                (?P<post_n2>[0-9]+)?
+            )
+        )?
+        (?P<dev>
+            [-_\.]?
+            (?P<dev_l>dev)
+            [-_\.]?
+            (?P<dev_n>[0-9]+)?
+        )?
+    )
+    (?:\+(?P<local>[a-z0-9]+(?:[-_\.][a-z0-9]+)*))?
+"""
+_PEP440_VERSION_RE = re.compile(r"^\s*" + _PEP440_VERSION_PATTERN + r"\s*$", re.VERBOSE | re.IGNORECASE)
+_CANONICAL_NAME_RE = re.compile(r"[-_.]+")
+_VALID_PROJECT_NAME_RE = re.compile(r"^([A-Z0-9]|[A-Z0-9][A-Z0-9._-]*[A-Z0-9])$", re.IGNORECASE)
+_PRE_RELEASE_LABELS = {"a": "a", "alpha": "a", "b": "b", "beta": "b",
+                       "c": "rc", "rc": "rc", "pre": "rc", "preview": "rc"}
+_PRE_RELEASE_RANK = {"a": 0, "b": 1, "rc": 2}
+_VCS_MARKERS = (".git", ".hg", ".svn", ".bzr")
+
+# Entorno de marcadores PEP 508 (mismas claves que packaging.markers.default_environment())
+_MARKER_ENVIRONMENT_EXPR = (
+    "{'implementation_name': sys.implementation.name, "
+    "'implementation_version': '{0.major}.{0.minor}.{0.micro}'.format(sys.implementation.version) + "
+    "('' if sys.implementation.version.releaselevel == 'final' else "
+    "sys.implementation.version.releaselevel[0] + str(sys.implementation.version.serial)), "
+    "'os_name': os.name, 'platform_machine': platform.machine(), "
+    "'platform_python_implementation': platform.python_implementation(), "
+    "'platform_release': platform.release(), 'platform_system': platform.system(), "
+    "'platform_version': platform.version(), 'python_full_version': platform.python_version(), "
+    "'python_version': '.'.join(platform.python_version_tuple()[:2]), 'sys_platform': sys.platform}"
+)
+# Script ejecutado dentro del intérprete objetivo para conocer su sys.path (no importa pip)
+_INTERPRETER_PROBE_SCRIPT = (
+    "import json, os, platform, sys; "
+    "print(json.dumps({'path': sys.path, 'version_info': list(sys.version_info[:3]), "
+    "'prefix': sys.prefix, 'base_prefix': sys.base_prefix, "
+    "'cache_tag': sys.implementation.cache_tag, "
+    "'markers': " + _MARKER_ENVIRONMENT_EXPR + "}))"
+)
+_interpreter_probe_cache = {}
+_inventory_memory_cache = {}
+INVENTORY_CACHE_FORMAT = 4
+# Entradas de site-packages que participan en la huella (su alta/baja cambia el inventario o sys.path)
+_FINGERPRINT_SUFFIXES = (".dist-info", ".egg-info", ".egg-link", ".pth")
+
+def canonicalize_name(name: str) -> str:
+    """Normaliza un nombre de proyecto según PEP 503 (igual que pip)."""
+    return _CANONICAL_NAME_RE.sub("-", name).lower()
+
+def _parse_pep440(version: str):
+    """Descompone una versión PEP 440. Devuelve None si la versión no es válida."""
+    match = _PEP440_VERSION_RE.match(version or "")
+    if not match:
+        return None
+    pre = None
+    if match.group("pre_l"):
+        pre = (_PRE_RELEASE_LABELS[match.group("pre_l").lower()], int(match.group("pre_n") or 0))
+    post = None
+    if match.group("post"):
+        post = int(match.group("post_n1") or match.group("post_n2") or 0)
+    dev = None
+    if match.group("dev"):
+        dev = int(match.group("dev_n") or 0)
+    local = None
+    if match.group("local"):
+        local = tuple(int(part) if part.isdigit() else part.lower()
+                      for part in re.split(r"[-_.]", match.group("local")))
+    return {
+        "epoch": int(match.group("epoch") or 0),
+        "release": tuple(int(part) for part in match.group("release").split(".")),
+        "pre": pre,
+        "post": post,
+        "dev": dev,
+        "local": local,
+    }
+
+def normalize_version(version: str) -> Optional[str]:
+    """Devuelve la forma normalizada PEP 440 de una versión (como str(Version)), o None si no es válida."""
+    parts = _parse_pep440(version)
+    if parts is None:
+        return None
+    text = f"{parts['epoch']}!" if parts["epoch"] else ""
+    text += ".".join(str(n) for n in parts["release"])
+    if parts["pre"] is not None:
+        text += f"{parts['pre'][0]}{parts['pre'][1]}"
+    if parts["post"] is not None:
+        text += f".post{parts['post']}"
+    if parts["dev"] is not None:
+        text += f".dev{parts['dev']}"
+    if parts["local"] is not None:
+        text += "+" + ".".join(str(p) for p in parts["local"])
+    return text
+
+def version_sort_key(version: str) -> tuple:
+    """Clave de ordenación de versiones compatible con las reglas de PEP 440.
+
+    Las versiones no válidas (legacy) se ordenan siempre por debajo de las válidas.
+    """
+    parts = _parse_pep440(version)
+    if parts is None:
+        return (0, version or "")
+    release = list(parts["release"])
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    if parts["pre"] is None and parts["post"] is None and parts["dev"] is not None:
+        pre = (-1, 0, 0)
+    elif parts["pre"] is None:
+        pre = (1, 0, 0)
+    else:
+        pre = (0, _PRE_RELEASE_RANK[parts["pre"][0]], parts["pre"][1])
+    post = (-1,) if parts["post"] is None else (0, parts["post"])
+    dev = (1,) if parts["dev"] is None else (0, parts["dev"])
+    if parts["local"] is None:
+        local = (0,)
+    else:
+        local = (1,) + tuple((1, p, "") if isinstance(p, int) else (0, 0, p) for p in parts["local"])
+    return (1, parts["epoch"], tuple(release), pre, post, dev, local)
+
+def _read_metadata_headers(metadata_path: str) -> dict:
+    """Lee solo la cabecera RFC 822 de un METADATA/PKG-INFO (hasta la primera línea vacía)."""
+    headers = {}
+    last_key = None
+    try:
+        with open(metadata_path, 'r', encoding='utf-8', errors='replace') as metadata_file:
+            for line in metadata_file:
+                if line in ("\n", "\r\n"):
+                    break
+                if line[:1] in (" ", "\t") and last_key:
+                    headers[last_key][-1] += "\n" + line.strip()
+                    continue
+                key, sep, value = line.partition(":")
+                if not sep:
+                    continue
+                last_key = key.strip().lower()
+                headers.setdefault(last_key, []).append(value.strip())
+    except OSError:
+        return {}
+    return headers
+
+def _read_direct_url(info_path: str) -> Optional[dict]:
+    """Lee direct_url.json (PEP 610) si existe y es válido."""
+    try:
+        with open(os.path.join(info_path, "direct_url.json"), 'r', encoding='utf-8') as direct_url_file:
+            direct_url = json.load(direct_url_file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(direct_url, dict) or not isinstance(direct_url.get("url"), str):
+        return None
+    return direct_url
+
+def _file_url_to_path(url: str) -> str:
+    """Convierte una URL file:// en ruta local."""
+    from urllib.parse import unquote, urlsplit
+    from urllib.request import url2pathname
+    parts = urlsplit(url)
+    netloc = parts.netloc if parts.netloc not in ("", "localhost") else ""
+    return url2pathname(("//" + netloc if netloc else "") + unquote(parts.path))
+
+def _find_vcs_root(location: str) -> Optional[str]:
+    """Busca hacia arriba un directorio de control de versiones (.git, .hg, ...)."""
+    current = os.path.abspath(location)
+    while True:
+        if any(os.path.exists(os.path.join(current, marker)) for marker in _VCS_MARKERS):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+def _read_installer(info_path: str) -> Optional[str]:
+    """Herramienta que instaló la distribución según su archivo INSTALLER (PEP 376)."""
+    try:
+        with open(os.path.join(info_path, "INSTALLER"), 'r', encoding='utf-8', errors='replace') as installer_file:
+            return installer_file.readline().strip() or None
+    except OSError:
+        return None
+
+def _read_egg_requires(info_path: str) -> List[str]:
+    """Convierte el requires.txt de un *.egg-info en requisitos PEP 508 (como Requires-Dist).
+
+    Las secciones '[extra]', '[extra:marcador]' y '[:marcador]' pasan a ser marcadores.
+    """
+    requires = []
+    section_marker = ""
+    try:
+        with open(os.path.join(info_path, "requires.txt"), 'r', encoding='utf-8', errors='replace') as requires_file:
+            for line in requires_file:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('[') and line.endswith(']'):
+                    extra, _, marker = line[1:-1].partition(':')
+                    conditions = [f"({marker.strip()})"] if marker.strip() else []
+                    if extra.strip():
+                        conditions.append(f'extra == "{extra.strip()}"')
+                    section_marker = " and ".join(conditions)
+                    continue
+                if section_marker:
+                    requirement, _, marker = line.partition(';')
+                    marker = f"({marker.strip()}) and {section_marker}" if marker.strip() else section_marker
+                    line = f"{requirement.strip()}; {marker}"
+                requires.append(line)
+    except OSError:
+        pass
+    return requires
+
+def probe_interpreter(python_executable: str, refresh: bool = False) -> dict:
+    """Obtiene sys.path y la versión del intérprete objetivo sin importar pip.
+
+    Para el intérprete actual se usa sys.path directamente; para otros se lanza
+    una única sonda ligera y el resultado se cachea durante la sesión.
+    """
+    key = os.path.normcase(os.path.abspath(python_executable))
+    if key in _interpreter_probe_cache and not refresh:
+        return _interpreter_probe_cache[key]
+    
+    if key == os.path.normcase(os.path.abspath(sys.executable)):
+        import platform
+        # 'python -m pip' antepone el directorio de trabajo a sys.path
+        info = {
+            "path": [os.getcwd()] + sys.path[1:],
+            "version_info": list(sys.version_info[:3]),
+            "prefix": sys.prefix,
+            "base_prefix": sys.base_prefix,
+            "cache_tag": sys.implementation.cache_tag,
+            "markers": eval(_MARKER_ENVIRONMENT_EXPR, {"os": os, "platform": platform, "sys": sys}),
+        }
+    else:
+        helper = session_helper(python_executable)
+        try:
+            info = helper.request("probe") if helper else None
+        except (RuntimeError, subprocess.TimeoutExpired):
+            info = None
+        if info is None:
+            info = _parse_interpreter_probe(python_executable, subprocess_runner.run_sync(
+                [python_executable, '-c', _INTERPRETER_PROBE_SCRIPT], timeout=30))
+        info["path"] = [entry or os.getcwd() for entry in info["path"]]
+    
+    _interpreter_probe_cache[key] = info
+    return info
+
+def _parse_interpreter_probe(python_executable: str, result: subprocess.CompletedProcess) -> dict:
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"No se pudo consultar {python_executable}")
+    return json.loads(result.stdout)
+
+def probe_interpreters(python_executables: List[str]) -> None:
+    """Sondea a la vez los intérpretes que aún no están en caché (los errores se dejan para probe_interpreter)."""
+    current = os.path.normcase(os.path.abspath(sys.executable))
+    pending = {}
+    for python_executable in python_executables:
+        key = os.path.normcase(os.path.abspath(python_executable))
+        if key != current and key not in _interpreter_probe_cache:
+            pending.setdefault(key, python_executable)
+    if len(pending) < 2:
+        return  # Nada que solapar
+    results = subprocess_runner.run_many([[python_executable, '-c', _INTERPRETER_PROBE_SCRIPT]
+                                          for python_executable in pending.values()], timeout=30)
+    for (key, python_executable), result in zip(pending.items(), results):
+        try:
+            if isinstance(result, subprocess.CompletedProcess):
+                info = _parse_interpreter_probe(python_executable, result)
+                info["path"] = [entry or os.getcwd() for entry in info["path"]]
+                _interpreter_probe_cache[key] = info
+        except (RuntimeError, ValueError):
+            pass
+
+def scan_distributions(paths: List[str]) -> List[dict]:
+    """Escanea las rutas dadas buscando *.dist-info / *.egg-info, en el mismo orden que pip.
+
+    Como pip, solo se devuelve la primera distribución encontrada para cada nombre
+    normalizado y se ignoran las entradas con metadatos inválidos.
+    """
+    distributions = []
+    seen = set()
+    for location in paths:
+        try:
+            entries = list(os.scandir(location))
+        except (OSError, TypeError):
+            continue  # No es un directorio (zip, ruta inexistente, etc.)
+        
+        for entry in entries:
+            lower_name = entry.name.lower()
+            if lower_name.endswith(".dist-info"):
+                kind = "dist-info"
+                metadata_path = os.path.join(entry.path, "METADATA")
+            elif lower_name.endswith(".egg-info"):
+                kind = "egg-info"
+                metadata_path = os.path.join(entry.path, "PKG-INFO") if entry.is_dir() else entry.path
+            else:
+                continue
+            
+            headers = _read_metadata_headers(metadata_path)
+            name = (headers.get("name") or [None])[0]
+            if not name:
+                continue
+            canonical_name = canonicalize_name(name)
+            if canonical_name in seen:
+                continue
+            seen.add(canonical_name)
+            if not _VALID_PROJECT_NAME_RE.match(canonical_name):
+                continue
+            
+            direct_url = _read_direct_url(entry.path) if kind == "dist-info" else None
+            editable_location = None
+            if direct_url and (direct_url.get("dir_info") or {}).get("editable"):
+                editable_location = _file_url_to_path(direct_url["url"])
+            
+            if kind == "dist-info":
+                requires = headers.get("requires-dist", [])
+                installer = _read_installer(entry.path)
+                requested = os.path.exists(os.path.join(entry.path, "REQUESTED"))
+            else:
+                requires = _read_egg_requires(entry.path) if entry.is_dir() else []
+                installer, requested = None, None  # Sin marcadores: origen desconocido
+            
+            distributions.append({
+                "name": name,
+                "canonical_name": canonical_name,
+                "version": (headers.get("version") or [""])[0],
+                "location": location,
+                "info_path": entry.path,
+                "kind": kind,
+                "direct_url": direct_url,
+                "editable_location": editable_location,
+                "requires": requires,
+                "installer": installer,
+                "requested": requested,
+            })
+        
+        # Instalaciones editables heredadas (*.egg-link): pip las considera en último lugar
+        for entry in entries:
+            if not entry.name.endswith(".egg-link"):
+                continue
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as link_file:
+                    target = next((line.strip() for line in link_file if line.strip()), "")
+            except OSError:
+                continue
+            if not target:
+                continue
+            target = os.path.join(location, target)
+            for linked in scan_distributions([target]):
+                if linked["canonical_name"] in seen:
+                    continue
+                seen.add(linked["canonical_name"])
+                linked["editable_location"] = target
+                distributions.append(linked)
+    return distributions
+
+def _format_freeze_requirement(dist: dict) -> Optional[str]:
+    """Formatea una distribución como lo hace 'pip freeze'. None si requiere pip (editable con VCS)."""
+    version = normalize_version(dist["version"])
+    name_version = f"{dist['name']}=={version}" if version is not None else f"{dist['name']}==={dist['version']}"
+    
+    if dist["editable_location"]:
+        location = os.path.normcase(os.path.abspath(dist["editable_location"]))
+        if _find_vcs_root(location):
+            return None
+        return f"# Editable install with no version control ({name_version})\n-e {location}"
+    
+    direct_url = dist["direct_url"]
+    if direct_url:
+        requirement = f"{dist['name']} @ "
+        fragments = []
+        vcs_info = direct_url.get("vcs_info")
+        archive_info = direct_url.get("archive_info")
+        if isinstance(vcs_info, dict):
+            requirement += f"{vcs_info.get('vcs')}+{direct_url['url']}@{vcs_info.get('commit_id')}"
+        else:
+            requirement += direct_url["url"]
+            if isinstance(archive_info, dict) and archive_info.get("hash"):
+                fragments.append(archive_info["hash"])
+        if direct_url.get("subdirectory"):
+            fragments.append("subdirectory=" + direct_url["subdirectory"])
+        if fragments:
+            requirement += "#" + "&".join(fragments)
+        return requirement
+    
+    return name_version
+
+def get_cache_dir() -> str:
+    """Directorio de caché de py-cleaner por usuario (se crea si no existe)."""
+    if os.name == 'nt':  # Windows
+        base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    else:  # Unix/Linux/Mac
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser("~"), ".cache")
+    cache_dir = os.path.join(base, "py-cleaner")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+def compute_site_fingerprint(paths: List[str]) -> str:
+    """Huella barata del estado instalado: mtime e inodos de cada site-packages y de sus entradas *.dist-info.
+
+    Cualquier instalación o desinstalación crea o elimina entradas *.dist-info, lo que
+    cambia el mtime del directorio y el conjunto de entradas, y por tanto la huella.
+    El mtime propio solo cuenta en directorios con metadatos de distribuciones, para que
+    escribir archivos en el directorio de trabajo (p. ej. pyREPORT.txt) no la altere.
+    """
+    digest = hashlib.sha1()
+    for location in paths:
+        try:
+            with os.scandir(location) as entries:
+                names = sorted((entry.name, entry) for entry in entries
+                               if entry.name.lower().endswith(_FINGERPRINT_SUFFIXES))
+        except (OSError, TypeError, ValueError):
+            digest.update(f"{location}|-\n".encode("utf-8", "surrogateescape"))
+            continue
+        if names:
+            try:
+                location_stat = os.stat(location)
+                digest.update(f"{location}|{location_stat.st_mtime_ns}|{location_stat.st_nlink}\n".encode("utf-8", "surrogateescape"))
+            except OSError:
+                continue
+        else:
+            digest.update(f"{location}|\n".encode("utf-8", "surrogateescape"))
+        for name, entry in names:
+            try:
+                entry_stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            digest.update(f"{name}|{entry_stat.st_mtime_ns}|{entry_stat.st_ino}|{entry_stat.st_nlink}\n".encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+def get_site_fingerprint(python_executable: Optional[str] = None) -> str:
+    """Huella actual de los site-packages del intérprete indicado."""
+    python_executable = python_executable or env_manager.get_pip_executable()
+    return compute_site_fingerprint(probe_interpreter(python_executable)["path"])
+
+def _inventory_cache_key(python_executable: str) -> str:
+    """Clave estable por intérprete para la caché de inventario."""
+    return os.path.normcase(os.path.abspath(python_executable))
+
+def _inventory_cache_file(python_executable: str) -> str:
+    """Ruta del archivo de caché de inventario de un intérprete."""
+    key = hashlib.sha1(_inventory_cache_key(python_executable).encode("utf-8", "surrogateescape")).hexdigest()[:16]
+    return os.path.join(get_cache_dir(), f"inventory-{key}.json")
+
+def _interpreter_signature(python_executable: str) -> list:
+    """Firma del intérprete: si cambia (recreación del venv, PYTHONPATH) hay que volver a sondearlo."""
+    try:
+        exe_stat = os.stat(python_executable)
+        exe_signature = [exe_stat.st_mtime_ns, exe_stat.st_ino]
+    except OSError:
+        exe_signature = None
+    return [exe_signature, os.environ.get("PYTHONPATH", "")]
+
+def _load_inventory_cache(python_executable: str) -> Optional[dict]:
+    """Recupera la entrada de caché (memoria o disco) si corresponde al mismo intérprete."""
+    key = _inventory_cache_key(python_executable)
+    entry = _inventory_memory_cache.get(key)
+    if entry is None:
+        try:
+            with open(_inventory_cache_file(python_executable), 'r', encoding='utf-8') as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+    if (not isinstance(entry, dict) or entry.get("format") != INVENTORY_CACHE_FORMAT
+            or entry.get("python_executable") != key
+            or entry.get("interpreter_signature") != _interpreter_signature(python_executable)):
+        return None
+    _inventory_memory_cache[key] = entry
+    return entry
+
+def _store_inventory_cache(python_executable: str, interpreter: dict, fingerprint: str, distributions: List[dict]) -> None:
+    """Guarda el inventario en memoria y en disco (escritura atómica)."""
+    key = _inventory_cache_key(python_executable)
+    entry = {
+        "format": INVENTORY_CACHE_FORMAT,
+        "python_executable": key,
+        "interpreter_signature": _interpreter_signature(python_executable),
+        "interpreter": interpreter,
+        "fingerprint": fingerprint,
+        "distributions": distributions,
+    }
+    _inventory_memory_cache[key] = entry
+    try:
+        cache_path = _inventory_cache_file(python_executable)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump(entry, cache_file)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # La caché en disco es opcional; la de memoria sigue siendo válida
+
+def invalidate_inventory_cache(python_executable: Optional[str] = None) -> None:
+    """Descarta el inventario cacheado (memoria y disco) tras instalar o desinstalar paquetes."""
+    python_executable = python_executable or env_manager.get_pip_executable()
+    key = _inventory_cache_key(python_executable)
+    _inventory_memory_cache.pop(key, None)
+    _interpreter_probe_cache.pop(key, None)
+    _dependency_graph_cache.pop(key, None)
+    try:
+        os.remove(_inventory_cache_file(python_executable))
+    except OSError:
+        pass
+
+class PackageInventory:
+    """Inventario en proceso de las distribuciones instaladas de un intérprete.
+
+    Lee directamente los metadatos *.dist-info / *.egg-info del sys.path del
+    intérprete objetivo, sin lanzar 'pip freeze' ni 'pip list'.
+    """
+    
+    def __init__(self, python_executable: Optional[str] = None, paths: Optional[List[str]] = None,
+                 use_cache: bool = True):
+        self.python_executable = python_executable or env_manager.get_pip_executable()
+        self.paths = paths
+        self.use_cache = use_cache and paths is None
+        self.version_info = None
+        self.markers = None
+        self.fingerprint = None
+        self.from_cache = False
+        self.distributions = []
+        
+    def load(self) -> "PackageInventory":
+        """Carga las distribuciones, reutilizando la caché si la huella de site-packages no cambió."""
+        if self.paths is not None:
+            # Rutas explícitas: escaneo directo sin caché
+            if self.version_info is None:
+                interpreter = probe_interpreter(self.python_executable)
+                self.version_info = tuple(interpreter["version_info"])
+                self.markers = interpreter["markers"]
+            self.distributions = scan_distributions(self.paths)
+            return self
+        
+        cached = _load_inventory_cache(self.python_executable) if self.use_cache else None
+        if cached is not None:
+            fingerprint = compute_site_fingerprint(cached["interpreter"]["path"])
+            if fingerprint == cached["fingerprint"]:
+                self.paths = cached["interpreter"]["path"]
+                self.version_info = tuple(cached["interpreter"]["version_info"])
+                self.markers = cached["interpreter"]["markers"]
+                self.fingerprint = fingerprint
+                self.distributions = cached["distributions"]
+                self.from_cache = True
+                return self
+        
+        # Caché ausente u obsoleta: volver a sondear (los .pth pueden haber cambiado sys.path)
+        interpreter = probe_interpreter(self.python_executable, refresh=cached is not None)
+        self.paths = interpreter["path"]
+        self.version_info = tuple(interpreter["version_info"])
+        self.markers = interpreter["markers"]
+        # La huella se toma antes del escaneo: si algo cambia durante él, la próxima carga lo detecta
+        self.fingerprint = compute_site_fingerprint(self.paths)
+        self.distributions = scan_distributions(self.paths)
+        if self.use_cache:
+            _store_inventory_cache(self.python_executable, interpreter, self.fingerprint, self.distributions)
+        return self
+    
+    def freeze_skip(self) -> set:
+        """Paquetes que 'pip freeze' omite por defecto según la versión del intérprete."""
+        skip = {"pip"}
+        if self.version_info is not None and tuple(self.version_info) < (3, 12):
+            skip |= {"setuptools", "distribute", "wheel"}
+        return skip
+    
+    def freeze_lines(self) -> Optional[List[str]]:
+        """Líneas idénticas a 'pip freeze'. Devuelve None si algún paquete requiere a pip."""
+        skip = self.freeze_skip()
+        lines = []
+        for dist in sorted(self.distributions, key=lambda d: d["name"].lower()):
+            if dist["canonical_name"] in skip:
+                continue
+            requirement = _format_freeze_requirement(dist)
+            if requirement is None:
+                return None
+            lines.append(requirement)
+        return lines
+    
+    def list_rows(self) -> List[Tuple[str, str]]:
+        """Filas (paquete, versión) equivalentes a 'pip list'."""
+        rows = []
+        for dist in sorted(self.distributions, key=lambda d: d["canonical_name"]):
+            version = normalize_version(dist["version"]) or dist["version"]
+            rows.append((dist["name"], version))
+        return rows
+
+def _run_pip_freeze(python_executable: str) -> Tuple[bool, str, str]:
+    """Ruta clásica: ejecuta 'pip freeze' en un subproceso."""
+    helper = session_helper(python_executable)
+    if helper:
+        try:
+            result = helper.request("pip", timeout=30, args=["freeze"])
+            return result["returncode"] == 0, result["stdout"], result["stderr"]
+        except (RuntimeError, subprocess.TimeoutExpired):
+            pass
+    result = subprocess_runner.run_sync([python_executable, '-m', 'pip', 'freeze'], timeout=30)
+    return result.returncode == 0, result.stdout, result.stderr
+
+def get_freeze_output(python_executable: Optional[str] = None) -> Tuple[bool, str, str]:
+    """Devuelve (ok, salida, error) con el mismo formato que 'pip freeze'.
+
+    Usa el inventario en proceso y solo recurre a pip para casos que no puede
+    reproducir exactamente (instalaciones editables bajo control de versiones).
+    """
+    python_executable = python_executable or env_manager.get_pip_executable()
+    try:
+        lines = PackageInventory(python_executable).load().freeze_lines()
+    except (OSError, ValueError, RuntimeError):
+        lines = None
+    if lines is None:
+        return _run_pip_freeze(python_executable)
+    return True, "".join(line + "\n" for line in lines), ""
+
+def get_installed_packages(python_executable: Optional[str] = None) -> List[Tuple[str, str]]:
+    """Devuelve [(paquete, versión)] como 'pip list', sin lanzar pip."""
+    return PackageInventory(python_executable).load().list_rows()
+
+def format_pip_list(rows: List[Tuple[str, str]]) -> str:
+    """Renderiza filas (paquete, versión) con el formato columnar de 'pip list'."""
+    name_width = max([len("Package")] + [len(name) for name, _ in rows])
+    version_width = max([len("Version")] + [len(version) for _, version in rows])
+    lines = [f"{'Package':<{name_width}} {'Version':<{version_width}}".rstrip(),
+             f"{'-' * name_width} {'-' * version_width}"]
+    lines += [f"{name:<{name_width}} {version}" for name, version in rows]
+    return "\n".join(lines) + "\n"
+
+# --- Proceso Auxiliar Persistente (intérprete objetivo) ---
+# Se ejecuta dentro del intérprete objetivo y atiende peticiones JSON Lines por stdin/stdout:
+# {"id", "op", "args"} -> {"id", "ok", "result"} o {"id", "ok": false, "error"}. El stdout real
+# se reserva para el protocolo; lo que impriman pip o los módulos importados va a stderr.
+_HELPER_SCRIPT = r'''
+import contextlib, io, json, os, platform, signal, sys, time
+signal.signal(signal.SIGINT, signal.SIG_IGN)
+channel = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+os.dup2(2, 1)
+sys.stdout = sys.stderr
+
+def op_probe(args):
+    return {"path": sys.path, "version_info": list(sys.version_info[:3]), "prefix": sys.prefix,
+            "base_prefix": sys.base_prefix, "cache_tag": sys.implementation.cache_tag,
+            "markers": ''' + _MARKER_ENVIRONMENT_EXPR + r'''}
+
+def op_inventory(args):
+    from importlib import metadata
+    wanted = {name.lower().replace("_", "-").replace(".", "-") for name in args.get("names") or []}
+    result = []
+    for dist in metadata.distributions():
+        name = dist.metadata["Name"]
+        if not name or (wanted and name.lower().replace("_", "-").replace(".", "-") not in wanted):
+            continue
+        entry = {"name": name, "version": dist.version, "location": str(dist.locate_file(""))}
+        for field in args.get("fields") or []:
+            entry[field] = dist.metadata.get_all(field) or []
+        result.append(entry)
+    return result
+
+FRESH_IMPORT = """import sys, time
+preloaded = sys.argv[1] in sys.modules
+start = time.perf_counter()
+try:
+    __import__(sys.argv[1])
+    error = ""
+except BaseException as e:
+    error = type(e).__name__ + ": " + str(e)
+print(time.perf_counter() - start, int(preloaded), error.replace(chr(10), " "), sep="\\t")
+"""
+
+def time_fresh_import(module):
+    # El helper ya tiene el módulo (o un paquete padre) en sys.modules: medirlo aquí daría 0 ms
+    import subprocess as _subprocess
+    output = _subprocess.run([sys.executable, "-c", FRESH_IMPORT, module], capture_output=True, text=True,
+                             stdin=_subprocess.DEVNULL, timeout=120).stdout
+    seconds, preloaded, error = output.rstrip("\n").split("\t", 2)
+    result = {"ok": not error, "seconds": float(seconds), "isolated": True, "preloaded": preloaded == "1"}
+    if error:
+        result["error"] = error
+    return result
+
+def op_imports(args):
+    results = {}
+    for module in args["modules"]:
+        parts = module.split(".")
+        if any(".".join(parts[:i]) in sys.modules for i in range(1, len(parts) + 1)):
+            results[module] = time_fresh_import(module)
+            continue
+        loaded = set(sys.modules)
+        start = time.perf_counter()
+        try:
+            __import__(module)
+            results[module] = {"ok": True, "seconds": time.perf_counter() - start}
+        except BaseException as e:
+            results[module] = {"ok": False, "seconds": time.perf_counter() - start, "error": type(e).__name__ + ": " + str(e)}
+        for name in set(sys.modules) - loaded:
+            del sys.modules[name]
+    return results
+
+def op_pip(args):
+    from pip._internal.cli.main import main as pip_main
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            returncode = pip_main(list(args["args"]))
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else 1
+    return {"returncode": returncode, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+OPS = {"probe": op_probe, "inventory": op_inventory, "imports": op_imports, "pip": op_pip}
+for line in sys.stdin:
+    request = json.loads(line)
+    if request.get("op") == "exit":
+        break
+    try:
+        response = {"id": request["id"], "ok": True, "result": OPS[request["op"]](request.get("args") or {})}
+    except BaseException as e:
+        response = {"id": request["id"], "ok": False, "error": type(e).__name__ + ": " + str(e)}
+    channel.write(json.dumps(response) + "\n")
+'''
+
+class InterpreterHelper:
+    """Proceso Python de larga duración dentro del intérprete objetivo.
+
+    Evita pagar el arranque del intérprete y la importación de pip en cada operación.
+    Atiende una petición a la vez; si un timeout vence o el proceso muere, se descarta y
+    se vuelve a arrancar en la siguiente petición.
+    """
+    
+    def __init__(self, python_executable: str):
+        import threading
+        self.python_executable = python_executable
+        self.key = os.path.normcase(os.path.abspath(python_executable))
+        self.process = None
+        self._responses = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+    
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+    
+    def start(self) -> None:
+        """Arranca el proceso si no está vivo (no espera a que termine de cargar)."""
+        import queue
+        import threading
+        if self.alive:
+            return
+        self.process = subprocess.Popen([self.python_executable, "-c", _HELPER_SCRIPT], stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        text=True, encoding="utf-8", bufsize=1)
+        self._responses = responses = queue.Queue()
+        
+        def read(stream) -> None:
+            for line in stream:
+                try:
+                    responses.put(json.loads(line))
+                except ValueError:
+                    continue
+            responses.put(None)  # EOF: el proceso terminó
+        
+        threading.Thread(target=read, args=(self.process.stdout,), name="py-cleaner-helper", daemon=True).start()
+    
+    def request(self, op: str, timeout: Optional[float] = 30, blocking: bool = True, **args):
+        """Envía una petición y devuelve su resultado.
+
+        Con `blocking=False` devuelve None sin esperar si otra petición está en curso.
+        Lanza RuntimeError si la operación falla y subprocess.TimeoutExpired si vence el timeout.
+        """
+        import queue
+        if not self._lock.acquire(blocking):
+            return None
+        try:
+            self.start()
+            self._next_id += 1
+            try:
+                self.process.stdin.write(json.dumps({"id": self._next_id, "op": op, "args": args}) + "\n")
+                self.process.stdin.flush()
+                response = self._responses.get(timeout=timeout)
+            except queue.Empty:
+                self.close()
+                raise subprocess.TimeoutExpired([self.python_executable, op], timeout) from None
+            except OSError as e:
+                self.close()
+                raise RuntimeError(f"El proceso auxiliar no responde: {e}") from None
+            if response is None:
+                self.close()
+                raise RuntimeError("El proceso auxiliar terminó inesperadamente")
+            if not response["ok"]:
+                raise RuntimeError(response["error"])
+            return response["result"]
+        finally:
+            self._lock.release()
+    
+    def close(self) -> None:
+        """Pide al proceso que termine y lo mata si no lo hace enseguida."""
+        process, self.process = self.process, None
+        if process is None or process.poll() is not None:
+            return
+        try:
+            process.stdin.write('{"op": "exit"}\n')
+            process.stdin.close()
+            process.wait(timeout=1)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+
+_interpreter_helper: Optional[InterpreterHelper] = None
+
+def interpreter_helper(python_executable: str) -> InterpreterHelper:
+    """Helper de la sesión para `python_executable`; si la sesión apuntaba a otro intérprete, lo reinicia."""
+    global _interpreter_helper
+    key = os.path.normcase(os.path.abspath(python_executable))
+    if _interpreter_helper is None or _interpreter_helper.key != key:
+        shutdown_interpreter_helper()
+        _interpreter_helper = InterpreterHelper(python_executable)
+    _interpreter_helper.start()
+    return _interpreter_helper
+
+def session_helper(python_executable: Optional[str]) -> Optional[InterpreterHelper]:
+    """El helper de la sesión si atiende a `python_executable`; None fuera de una sesión (subcomandos, flota)."""
+    if _interpreter_helper is None or not python_executable:
+        return None
+    return _interpreter_helper if _interpreter_helper.key == os.path.normcase(os.path.abspath(python_executable)) else None
+
+def shutdown_interpreter_helper() -> None:
+    """Termina el helper de la sesión (cambio de entorno, Ctrl+C, cierre de la GUI, salida)."""
+    global _interpreter_helper
+    helper, _interpreter_helper = _interpreter_helper, None
+    if helper is not None:
+        helper.close()
+
+atexit.register(shutdown_interpreter_helper)
+
+# --- Grafo de Dependencias (Requires-Dist) ---
+_REQUIREMENT_RE = re.compile(r"^\s*([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*(?:\[([^\]]*)\])?")
+_MARKER_TOKEN_RE = re.compile(r"""\s*(?:(?P<string>'[^']*'|"[^"]*")|(?P<op>===|==|!=|<=|>=|~=|<|>|\(|\))|(?P<word>[A-Za-z_][A-Za-z0-9_.]*))""")
+_VERSION_MARKERS = {"python_version", "python_full_version", "implementation_version", "platform_release"}
+_marker_parse_cache = {}
+_dependency_graph_cache = {}
+ORPHAN_INSTALLERS = ("pip", "uv")  # Instaladores que escriben REQUESTED de forma fiable
+AUTOREMOVE_KEEP = ("pip", "setuptools", "wheel")
+
+def parse_requirement(requirement: str) -> Optional[dict]:
+    """Descompone un requisito PEP 508 en nombre normalizado, extras y marcador. None si no es válido."""
+    spec, _, marker = requirement.partition(';')
+    match = _REQUIREMENT_RE.match(spec)
+    if not match:
+        return None
+    extras = {canonicalize_name(extra.strip()) for extra in (match.group(2) or "").split(',') if extra.strip()}
+    return {"name": canonicalize_name(match.group(1)), "extras": extras,
+            "specifier": spec[match.end():].strip(), "marker": marker.strip() or None}
+
+def _parse_marker(marker: str):
+    """Convierte un marcador PEP 508 en un árbol ('or'|'and', [...]) / ('cmp', lhs, op, rhs)."""
+    if marker in _marker_parse_cache:
+        return _marker_parse_cache[marker]
+    tokens = []
+    position = 0
+    while position < len(marker):
+        match = _MARKER_TOKEN_RE.match(marker, position)
+        if not match or match.end() == position:
+            if marker[position:].strip():
+                raise ValueError(f"Marcador inválido: {marker}")
+            break
+        position = match.end()
+        if match.group("string") is not None:
+            tokens.append(("value", match.group("string")[1:-1]))
+        elif match.group("op") is not None:
+            tokens.append(("op", match.group("op")))
+        elif tokens and tokens[-1] == ("word", "not") and match.group("word") == "in":
+            tokens[-1] = ("op", "not in")
+        elif match.group("word") == "in":
+            tokens.append(("op", "in"))
+        elif match.group("word") in ("and", "or", "not"):
+            tokens.append(("word", match.group("word")))
+        else:
+            tokens.append(("var", match.group("word")))
+    
+    def parse_expression(index: int, operator: str = "or"):
+        nodes = []
+        while True:
+            if operator == "or":
+                node, index = parse_expression(index, "and")
+            elif index < len(tokens) and tokens[index] == ("op", "("):
+                node, index = parse_expression(index + 1)
+                if index >= len(tokens) or tokens[index] != ("op", ")"):
+                    raise ValueError(f"Marcador inválido: {marker}")
+                index += 1
+            elif (index + 2 < len(tokens) and tokens[index][0] in ("var", "value")
+                    and tokens[index + 1][0] == "op" and tokens[index + 2][0] in ("var", "value")):
+                node = ("cmp", tokens[index], tokens[index + 1][1], tokens[index + 2])
+                index += 3
+            else:
+                raise ValueError(f"Marcador inválido: {marker}")
+            nodes.append(node)
+            joiner = "or" if operator == "or" else "and"
+            if index < len(tokens) and tokens[index] == ("word", joiner):
+                index += 1
+                continue
+            return (node if len(nodes) == 1 else (operator, nodes)), index
+    
+    tree, index = parse_expression(0)
+    if index != len(tokens):
+        raise ValueError(f"Marcador inválido: {marker}")
+    _marker_parse_cache[marker] = tree
+    return tree
+
+def _compare_marker_versions(lhs: str, op: str, rhs: str) -> Optional[bool]:
+    """Compara dos versiones como un especificador PEP 440. None si alguna no es una versión válida."""
+    if op == "===":
+        return lhs == rhs
+    if op in ("==", "!=") and rhs.endswith(".*"):
+        lhs_parts, rhs_parts = _parse_pep440(lhs), _parse_pep440(rhs[:-2])
+        if lhs_parts is None or rhs_parts is None:
+            return None
+        prefix = rhs_parts["release"]
+        matches = (lhs_parts["release"] + (0,) * len(prefix))[:len(prefix)] == prefix
+        return matches if op == "==" else not matches
+    lhs_key, rhs_key = version_sort_key(lhs), version_sort_key(rhs)
+    if lhs_key[0] == 0 or rhs_key[0] == 0:
+        return None
+    if op == "~=":
+        release = _parse_pep440(rhs)["release"]
+        prefix = release[:-1] if len(release) > 1 else release
+        lhs_release = _parse_pep440(lhs)["release"]
+        return lhs_key >= rhs_key and (lhs_release + (0,) * len(prefix))[:len(prefix)] == prefix
+    return {"==": lhs_key == rhs_key, "!=": lhs_key != rhs_key, "<": lhs_key < rhs_key,
+            "<=": lhs_key <= rhs_key, ">": lhs_key > rhs_key, ">=": lhs_key >= rhs_key}.get(op)
+
+def evaluate_marker(marker: str, environment: dict, extra: str = "") -> bool:
+    """Evalúa un marcador PEP 508 contra el entorno del intérprete objetivo (y un extra opcional)."""
+    def resolve(operand):
+        kind, value = operand
+        if kind == "value":
+            return value
+        if value == "extra":
+            return extra
+        return environment.get(value, "")
+    
+    def evaluate(node) -> bool:
+        if node[0] == "or":
+            return any(evaluate(child) for child in node[1])
+        if node[0] == "and":
+            return all(evaluate(child) for child in node[1])
+        _, lhs_token, op, rhs_token = node
+        lhs, rhs = resolve(lhs_token), resolve(rhs_token)
+        if "extra" in (lhs_token[1], rhs_token[1]) and "var" in (lhs_token[0], rhs_token[0]):
+            lhs, rhs = canonicalize_name(lhs), canonicalize_name(rhs)
+        if op == "in":
+            return lhs in rhs
+        if op == "not in":
+            return lhs not in rhs
+        variables = {token[1] for token in (lhs_token, rhs_token) if token[0] == "var"}
+        if variables & _VERSION_MARKERS:
+            result = _compare_marker_versions(lhs, op, rhs)
+            if result is not None:
+                return result
+        if op == "==" or op == "===":
+            return lhs == rhs
+        if op == "!=":
+            return lhs != rhs
+        return False  # Comparación no definida en PEP 508 (se trata como falsa, sin abortar)
+    
+    return evaluate(_parse_marker(marker))
+
+class DependencyGraph:
+    """Grafo de dependencias entre las distribuciones instaladas de un intérprete.
+
+    Se construye con los Requires-Dist del inventario (requires.txt en *.egg-info),
+    evaluando los marcadores para el intérprete objetivo y activando los extras que
+    piden otros paquetes instalados. Las aristas van de cada paquete a sus
+    dependencias (`forward`) y de cada dependencia a quienes la usan (`reverse`);
+    los nodos son nombres normalizados.
+    """
+    
+    def __init__(self, distributions: List[dict], markers: Optional[dict] = None):
+        self.nodes = {dist["canonical_name"]: dist for dist in distributions}
+        self.forward = {name: set() for name in self.nodes}
+        self.reverse = {name: set() for name in self.nodes}
+        self.requirements = {}  # (paquete, dependencia) -> requisito que crea la arista
+        self.missing = {}       # paquete -> requisitos aplicables que no están instalados
+        self.invalid = []       # (paquete, requisito) imposibles de interpretar
+        self.scripts_dir = None  # bin/ o Scripts/ del entorno; lo fija from_inventory()
+        self._build(markers or {})
+        self._cycles = None
+        self._order = None
+        self._paths = {}
+        self._scripts = {}
+    
+    def _build(self, markers: dict) -> None:
+        """Resuelve marcadores y extras hasta que no se activen extras nuevos."""
+        parsed = {}
+        for name, dist in self.nodes.items():
+            parsed[name] = []
+            for requirement in dist.get("requires") or []:
+                parts = parse_requirement(requirement)
+                if parts is None:
+                    self.invalid.append((name, requirement))
+                else:
+                    parsed[name].append((requirement, parts))
+        
+        active_extras = {name: {""} for name in self.nodes}
+        evaluated = {}
+        pending = list(self.nodes)
+        while pending:
+            name = pending.pop()
+            for requirement, parts in parsed[name]:
+                for extra in active_extras[name]:
+                    if (name, requirement, extra) in evaluated:
+                        continue
+                    applies = True
+                    if parts["marker"]:
+                        cache_key = (parts["marker"], extra)
+                        if cache_key not in evaluated:
+                            try:
+                                evaluated[cache_key] = evaluate_marker(parts["marker"], markers, extra)
+                            except ValueError:
+                                evaluated[cache_key] = False
+                                self.invalid.append((name, requirement))
+                        applies = evaluated[cache_key]
+                    evaluated[(name, requirement, extra)] = applies
+                    if not applies:
+                        continue
+                    dependency = parts["name"]
+                    if dependency not in self.nodes:
+                        self.missing.setdefault(name, []).append(requirement)
+                        continue
+                    if dependency != name:
+                        self.forward[name].add(dependency)
+                        self.reverse[dependency].add(name)
+                        self.requirements.setdefault((name, dependency), requirement)
+                    new_extras = parts["extras"] - active_extras[dependency]
+                    if new_extras:
+                        active_extras[dependency] |= new_extras
+                        pending.append(dependency)
+        self.active_extras = {name: sorted(extras - {""}) for name, extras in active_extras.items()}
+    
+    @classmethod
+    def from_inventory(cls, inventory: "PackageInventory") -> "DependencyGraph":
+        """Construye el grafo a partir de un inventario ya cargado."""
+        graph = cls(inventory.distributions, inventory.markers)
+        prefix = probe_interpreter(inventory.python_executable)["prefix"]
+        graph.scripts_dir = os.path.join(prefix, "Scripts" if os.name == 'nt' else "bin")
+        return graph
+    
+    def edge_count(self) -> int:
+        """Número de aristas paquete → dependencia."""
+        return sum(len(dependencies) for dependencies in self.forward.values())
+    
+    def _walk(self, adjacency: dict, names: List[str]) -> set:
+        """Cierre transitivo de `names` siguiendo `adjacency` (sin incluir los nombres de partida)."""
+        start = {canonicalize_name(name) for name in names}
+        seen = set()
+        stack = [neighbour for name in start for neighbour in adjacency.get(name, ())]
+        while stack:
+            name = stack.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            stack.extend(adjacency[name] - seen)
+        return seen - start
+    
+    def dependencies(self, name: str, recursive: bool = False) -> set:
+        """Dependencias instaladas de un paquete (directas o transitivas)."""
+        if recursive:
+            return self._walk(self.forward, [name])
+        return set(self.forward.get(canonicalize_name(name), ()))
+    
+    def dependents(self, name: str, recursive: bool = False) -> set:
+        """Paquetes instalados que dependen de uno dado (directos o transitivos)."""
+        if recursive:
+            return self._walk(self.reverse, [name])
+        return set(self.reverse.get(canonicalize_name(name), ()))
+    
+    def why(self, name: str) -> List[str]:
+        """Camino de dependencias más corto que explica por qué `name` está instalado.
+
+        Empieza en un paquete del que nadie depende y termina en `name`; si nadie
+        depende de `name`, el camino es solo él mismo.
+        """
+        name = canonicalize_name(name)
+        if name not in self._paths:
+            parents = {name: None}
+            queue = [name]
+            root = name
+            for current in queue:
+                root = current
+                if not self.reverse.get(current):
+                    break
+                for dependent in sorted(self.reverse[current]):
+                    if dependent not in parents:
+                        parents[dependent] = current
+                        queue.append(dependent)
+            path = []
+            while root is not None:
+                path.append(root)
+                root = parents[root]
+            self._paths[name] = path
+        return self._paths[name]
+    
+    def console_scripts(self, name: str) -> List[str]:
+        """Scripts de bin/ (Scripts/ en Windows) que desaparecerían al desinstalar el paquete."""
+        name = canonicalize_name(name)
+        if name in self._scripts:
+            return self._scripts[name]
+        dist = self.nodes.get(name)
+        scripts = set()
+        if dist is not None and self.scripts_dir:
+            scripts_dir = os.path.normcase(os.path.abspath(self.scripts_dir))
+            record_path = os.path.join(dist["info_path"], "RECORD")
+            if dist["kind"] == "dist-info" and os.path.isfile(record_path):
+                import csv
+                try:
+                    with open(record_path, 'r', encoding='utf-8', newline='') as record_file:
+                        for row in csv.reader(record_file):
+                            if row and row[0]:
+                                path = os.path.normcase(os.path.abspath(os.path.join(dist["location"], row[0])))
+                                if os.path.dirname(path) == scripts_dir:
+                                    scripts.add(os.path.basename(row[0]))
+                except OSError:
+                    pass
+            else:
+                # Sin RECORD: los entry points declarados que existan en el directorio de scripts
+                import configparser
+                parser = configparser.ConfigParser(delimiters=("=",), interpolation=None)
+                parser.optionxform = str
+                try:
+                    parser.read(os.path.join(dist["info_path"], "entry_points.txt"), encoding='utf-8')
+                except configparser.Error:
+                    pass
+                for section in ("console_scripts", "gui_scripts"):
+                    if parser.has_section(section):
+                        scripts.update(script for script in parser.options(section)
+                                       if any(os.path.exists(os.path.join(self.scripts_dir, script + suffix))
+                                              for suffix in ("", ".exe")))
+        self._scripts[name] = sorted(scripts)
+        return self._scripts[name]
+    
+    def impact(self, packages: List[str]) -> dict:
+        """Consecuencias de desinstalar `packages` juntos, por paquete seleccionado.
+
+        Para cada uno devuelve 'breaks' (dependientes directos instalados que quedarían
+        rotos), 'affected' (dependientes indirectos), 'path' (camino de why()) y
+        'scripts' (console_scripts()). Los paquetes también seleccionados no cuentan como rotos.
+        """
+        selected = {canonicalize_name(package) for package in packages}
+        result = {}
+        for package in packages:
+            name = canonicalize_name(package)
+            breaks = self.reverse.get(name, set()) - selected
+            affected = self._walk(self.reverse, list(breaks)) - selected - breaks - {name} if breaks else set()
+            result[package] = {
+                "breaks": sorted(breaks),
+                "affected": sorted(affected),
+                "path": self.why(name) if name in self.nodes else [name],
+                "scripts": self.console_scripts(name),
+            }
+        return result
+    
+    def is_orphan_candidate(self, name: str) -> bool:
+        """True si el paquete se instaló como dependencia (sin REQUESTED) por un instalador fiable."""
+        dist = self.nodes[name]
+        return (dist.get("requested") is False
+                and (dist.get("installer") or "").lower() in ORPHAN_INSTALLERS
+                and not dist["editable_location"]
+                and name not in AUTOREMOVE_KEEP)
+    
+    def orphan_rounds(self) -> List[List[str]]:
+        """Huérfanos por rondas: cada ronda queda huérfana al quitar las anteriores.
+
+        Un huérfano es un paquete no solicitado explícitamente del que ningún paquete
+        restante depende. Los ciclos se tratan en bloque: se eliminan juntos si ningún
+        paquete fuera del ciclo los necesita.
+        """
+        components = self.strongly_connected_components()
+        removed = set()
+        rounds = []
+        while True:
+            current = []
+            for component in components:
+                members = set(component)
+                if members & removed or not all(self.is_orphan_candidate(name) for name in component):
+                    continue
+                if all(self.reverse[name] <= removed | members for name in component):
+                    current.extend(component)
+            if not current:
+                return rounds
+            rounds.append(sorted(current))
+            removed.update(current)
+    
+    def strongly_connected_components(self) -> List[List[str]]:
+        """Componentes fuertemente conexas (Tarjan iterativo), de las dependencias hacia arriba.
+
+        Cada componente aparece después de todas las componentes de las que depende.
+        """
+        index_of, lowlink = {}, {}
+        stack, on_stack = [], set()
+        components = []
+        counter = 0
+        for root in sorted(self.nodes):
+            if root in index_of:
+                continue
+            work = [(root, iter(sorted(self.forward[root])))]
+            index_of[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, neighbours = work[-1]
+                advanced = False
+                for neighbour in neighbours:
+                    if neighbour not in index_of:
+                        index_of[neighbour] = lowlink[neighbour] = counter
+                        counter += 1
+                        stack.append(neighbour)
+                        on_stack.add(neighbour)
+                        work.append((neighbour, iter(sorted(self.forward[neighbour]))))
+                        advanced = True
+                        break
+                    if neighbour in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[neighbour])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component))
+        return components
+    
+    def find_cycles(self) -> List[List[str]]:
+        """Grupos de paquetes que dependen circularmente entre sí."""
+        if self._cycles is None:
+            self._cycles = [component for component in self.strongly_connected_components()
+                            if len(component) > 1]
+        return self._cycles
+    
+    def topological_order(self) -> List[str]:
+        """Todos los paquetes con cada dependencia antes que quienes la usan.
+
+        Los ciclos no impiden ordenar: sus miembros quedan juntos, en orden alfabético.
+        """
+        if self._order is None:
+            self._order = [name for component in self.strongly_connected_components() for name in component]
+        return self._order
+    
+    def uninstall_order(self, packages: List[str]) -> List[str]:
+        """Ordena `packages` para desinstalar primero a quienes dependen de los demás.
+
+        Los nombres que no están en el grafo conservan su orden relativo y van al final.
+        """
+        position = {name: index for index, name in enumerate(self.topological_order())}
+        known = [p for p in packages if canonicalize_name(p) in position]
+        unknown = [p for p in packages if canonicalize_name(p) not in position]
+        return sorted(known, key=lambda p: position[canonicalize_name(p)], reverse=True) + unknown
+    
+    def to_dict(self) -> dict:
+        """Representación serializable del grafo (nodos, aristas, ciclos y requisitos ausentes)."""
+        return {
+            "nodes": [{"name": self.nodes[name]["name"], "canonical_name": name,
+                       "version": self.nodes[name]["version"], "extras": self.active_extras[name]}
+                      for name in sorted(self.nodes)],
+            "edges": [{"from": name, "to": dependency, "requirement": self.requirements[(name, dependency)]}
+                      for name in sorted(self.forward) for dependency in sorted(self.forward[name])],
+            "cycles": self.find_cycles(),
+            "missing": {name: requirements for name, requirements in sorted(self.missing.items())},
+        }
+    
+    def to_json(self) -> str:
+        """Exporta el grafo como JSON."""
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+    
+    def to_dot(self) -> str:
+        """Exporta el grafo en formato DOT de Graphviz (los ciclos se marcan en rojo)."""
+        in_cycle = {name for cycle in self.find_cycles() for name in cycle}
+        lines = ["digraph dependencies {", "    rankdir=LR;", "    node [shape=box, fontname=\"Helvetica\"];"]
+        for name in sorted(self.nodes):
+            label = f"{self.nodes[name]['name']}\\n{self.nodes[name]['version']}".replace('"', '\\"')
+            color = ", color=red" if name in in_cycle else ""
+            lines.append(f'    "{name}" [label="{label}"{color}];')
+        for name in sorted(self.forward):
+            for dependency in sorted(self.forward[name]):
+                color = " [color=red]" if name in in_cycle and dependency in in_cycle else ""
+                lines.append(f'    "{name}" -> "{dependency}"{color};')
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+def get_dependency_graph(python_executable: Optional[str] = None) -> DependencyGraph:
+    """Grafo de dependencias del intérprete indicado, reutilizado mientras la huella no cambie."""
+    inventory = PackageInventory(python_executable).load()
+    key = _inventory_cache_key(inventory.python_executable)
+    cached = _dependency_graph_cache.get(key)
+    if cached is not None and cached[0] == inventory.fingerprint:
+        return cached[1]
+    graph = DependencyGraph.from_inventory(inventory)
+    _dependency_graph_cache[key] = (inventory.fingerprint, graph)
+    return graph
+
+# --- Desinstalación por Lotes ---
+DEFAULT_UNINSTALL_CHUNK_SIZE = 50
+UNINSTALL_TIMEOUT_PER_PACKAGE = 30  # Segundos por paquete (el bucle clásico usaba 30 s por proceso)
+_PIP_UNINSTALLED_RE = re.compile(r"^\s*Successfully uninstalled (\S+)\s*$", re.MULTILINE)
+_pip_startup_cache = {}
+
+def _uninstalled_names(output: str) -> set:
+    """Nombres normalizados que pip reporta como 'Successfully uninstalled <nombre>-<versión>'."""
+    return {canonicalize_name(match.group(1).rsplit('-', 1)[0])
+            for match in _PIP_UNINSTALLED_RE.finditer(output or "")}
+
+def measure_pip_startup(python_executable: str) -> float:
+    """Mide (una vez por sesión) el coste fijo de arrancar 'pip uninstall' en el intérprete dado.
+
+    Se invoca sin requisitos: pip carga el comando y termina con error enseguida.
+    """
+    key = os.path.normcase(os.path.abspath(python_executable))
+    if key not in _pip_startup_cache:
+        start = time.perf_counter()
+        try:
+            subprocess_runner.run_sync([python_executable, '-m', 'pip', 'uninstall', '-y'],
+                                       timeout=UNINSTALL_TIMEOUT_PER_PACKAGE)
+        except (OSError, RuntimeError, subprocess.TimeoutExpired):
+            return 0.0
+        _pip_startup_cache[key] = time.perf_counter() - start
+    return _pip_startup_cache[key]
+
+def uninstall_packages_batched(python_executable: str, packages: List[str],
+                               chunk_size: int = DEFAULT_UNINSTALL_CHUNK_SIZE,
+                               on_chunk=None, on_result=None) -> dict:
+    """Desinstala paquetes enviándolos a pip en lotes de `chunk_size`.
+
+    Cada paquete conserva su resultado individual: en los lotes que fallan, los
+    paquetes ya confirmados por pip se dan por desinstalados y solo el resto se
+    reintenta de uno en uno. `on_chunk(lote, índice, total)` se llama al iniciar
+    cada lote y `on_result(paquete, ok, mensaje)` al resolverse cada paquete.
+
+    Devuelve un dict con 'successful', 'failed', 'errors', 'elapsed', 'pip_calls' y 'retried'.
+    """
+    chunk_size = max(1, int(chunk_size))
+    chunks = [packages[i:i + chunk_size] for i in range(0, len(packages), chunk_size)]
+    stats = {"successful": [], "failed": [], "errors": {}, "elapsed": 0.0,
+             "pip_calls": 0, "retried": 0, "chunk_size": chunk_size}
+    start = time.perf_counter()
+    
+    def run_pip(batch: List[str]) -> Tuple[Optional[int], str, str]:
+        stats["pip_calls"] += 1
+        # El helper de la sesión ya tiene pip importado; si está ocupado con otro lote se lanza un proceso
+        helper = session_helper(python_executable)
+        if helper and "pip" not in {canonicalize_name(name) for name in batch}:
+            try:
+                result = helper.request("pip", timeout=UNINSTALL_TIMEOUT_PER_PACKAGE * len(batch), blocking=False,
+                                        args=["uninstall", "-y"] + batch)
+                if result is not None:
+                    return result["returncode"], result["stdout"], result["stderr"]
+            except subprocess.TimeoutExpired:
+                return None, "", "Timeout"
+            except RuntimeError:
+                pass
+        try:
+            result = subprocess_runner.run_sync([python_executable, '-m', 'pip', 'uninstall', '-y'] + batch,
+                                                timeout=UNINSTALL_TIMEOUT_PER_PACKAGE * len(batch))
+            return result.returncode, result.stdout, result.stderr
+        except subprocess.TimeoutExpired as e:
+            return None, e.stdout or "", "Timeout"
+        except Exception as e:
+            return None, "", str(e)
+    
+    def record(package: str, ok: bool, message: str = "") -> None:
+        (stats["successful"] if ok else stats["failed"]).append(package)
+        if not ok:
+            stats["errors"][package] = message
+        if on_result:
+            on_result(package, ok, message)
+    
+    for index, chunk in enumerate(chunks, 1):
+        if on_chunk:
+            on_chunk(chunk, index, len(chunks))
+        returncode, stdout, stderr = run_pip(chunk)
+        if returncode == 0:
+            for package in chunk:
+                record(package, True)
+            continue
+        
+        # Lote fallido: pip aborta en el primer error, lo ya desinstalado queda confirmado en stdout
+        confirmed = _uninstalled_names(stdout)
+        pending = []
+        for package in chunk:
+            if canonicalize_name(package) in confirmed:
+                record(package, True)
+            else:
+                pending.append(package)
+        
+        if len(chunk) == 1:
+            for package in pending:
+                record(package, False, (stderr or "").strip() or "Error desconocido")
+            continue
+        
+        # Reintento individual solo para los paquetes del lote no confirmados
+        for package in pending:
+            stats["retried"] += 1
+            retry_code, _, retry_err = run_pip([package])
+            record(package, retry_code == 0, "" if retry_code == 0 else (retry_err or "").strip() or "Error desconocido")
+    
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+def estimate_sequential_time(python_executable: str, stats: dict, total_packages: int) -> Optional[float]:
+    """Estima cuánto habría tardado el bucle clásico de un proceso pip por paquete.
+
+    Cada proceso adicional paga el arranque de pip; se suma ese coste medido por cada
+    proceso ahorrado al tiempo real del lote.
+    """
+    saved_calls = total_packages - stats["pip_calls"]
+    if saved_calls <= 0:
+        return None
+    startup = measure_pip_startup(python_executable)
+    if not startup:
+        return None
+    return stats["elapsed"] + saved_calls * startup
+
+# --- Motor Nativo de Desinstalación (RECORD) ---
+UNINSTALL_BACKENDS = ("pip", "nativo")
+NATIVE_UNINSTALL_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+
+def _is_within(path: str, root: str) -> bool:
+    """True si `path` está dentro de `root` (ambas rutas absolutas normalizadas)."""
+    try:
+        return os.path.commonpath([path, root]) == root
+    except ValueError:
+        return False  # Unidades distintas en Windows
+
+def _read_record_paths(dist: dict, prefix: str, include_metadata: bool = True) -> Tuple[List[str], Optional[str]]:
+    """Lee el RECORD de una distribución y devuelve (rutas absolutas, error).
+
+    Como pip, solo se permiten rutas dentro del prefijo del entorno o de su site-packages;
+    un RECORD con rutas fuera de ellos se rechaza por completo. Con include_metadata=False
+    se omiten los archivos del propio *.dist-info (METADATA, RECORD...).
+    """
+    import csv
+    location = os.path.normcase(os.path.abspath(dist["location"]))
+    prefix = os.path.normcase(os.path.abspath(prefix))
+    info_path = os.path.normcase(os.path.abspath(dist["info_path"]))
+    try:
+        with open(os.path.join(dist["info_path"], "RECORD"), 'r', encoding='utf-8', newline='') as record_file:
+            rows = list(csv.reader(record_file))
+    except OSError as e:
+        return [], f"RECORD no disponible: {e}"
+    
+    paths = set()
+    for row in rows:
+        if not row or not row[0]:
+            continue
+        path = os.path.normcase(os.path.abspath(os.path.join(dist["location"], row[0])))
+        if not (_is_within(path, location) or _is_within(path, prefix)):
+            return [], f"RECORD contiene una ruta fuera del entorno: {row[0]}"
+        if not include_metadata and _is_within(path, info_path):
+            continue
+        paths.add(path)
+        if path.endswith(".py"):
+            # Bytecode compilado que no siempre figura en RECORD
+            directory, filename = os.path.split(path)
+            stem = filename[:-3]
+            paths.add(path + "c")
+            pycache = os.path.join(directory, "__pycache__")
+            try:
+                paths.update(os.path.join(pycache, name) for name in os.listdir(pycache)
+                             if name.startswith(stem + ".") and name.endswith(".pyc"))
+            except OSError:
+                pass
+    return sorted(paths), None
+
+def _remove_file(path: str) -> Optional[str]:
+    """Elimina un archivo. Devuelve el error como texto, o None si se eliminó o ya no existía."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except IsADirectoryError:
+        pass  # Entradas de directorio en RECORD: se podan después si quedan vacías
+    except OSError as e:
+        return f"{path}: {e.strerror or e}"
+    return None
+
+def _prune_empty_dirs(paths: List[str], roots: List[str]) -> None:
+    """Elimina, de más profundo a menos, los directorios que quedaron vacíos bajo `roots`."""
+    candidates = set()
+    for path in paths:
+        root = next((r for r in roots if _is_within(path, r)), None)
+        if root is None:
+            continue
+        directory = os.path.dirname(path)
+        while directory != root and _is_within(directory, root):
+            candidates.add(directory)
+            directory = os.path.dirname(directory)
+    for directory in sorted(candidates, key=lambda d: d.count(os.sep), reverse=True):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass  # No vacío o en uso
+
+def uninstall_distributions_native(python_executable: str, distributions: List[dict],
+                                   on_result=None, workers: int = NATIVE_UNINSTALL_WORKERS) -> dict:
+    """Desinstala distribuciones *.dist-info leyendo su RECORD, sin lanzar pip.
+
+    Los archivos de todas las distribuciones se eliminan en paralelo con un pool de
+    hilos; después se podan los directorios vacíos y, por último, se borra el
+    *.dist-info, cuyos archivos nunca entran en el pool. Si algún archivo no puede
+    eliminarse, el *.dist-info se conserva intacto para que la distribución siga
+    registrada y pueda reintentarse con pip.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import shutil
+    
+    prefix = probe_interpreter(python_executable)["prefix"]
+    stats = {"successful": [], "failed": [], "errors": {}, "files_removed": 0}
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        records = list(pool.map(lambda dist: _read_record_paths(dist, prefix, include_metadata=False),
+                                distributions))
+        
+        jobs = []
+        for dist, (paths, error) in zip(distributions, records):
+            if error:
+                jobs.append((dist, paths, error, []))
+            else:
+                jobs.append((dist, paths, None, [pool.submit(_remove_file, path) for path in paths]))
+        
+        for dist, paths, error, futures in jobs:
+            errors = [f.result() for f in futures]
+            errors = [e for e in errors if e]
+            if error or errors:
+                message = error or f"{len(errors)} archivos no se pudieron eliminar ({errors[0]})"
+                stats["failed"].append(dist["name"])
+                stats["errors"][dist["name"]] = message
+                if on_result:
+                    on_result(dist["name"], False, message)
+                continue
+            
+            stats["files_removed"] += len(paths)
+            location = os.path.normcase(os.path.abspath(dist["location"]))
+            _prune_empty_dirs(paths, [location, os.path.normcase(os.path.abspath(prefix))])
+            shutil.rmtree(dist["info_path"], ignore_errors=True)
+            if os.path.exists(dist["info_path"]):
+                message = f"No se pudo eliminar {dist['info_path']}"
+                stats["failed"].append(dist["name"])
+                stats["errors"][dist["name"]] = message
+                if on_result:
+                    on_result(dist["name"], False, message)
+                continue
+            stats["successful"].append(dist["name"])
+            if on_result:
+                on_result(dist["name"], True, "")
+    return stats
+
+# --- Uso de Disco por Paquete ---
+DISK_USAGE_WORKERS = NATIVE_UNINSTALL_WORKERS
+_disk_usage_cache = {}
+
+def _distribution_files(dist: dict, prefix: str) -> List[str]:
+    """Rutas absolutas de los archivos de una distribución (RECORD o installed-files.txt)."""
+    if dist["kind"] == "dist-info":
+        paths, error = _read_record_paths(dist, prefix)
+        return [] if error else paths
+    try:
+        with open(os.path.join(dist["info_path"], "installed-files.txt"), 'r', encoding='utf-8') as files_list:
+            return sorted({os.path.normcase(os.path.abspath(os.path.join(dist["info_path"], line.strip())))
+                           for line in files_list if line.strip()})
+    except OSError:
+        return []
+
+def _stat_distribution(dist: dict, prefix: str) -> List[Tuple[int, int, int, int, bool]]:
+    """(dispositivo, inodo, bytes asignados, tamaño aparente, es_directorio) de cada archivo y directorio propio."""
+    import stat
+    location = os.path.normcase(os.path.abspath(dist["location"]))
+    entries = []
+    directories = set()
+    for path in _distribution_files(dist, prefix):
+        try:
+            file_stat = os.lstat(path)
+        except OSError:
+            continue
+        if stat.S_ISDIR(file_stat.st_mode):
+            continue  # Entradas de directorio en RECORD: se cuentan abajo
+        entries.append((file_stat.st_dev, file_stat.st_ino, _allocated_size(file_stat), file_stat.st_size, False))
+        directory = os.path.dirname(path)
+        while directory != location and _is_within(directory, location) and directory not in directories:
+            directories.add(directory)
+            directory = os.path.dirname(directory)
+    for directory in directories:
+        try:
+            dir_stat = os.lstat(directory)
+        except OSError:
+            continue
+        entries.append((dir_stat.st_dev, dir_stat.st_ino, _allocated_size(dir_stat), 0, True))
+    return entries
+
+def measure_disk_usage(distributions: List[dict], prefix: str, workers: int = DISK_USAGE_WORKERS) -> dict:
+    """Uso real de disco de cada distribución: {'files', 'inodes', 'bytes', 'apparent'} por nombre normalizado.
+
+    Los archivos se consultan con os.lstat en un pool de hilos. 'bytes' sale de
+    st_blocks (espacio asignado; st_size donde no existe) y cada inodo se cuenta una
+    sola vez: los enlaces duros, dentro de un paquete o entre varios, y los
+    directorios compartidos (namespaces) se atribuyen al primero en orden alfabético.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    ordered = sorted(distributions, key=lambda dist: dist["canonical_name"])
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        stats = list(pool.map(lambda dist: _stat_distribution(dist, prefix), ordered))
+    
+    usage = {}
+    seen = set()
+    for dist, entries in zip(ordered, stats):
+        totals = {"files": 0, "inodes": 0, "bytes": 0, "apparent": 0}
+        for device, inode, allocated, apparent, is_dir in entries:
+            if not is_dir:
+                totals["files"] += 1
+                totals["apparent"] += apparent
+            if (device, inode) in seen:
+                continue
+            seen.add((device, inode))
+            totals["inodes"] += 1
+            totals["bytes"] += allocated
+        usage[dist["canonical_name"]] = totals
+    return usage
+
+def get_disk_usage(python_executable: Optional[str] = None) -> dict:
+    """Uso de disco de todas las distribuciones del intérprete, reutilizado mientras la huella no cambie."""
+    inventory = PackageInventory(python_executable).load()
+    key = _inventory_cache_key(inventory.python_executable)
+    cached = _disk_usage_cache.get(key)
+    if cached is not None and cached[0] == inventory.fingerprint:
+        return cached[1]
+    prefix = probe_interpreter(inventory.python_executable)["prefix"]
+    usage = measure_disk_usage(inventory.distributions, prefix)
+    _disk_usage_cache[key] = (inventory.fingerprint, usage)
+    return usage
+
+def format_bytes(size: float) -> str:
+    """Tamaño legible (B, KB, MB, GB, TB)."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+def disk_usage_report_section(python_executable: str) -> str:
+    """Bloque de comentarios para pyREPORT.txt con el uso de disco por paquete, de mayor a menor.
+
+    Va después de las dependencias, así que read_report() y 'pip install -r' lo ignoran.
+    """
+    try:
+        usage = get_disk_usage(python_executable)
+        names = {dist["canonical_name"]: dist["name"] for dist in PackageInventory(python_executable).load().distributions}
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired):
+        return ""
+    ordered = sorted(usage.items(), key=lambda item: item[1]["bytes"], reverse=True)
+    total = sum(totals["bytes"] for totals in usage.values())
+    lines = ["#", f"# Uso de disco: {format_bytes(total)} en {len(usage)} paquetes (mayor a menor)"]
+    for name, totals in ordered:
+        lines.append(f"# {format_bytes(totals['bytes']):>10}  {totals['files']:>7} archivos  "
+                     f"{totals['inodes']:>7} inodos  {names.get(name, name)}")
+    return "\n".join(lines) + "\n"
+
+# --- Reporte Estructurado (JSON Lines) ---
+STRUCTURED_REPORT_FILE = "pyREPORT.jsonl"
+STRUCTURED_REPORT_SCHEMA = 1
+# Campos y tipos de la cabecera; write_header() rechaza los que no cumplan
+STRUCTURED_REPORT_HEADER_FIELDS = {
+    "schema": int, "generated": str, "environment": str, "python": str, "executable": str,
+    "prefix": str, "fingerprint": str, "packages": int, "sorted": bool,
+}
+_BINARY_SEARCH_WINDOW = 4096  # Por debajo de esta ventana se lee secuencialmente
+
+class StructuredReportWriter:
+    """Escritor en streaming de pyREPORT.jsonl: una cabecera tipada y un registro por paquete.
+
+    Cada registro se serializa y se escribe en cuanto llega, así que la memoria no
+    depende del número de paquetes. Se escribe en un temporal que se renombra al
+    cerrar, y solo si todo fue bien.
+    """
+    
+    def __init__(self, path: str = STRUCTURED_REPORT_FILE):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.count = 0
+        self._file = None
+        self._last_key = None
+        self._sorted = False
+    
+    def __enter__(self) -> "StructuredReportWriter":
+        self._file = open(self.tmp_path, 'w', encoding='utf-8', newline='\n')
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            try:
+                os.remove(self.tmp_path)
+            except OSError:
+                pass
+        return False
+    
+    def write_header(self, header: dict) -> None:
+        """Escribe la cabecera; debe ser el primer registro."""
+        if self.count or self._file.tell():
+            raise ValueError("La cabecera debe ser el primer registro del reporte")
+        for field, expected in STRUCTURED_REPORT_HEADER_FIELDS.items():
+            if not isinstance(header.get(field), expected):
+                raise ValueError(f"Campo de cabecera '{field}' ausente o no es {expected.__name__}")
+        self._sorted = header["sorted"]
+        self._file.write(json.dumps({"type": "header", **header}, ensure_ascii=False) + "\n")
+    
+    def write_package(self, record: dict) -> None:
+        """Escribe un paquete; con cabecera 'sorted' deben llegar ordenados por canonical_name."""
+        key = record["canonical_name"]
+        if self._sorted and self._last_key is not None and key < self._last_key:
+            raise ValueError(f"Paquetes fuera de orden: {key} después de {self._last_key}")
+        self._last_key = key
+        self._file.write(json.dumps({"type": "package", **record}, ensure_ascii=False) + "\n")
+        self.count += 1
+
+class StructuredReport:
+    """Lector perezoso de pyREPORT.jsonl.
+
+    La cabecera se lee sola (primera línea); packages() decodifica un registro cada vez
+    y get() busca un paquete por búsqueda binaria sobre los bytes del archivo, porque
+    los registros están ordenados por nombre normalizado: consultar un paquete en un
+    reporte de 10.000 solo decodifica unas decenas de líneas.
+    """
+    
+    def __init__(self, path: str = STRUCTURED_REPORT_FILE):
+        self.path = path
+        self._header = None
+        self._header_size = 0
+    
+    @property
+    def header(self) -> dict:
+        if self._header is None:
+            with open(self.path, 'rb') as report_file:
+                line = report_file.readline()
+            record = json.loads(line) if line.strip() else {}
+            if record.get("type") != "header" or record.get("schema") != STRUCTURED_REPORT_SCHEMA:
+                raise ValueError(f"{self.path} no es un reporte estructurado compatible")
+            self._header = record
+            self._header_size = len(line)
+        return self._header
+    
+    def packages(self):
+        """Itera los registros de paquetes sin cargar el archivo completo."""
+        self.header  # Valida la cabecera y calcula dónde empiezan los paquetes
+        with open(self.path, 'rb') as report_file:
+            report_file.seek(self._header_size)
+            for line in report_file:
+                if line.strip():
+                    record = json.loads(line)
+                    if record.get("type") == "package":
+                        yield record
+    
+    def __iter__(self):
+        return self.packages()
+    
+    def get(self, name: str) -> Optional[dict]:
+        """Registro de un paquete por nombre (se normaliza), o None si no está."""
+        target = canonicalize_name(name)
+        if not self.header.get("sorted"):
+            return next((record for record in self.packages() if record["canonical_name"] == target), None)
+        with open(self.path, 'rb') as report_file:
+            low = self._header_size
+            high = report_file.seek(0, os.SEEK_END)
+            while high - low > _BINARY_SEARCH_WINDOW:
+                middle = (low + high) // 2
+                report_file.seek(middle - 1)
+                report_file.readline()  # Avanzar al inicio del siguiente registro
+                start = report_file.tell()
+                if start >= high:
+                    break
+                record = json.loads(report_file.readline())
+                key = record.get("canonical_name", "")
+                if key == target:
+                    return record
+                if key < target:
+                    low = report_file.tell()
+                else:
+                    high = start
+            report_file.seek(low)
+            while report_file.tell() < high:
+                line = report_file.readline()
+                if not line:
+                    break
+                record = json.loads(line)
+                if record.get("canonical_name") == target:
+                    return record
+        return None
+    
+    def freeze_lines(self):
+        """Líneas tipo 'pip freeze' de los paquetes que las tienen, en orden del reporte."""
+        return (record["requirement"] for record in self.packages() if record.get("requirement"))
+
+def write_structured_report(python_executable: str, environment: str, path: str = STRUCTURED_REPORT_FILE) -> int:
+    """Genera pyREPORT.jsonl para el intérprete indicado. Devuelve el número de paquetes escritos."""
+    inventory = PackageInventory(python_executable).load()
+    interpreter = probe_interpreter(python_executable)
+    graph = get_dependency_graph(python_executable)
+    try:
+        usage = get_disk_usage(python_executable)
+    except (OSError, RuntimeError, ValueError):
+        usage = {}
+    distributions = sorted(inventory.distributions, key=lambda dist: dist["canonical_name"])
+    with StructuredReportWriter(path) as writer:
+        writer.write_header({
+            "schema": STRUCTURED_REPORT_SCHEMA,
+            "generated": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "environment": environment,
+            "python": ".".join(str(part) for part in interpreter["version_info"]),
+            "executable": python_executable,
+            "prefix": interpreter["prefix"],
+            "fingerprint": inventory.fingerprint,
+            "packages": len(distributions),
+            "sorted": True,
+        })
+        for dist in distributions:
+            totals = usage.get(dist["canonical_name"], {})
+            writer.write_package({
+                "name": dist["name"],
+                "canonical_name": dist["canonical_name"],
+                "version": dist["version"],
+                "location": dist["location"],
+                "installer": dist["installer"],
+                "requested": dist["requested"],
+                "bytes": totals.get("bytes"),
+                "files": totals.get("files"),
+                "requires": sorted(graph.forward.get(dist["canonical_name"], ())),
+                "requirement": _format_freeze_requirement(dist),
+            })
+    return writer.count
+
+# --- Comparación de Instantáneas (diff) ---
+_EGG_FRAGMENT_RE = re.compile(r"[#&]egg=([A-Za-z0-9._-]+)")
+_EDITABLE_COMMENT_RE = re.compile(r"#\s*Editable\b.*\(([^()]+)\)\s*$")
+
+def _snapshot_entry(requirement: str) -> Optional[Tuple[str, str]]:
+    """(nombre, versión) de una línea de 'pip freeze'; las URL y editables usan la referencia como versión."""
+    if requirement.startswith("-e "):
+        match = _EGG_FRAGMENT_RE.search(requirement)
+        return (match.group(1), requirement[3:].strip()) if match else None
+    name = _requirement_name(requirement)
+    if "===" in requirement:  # Versión legacy (no PEP 440)
+        return name, requirement.split("===", 1)[1].strip()
+    if "==" in requirement:
+        return name, requirement.split("==", 1)[1].strip()
+    if " @ " in requirement:
+        return name, requirement.split(" @ ", 1)[1].strip()
+    return name, ""
+
+def _freeze_snapshot(lines) -> dict:
+    """Instantánea de líneas de 'pip freeze', incluidos sus comentarios.
+
+    Un editable sin '#egg=' toma nombre y versión del comentario '# Editable ... (nombre==versión)'
+    que pip escribe justo antes de la línea '-e'.
+    """
+    packages = {}
+    editable = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith("#"):
+            match = _EDITABLE_COMMENT_RE.match(line)
+            editable = _snapshot_entry(match.group(1)) if match else None
+            continue
+        if not line:
+            continue
+        entry = editable if editable and line.startswith("-e ") else _snapshot_entry(line)
+        editable = None
+        if entry:
+            packages[canonicalize_name(entry[0])] = entry
+    return packages
+
+def load_snapshot(source: str, freeze_format: bool = False) -> Tuple[str, dict]:
+    """Carga una instantánea {nombre normalizado: (nombre, versión)} y una etiqueta para mostrarla.
+
+    `source` puede ser un pyREPORT.txt, un pyREPORT.jsonl, 'live' (el entorno activo de
+    env_manager), '@N' (la instantánea N del historial), un directorio de venv/conda o un
+    ejecutable Python. Con `freeze_format` un entorno se lee como lo escribiría 'pip freeze'
+    (URL, editables y versiones '==='), para compararlo con un pyREPORT.txt.
+    """
+    if re.fullmatch(r"@\d+", source):
+        with SnapshotStore() as store:
+            packages = store.packages(int(source[1:]))
+        if not packages:
+            raise ValueError(f"No existe la instantánea {source} en el historial")
+        return f"historial {source}", {name: (name, version) for name, version in packages.items()}
+    if source == "live":
+        python_executable = env_manager.get_pip_executable()
+    elif os.path.isfile(source) and source.endswith(".jsonl"):
+        return source, {record["canonical_name"]: (record["name"], record["version"])
+                        for record in StructuredReport(source).packages()}
+    elif os.path.isfile(source) and (source.endswith(".txt") or not os.access(source, os.X_OK)):
+        with open(source, "r", encoding="utf-8") as report_file:
+            return source, _freeze_snapshot(report_file)
+    else:
+        python_executable = resolve_fleet_python(source)
+        if python_executable is None:
+            raise ValueError(f"No es un reporte ni un entorno Python: {source}")
+    inventory = PackageInventory(python_executable).load()
+    if freeze_format:
+        # Editables con VCS: sin pip no hay línea de freeze, se usa la versión instalada
+        lines = [_format_freeze_requirement(dist) or f"{dist['name']}=={dist['version']}"
+                 for dist in inventory.distributions]
+        return f"{python_executable} (en vivo)", _freeze_snapshot("\n".join(lines).splitlines())
+    return f"{python_executable} (en vivo)", {dist["canonical_name"]: (dist["name"], dist["version"])
+                                              for dist in inventory.distributions}
+
+def _snapshot_python(source: str) -> Optional[str]:
+    """Ejecutable Python si la fuente de load_snapshot() es un entorno y no un reporte o '@N'."""
+    if source == "live":
+        return env_manager.get_pip_executable()
+    if re.fullmatch(r"@\d+", source) or (os.path.isfile(source) and (source.endswith((".txt", ".jsonl"))
+                                                                       or not os.access(source, os.X_OK))):
+        return None
+    return resolve_fleet_python(source)
+
+def load_snapshot_pair(old_source: str, new_source: str) -> Tuple[Tuple[str, dict], Tuple[str, dict]]:
+    """Carga dos instantáneas comparables.
+
+    Un pyREPORT.txt sale de 'pip freeze', que omite pip (y setuptools, wheel y distribute
+    antes de Python 3.12) y escribe URL, editables y versiones legacy a su manera; si solo
+    un lado es un .txt, el otro se lee en formato freeze y se le quitan esos paquetes para
+    que no aparezcan como diferencias.
+    """
+    probe_interpreters([python_executable for python_executable in map(_snapshot_python, (old_source, new_source))
+                        if python_executable])
+    freeze_based = [source.endswith(".txt") and os.path.isfile(source) for source in (old_source, new_source)]
+    mixed = freeze_based[0] != freeze_based[1]
+    old = load_snapshot(old_source, freeze_format=mixed and not freeze_based[0])
+    new = load_snapshot(new_source, freeze_format=mixed and not freeze_based[1])
+    if mixed:
+        report, other = (old, new) if freeze_based[0] else (new, old)
+        for key in {"pip", "setuptools", "wheel", "distribute"} - report[1].keys():
+            other[1].pop(key, None)
+    return old, new
+
+def diff_snapshots(old: dict, new: dict) -> dict:
+    """Diferencias entre dos instantáneas indexadas por nombre normalizado.
+
+    Devuelve {'added', 'removed', 'upgraded', 'downgraded', 'changed', 'unchanged'}: las
+    cinco primeras son listas ordenadas de (nombre, versión anterior, versión nueva) y
+    'unchanged' un contador. Las versiones se comparan según PEP 440 (1.0 == 1.0.0);
+    'changed' recoge las que no se pueden ordenar (URL, editables, versiones legacy).
+    """
+    result = {"added": [], "removed": [], "upgraded": [], "downgraded": [], "changed": [], "unchanged": 0}
+    for key in old.keys() - new.keys():
+        result["removed"].append((old[key][0], old[key][1], ""))
+    for key in new.keys() - old.keys():
+        result["added"].append((new[key][0], "", new[key][1]))
+    for key in old.keys() & new.keys():
+        old_version, new_version = old[key][1], new[key][1]
+        if old_version == new_version:
+            result["unchanged"] += 1  # Caso habitual: sin analizar versiones
+            continue
+        old_key, new_key = version_sort_key(old_version), version_sort_key(new_version)
+        if old_key[0] and new_key[0] and old_key == new_key:
+            result["unchanged"] += 1
+        elif not (old_key[0] and new_key[0]):
+            result["changed"].append((new[key][0], old_version, new_version))
+        else:
+            result["upgraded" if new_key > old_key else "downgraded"].append((new[key][0], old_version, new_version))
+    for kind in ("added", "removed", "upgraded", "downgraded", "changed"):
+        result[kind].sort(key=lambda row: row[0].lower())
+    return result
+
+# --- Historial de Instantáneas (SQLite) ---
+HISTORY_DB_FILE = "history.sqlite3"
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS environments (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    label TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS package_sets (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE,
+    package_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS set_members (
+    set_id INTEGER NOT NULL,
+    package TEXT NOT NULL,
+    version TEXT NOT NULL,
+    PRIMARY KEY (set_id, package)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    env_id INTEGER NOT NULL,
+    taken_at REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    set_id INTEGER NOT NULL,
+    total_bytes INTEGER,
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS snapshots_env_time ON snapshots (env_id, taken_at);
+CREATE INDEX IF NOT EXISTS snapshots_set ON snapshots (set_id);
+CREATE INDEX IF NOT EXISTS set_members_package_version ON set_members (package, version);
+"""
+
+class SnapshotStore:
+    """Historial de reportes en SQLite, deduplicado por contenido.
+
+    Cada conjunto distinto de (paquete, versión) se guarda una sola vez en
+    package_sets/set_members y las instantáneas solo apuntan a él. Si un entorno no
+    cambió desde su última instantánea (mismo conjunto y tamaño) solo se actualiza
+    'last_seen', así que los reportes horarios de un entorno estable no crecen la base.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        import sqlite3
+        self.path = path or os.path.join(get_cache_dir(), HISTORY_DB_FILE)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        # WAL: los procesos del modo flota pueden grabar a la vez sin bloquear las consultas
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(HISTORY_SCHEMA)
+    
+    def close(self) -> None:
+        self.connection.close()
+    
+    def __enter__(self) -> "SnapshotStore":
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+    
+    def _environment_id(self, key: str, label: str) -> int:
+        self.connection.execute("INSERT OR IGNORE INTO environments (key, label) VALUES (?, ?)", (key, label))
+        return self.connection.execute("SELECT id FROM environments WHERE key = ?", (key,)).fetchone()[0]
+    
+    def environment_id(self, key: str) -> Optional[int]:
+        """Id de un entorno por su clave (prefijo normalizado), o None si no tiene historial."""
+        row = self.connection.execute("SELECT id FROM environments WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def record(self, key: str, label: str, packages: dict, total_bytes: Optional[int] = None,
+               fingerprint: str = "", taken_at: Optional[float] = None) -> int:
+        """Guarda una instantánea {nombre normalizado: versión} y devuelve su id."""
+        taken_at = time.time() if taken_at is None else taken_at
+        digest = hashlib.sha1("\n".join(f"{name}=={packages[name]}" for name in sorted(packages))
+                              .encode("utf-8", "surrogateescape")).hexdigest()
+        with self.connection:
+            env_id = self._environment_id(key, label)
+            row = self.connection.execute("SELECT id FROM package_sets WHERE digest = ?", (digest,)).fetchone()
+            if row:
+                set_id = row[0]
+            else:
+                set_id = self.connection.execute("INSERT INTO package_sets (digest, package_count) VALUES (?, ?)",
+                                                 (digest, len(packages))).lastrowid
+                self.connection.executemany("INSERT INTO set_members (set_id, package, version) VALUES (?, ?, ?)",
+                                            ((set_id, name, version) for name, version in packages.items()))
+            latest = self.connection.execute(
+                "SELECT id, set_id, total_bytes FROM snapshots WHERE env_id = ? ORDER BY taken_at DESC LIMIT 1",
+                (env_id,)).fetchone()
+            if latest and latest[1] == set_id and latest[2] == total_bytes:
+                self.connection.execute("UPDATE snapshots SET last_seen = ?, fingerprint = ? WHERE id = ?",
+                                        (taken_at, fingerprint, latest[0]))
+                return latest[0]
+            return self.connection.execute(
+                "INSERT INTO snapshots (env_id, taken_at, last_seen, set_id, total_bytes, fingerprint) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (env_id, taken_at, taken_at, set_id, total_bytes, fingerprint)).lastrowid
+    
+    def environments(self) -> List[dict]:
+        """Entornos con historial: id, clave, etiqueta, número de instantáneas y última vez visto."""
+        rows = self.connection.execute(
+            "SELECT e.id, e.key, e.label, COUNT(s.id), MAX(s.last_seen) FROM environments e "
+            "LEFT JOIN snapshots s ON s.env_id = e.id GROUP BY e.id ORDER BY e.label").fetchall()
+        return [{"id": row[0], "key": row[1], "label": row[2], "snapshots": row[3], "last_seen": row[4]} for row in rows]
+    
+    def snapshots(self, env_id: int, since: Optional[float] = None) -> List[dict]:
+        """Instantáneas de un entorno en orden cronológico (usa el índice (env, tiempo))."""
+        rows = self.connection.execute(
+            "SELECT s.id, s.taken_at, s.last_seen, s.total_bytes, p.package_count FROM snapshots s "
+            "JOIN package_sets p ON p.id = s.set_id WHERE s.env_id = ? AND s.last_seen >= ? ORDER BY s.taken_at",
+            (env_id, since or 0)).fetchall()
+        return [{"id": row[0], "taken_at": row[1], "last_seen": row[2], "total_bytes": row[3], "packages": row[4]}
+                for row in rows]
+    
+    def size_trend(self, env_id: int, days: float = 90) -> List[Tuple[float, Optional[int], int]]:
+        """(momento, bytes, paquetes) de las instantáneas de los últimos `days` días."""
+        return [(snapshot["taken_at"], snapshot["total_bytes"], snapshot["packages"])
+                for snapshot in self.snapshots(env_id, time.time() - days * 86400)]
+    
+    def package_history(self, env_id: int, package: str) -> List[Tuple[float, Optional[str]]]:
+        """Cambios de un paquete en un entorno: [(momento, versión o None si desapareció)].
+
+        El primer elemento con versión responde a "¿cuándo apareció este paquete?".
+        """
+        rows = self.connection.execute(
+            "SELECT s.taken_at, m.version FROM snapshots s LEFT JOIN set_members m "
+            "ON m.set_id = s.set_id AND m.package = ? WHERE s.env_id = ? ORDER BY s.taken_at",
+            (canonicalize_name(package), env_id)).fetchall()
+        changes = []
+        previous = None
+        for taken_at, version in rows:
+            if version != previous and (changes or version is not None):
+                changes.append((taken_at, version))
+            previous = version
+        return changes
+    
+    def environments_with(self, package: str, version: Optional[str] = None) -> List[Tuple[str, str, float]]:
+        """Entornos cuya última instantánea contiene el paquete (y versión): [(etiqueta, versión, momento)]."""
+        query = ("SELECT e.label, m.version, s.last_seen FROM environments e "
+                 "JOIN snapshots s ON s.id = (SELECT id FROM snapshots WHERE env_id = e.id ORDER BY taken_at DESC LIMIT 1) "
+                 "JOIN set_members m ON m.set_id = s.set_id AND m.package = ?" + (" AND m.version = ?" if version else "") +
+                 " ORDER BY e.label")
+        parameters = (canonicalize_name(package), version) if version else (canonicalize_name(package),)
+        return [tuple(row) for row in self.connection.execute(query, parameters)]
+    
+    def packages(self, snapshot_id: int) -> dict:
+        """{nombre normalizado: versión} de una instantánea."""
+        return dict(self.connection.execute(
+            "SELECT m.package, m.version FROM snapshots s JOIN set_members m ON m.set_id = s.set_id WHERE s.id = ?",
+            (snapshot_id,)).fetchall())
+    
+    def compact(self, keep_all_days: float = 7, max_age_days: float = 365, now: Optional[float] = None) -> dict:
+        """Aplica la retención y libera el espacio.
+
+        Las instantáneas de los últimos `keep_all_days` días se conservan todas; las
+        anteriores se reducen a la última de cada día por entorno; las de más de
+        `max_age_days` se eliminan salvo la más reciente de cada entorno. Después se
+        borran los conjuntos de paquetes sin referencias y se hace VACUUM.
+        """
+        now = time.time() if now is None else now
+        keep_all_since = now - keep_all_days * 86400
+        oldest_allowed = now - max_age_days * 86400
+        with self.connection:
+            thinned = self.connection.execute(
+                "DELETE FROM snapshots WHERE taken_at < ? AND id NOT IN ("
+                "SELECT id FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY env_id, CAST(taken_at / 86400 AS INTEGER) "
+                "ORDER BY taken_at DESC) AS position FROM snapshots WHERE taken_at < ?) WHERE position = 1)",
+                (keep_all_since, keep_all_since)).rowcount
+            expired = self.connection.execute(
+                "DELETE FROM snapshots WHERE last_seen < ? AND taken_at < (SELECT MAX(taken_at) FROM snapshots AS latest "
+                "WHERE latest.env_id = snapshots.env_id)", (oldest_allowed,)).rowcount
+            sets = self.connection.execute(
+                "DELETE FROM package_sets WHERE id NOT IN (SELECT DISTINCT set_id FROM snapshots)").rowcount
+            self.connection.execute("DELETE FROM set_members WHERE set_id NOT IN (SELECT id FROM package_sets)")
+        size_before = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self.connection.execute("VACUUM")
+        size_after = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {"thinned": thinned, "expired": expired, "sets": sets, "bytes": max(0, size_before - size_after)}
+
+def record_history_snapshot(python_executable: str, label: Optional[str] = None) -> Optional[int]:
+    """Guarda el estado actual del intérprete en el historial. El historial es opcional: nunca lanza."""
+    import sqlite3
+    try:
+        inventory = PackageInventory(python_executable).load()
+        prefix = probe_interpreter(python_executable)["prefix"]
+        try:
+            total_bytes = sum(totals["bytes"] for totals in get_disk_usage(python_executable).values())
+        except (OSError, RuntimeError, ValueError):
+            total_bytes = None
+        with SnapshotStore() as store:
+            return store.record(os.path.normcase(os.path.abspath(prefix)), label or prefix,
+                                {dist["canonical_name"]: dist["version"] for dist in inventory.distributions},
+                                total_bytes, inventory.fingerprint)
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired, sqlite3.Error):
+        return None
+
+# --- Deduplicación entre Entornos (Enlaces Duros) ---
+DEDUP_STATE_FORMAT = 1
+DEDUP_MIN_BYTES = 1024  # Por debajo de un bloque el ahorro no compensa
+DEDUP_WORKERS = NATIVE_UNINSTALL_WORKERS
+_DEDUP_LINK_SUFFIX = ".pycleaner-link"
+
+def _dedup_state_file() -> str:
+    """Ruta del estado incremental de la deduplicación."""
+    return os.path.join(get_cache_dir(), "dedup-state.json")
+
+def _load_dedup_state() -> dict:
+    """Distribuciones ya analizadas: {info_path: {'signature', 'location', 'files'}}."""
+    try:
+        with open(_dedup_state_file(), 'r', encoding='utf-8') as state_file:
+            state = json.load(state_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(state, dict) or state.get("format") != DEDUP_STATE_FORMAT:
+        return {}
+    return state.get("distributions", {})
+
+def _store_dedup_state(distributions: dict) -> None:
+    """Guarda el estado de la deduplicación (escritura atómica)."""
+    try:
+        state_path = _dedup_state_file()
+        tmp_path = f"{state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as state_file:
+            json.dump({"format": DEDUP_STATE_FORMAT, "distributions": distributions}, state_file)
+        os.replace(tmp_path, state_path)
+    except OSError:
+        pass  # Sin estado la próxima ejecución simplemente vuelve a analizar todo
+
+def _hash_file(path: str) -> str:
+    """sha256 de un archivo en el formato de RECORD (sha256=<base64 urlsafe sin relleno>)."""
+    import base64
+    digest = hashlib.sha256()
+    with open(path, 'rb') as data:
+        for block in iter(lambda: data.read(1 << 20), b""):
+            digest.update(block)
+    return "sha256=" + base64.urlsafe_b64encode(digest.digest()).rstrip(b"=").decode("ascii")
+
+def _record_signature(dist: dict) -> Optional[list]:
+    """Firma del RECORD (mtime, inodo, tamaño): cambia si la distribución se reinstala."""
+    try:
+        record_stat = os.stat(os.path.join(dist["info_path"], "RECORD"))
+    except OSError:
+        return None
+    return [record_stat.st_mtime_ns, record_stat.st_ino, record_stat.st_size]
+
+def _scan_dedup_files(dist: dict, prefix: str) -> Tuple[List[list], int]:
+    """Archivos deduplicables de una distribución y cuántos hubo que volver a hashear.
+
+    Cada archivo es [ruta en RECORD, sha256, tamaño, bytes asignados, dispositivo, inodo,
+    mtime_ns, permisos]. Se usa el sha256 de RECORD mientras el tamaño coincida y el
+    archivo no se haya modificado después de escribirse RECORD; si no, se recalcula.
+    Como en la desinstalación nativa, un RECORD con rutas fuera del entorno se ignora.
+    """
+    import csv
+    import stat
+    location = os.path.normcase(os.path.abspath(dist["location"]))
+    prefix = os.path.normcase(os.path.abspath(prefix))
+    record_path = os.path.join(dist["info_path"], "RECORD")
+    try:
+        record_mtime = os.stat(record_path).st_mtime_ns
+        with open(record_path, 'r', encoding='utf-8', newline='') as record_file:
+            rows = list(csv.reader(record_file))
+    except OSError:
+        return [], 0
+    
+    files = []
+    rehashed = 0
+    for row in rows:
+        if not row or not row[0]:
+            continue
+        path = os.path.normcase(os.path.abspath(os.path.join(dist["location"], row[0])))
+        if not (_is_within(path, location) or _is_within(path, prefix)):
+            return [], 0
+        try:
+            file_stat = os.lstat(path)
+        except OSError:
+            continue
+        if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_size < DEDUP_MIN_BYTES:
+            continue
+        recorded = row[1] if len(row) > 1 and row[1].startswith("sha256=") else ""
+        recorded_size = row[2] if len(row) > 2 else ""
+        if recorded and recorded_size == str(file_stat.st_size) and file_stat.st_mtime_ns <= record_mtime:
+            digest = recorded
+        else:
+            try:
+                digest = _hash_file(path)
+            except OSError:
+                continue
+            rehashed += 1
+        files.append([row[0], digest, file_stat.st_size, _allocated_size(file_stat), file_stat.st_dev,
+                      file_stat.st_ino, file_stat.st_mtime_ns, stat.S_IMODE(file_stat.st_mode)])
+    return files, rehashed
+
+def _replace_with_link(source: str, target: str) -> Optional[str]:
+    """Sustituye `target` por un enlace duro a `source` de forma atómica. Devuelve el error o None."""
+    tmp_path = target + _DEDUP_LINK_SUFFIX
+    try:
+        os.link(source, tmp_path)
+        os.replace(tmp_path, target)
+    except OSError as e:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return f"{target}: {e.strerror or e}"
+    return None
+
+def _unchanged(path: str, entry: list) -> bool:
+    """True si el archivo sigue siendo el mismo inodo, con el mismo tamaño y mtime que al analizarlo."""
+    try:
+        file_stat = os.lstat(path)
+    except OSError:
+        return False
+    return (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns) == (entry[5], entry[2], entry[6])
+
+def dedupe_environments(python_executables: List[str], dry_run: bool = True, workers: int = DEDUP_WORKERS) -> dict:
+    """Sustituye por enlaces duros los archivos idénticos instalados en varios venvs.
+
+    Los archivos se agrupan por (dispositivo, sha256, tamaño, permisos), así que solo se
+    enlazan archivos del mismo sistema de archivos con el mismo modo. En cada grupo se
+    conserva el inodo que ya tiene más rutas y el resto se reemplaza con os.link +
+    os.replace, comprobando justo antes que ninguno de los dos archivos cambió.
+
+    Es incremental: las distribuciones cuyo RECORD no cambió desde la última ejecución
+    reutilizan el análisis guardado y solo se enlazan grupos con alguna distribución
+    nueva. Con `dry_run` no se modifica nada, pero el análisis se guarda igualmente.
+
+    Devuelve {'environments', 'distributions', 'scanned', 'rehashed', 'files', 'groups',
+    'linked', 'bytes', 'errors', 'elapsed'}.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    start = time.perf_counter()
+    state = {info_path: entry for info_path, entry in _load_dedup_state().items() if os.path.isdir(info_path)}
+    stats = {"environments": 0, "distributions": 0, "scanned": 0, "rehashed": 0, "files": 0,
+             "groups": 0, "linked": 0, "bytes": 0, "errors": [], "elapsed": 0.0}
+    
+    current = {}  # info_path -> entrada de estado de esta ejecución
+    jobs = []
+    probe_interpreters(python_executables)
+    for python_executable in python_executables:
+        try:
+            inventory = PackageInventory(python_executable).load()
+            prefix = probe_interpreter(python_executable)["prefix"]
+        except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+            stats["errors"].append(f"{python_executable}: {e}")
+            continue
+        stats["environments"] += 1
+        for dist in inventory.distributions:
+            if dist["kind"] != "dist-info" or dist["info_path"] in current:
+                continue
+            signature = _record_signature(dist)
+            previous = state.get(dist["info_path"])
+            if previous and signature is not None and previous.get("signature") == signature:
+                current[dist["info_path"]] = dict(previous, new=not previous.get("done"))
+            else:
+                current[dist["info_path"]] = {"signature": signature, "location": dist["location"], "files": [], "new": True}
+                jobs.append((dist, prefix))
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for (dist, _), (files, rehashed) in zip(jobs, pool.map(lambda job: _scan_dedup_files(*job), jobs)):
+            current[dist["info_path"]]["files"] = files
+            stats["rehashed"] += rehashed
+    stats["distributions"] = len(current)
+    stats["scanned"] = len(jobs)
+    
+    groups = {}
+    for info_path, entry in current.items():
+        for file_entry in entry["files"]:
+            key = (file_entry[4], file_entry[1], file_entry[2], file_entry[7])
+            groups.setdefault(key, []).append((info_path, file_entry))
+            stats["files"] += 1
+    
+    stale = set()
+    failed = set()
+    for members in groups.values():
+        inodes = {}
+        for _, file_entry in members:
+            inodes.setdefault(file_entry[5], []).append(file_entry)
+        if len(inodes) < 2 or not any(current[info_path]["new"] for info_path, _ in members):
+            continue
+        stats["groups"] += 1
+        keep_inode = max(inodes, key=lambda inode: (len(inodes[inode]), -min(entry[6] for entry in inodes[inode])))
+        source_info, source = next((info_path, file_entry) for info_path, file_entry in members if file_entry[5] == keep_inode)
+        source_path = os.path.join(current[source_info]["location"], source[0])
+        if not dry_run and not _unchanged(source_path, source):
+            stale.add(source_info)
+            continue
+        for inode, entries in inodes.items():
+            if inode == keep_inode:
+                continue
+            targets = [(info_path, file_entry) for info_path, file_entry in members if file_entry[5] == inode]
+            try:
+                # Solo se libera espacio si todas las rutas del inodo están en el grupo
+                frees_inode = os.lstat(os.path.join(current[targets[0][0]]["location"], targets[0][1][0])).st_nlink <= len(targets)
+            except OSError:
+                frees_inode = False
+            linked = 0
+            for info_path, file_entry in targets:
+                target_path = os.path.join(current[info_path]["location"], file_entry[0])
+                if dry_run:
+                    linked += 1
+                    continue
+                if not _unchanged(target_path, file_entry):
+                    stale.add(info_path)
+                    continue
+                error = _replace_with_link(source_path, target_path)
+                if error:
+                    stats["errors"].append(error)
+                    failed.update(member_info for member_info, _ in members)
+                    continue
+                file_entry[4:7] = source[4:7]
+                linked += 1
+            stats["linked"] += linked
+            if linked == len(targets) and frees_inode:
+                stats["bytes"] += entries[0][3]
+    
+    # 'done' marca las distribuciones ya enlazadas; una simulación o un error las deja pendientes
+    for info_path, entry in current.items():
+        entry["done"] = not (entry.pop("new") and dry_run) and info_path not in failed
+    _store_dedup_state({info_path: entry for info_path, entry in {**state, **current}.items() if info_path not in stale})
+    if stats["linked"] and not dry_run:
+        _disk_usage_cache.clear()
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+# --- Planificador de Desinstalación en Paralelo ---
+DEFAULT_UNINSTALL_WORKERS = max(1, min(8, os.cpu_count() or 1))
+UNINSTALL_LAST = ("setuptools", "wheel", "pip")  # pip el último: el motor pip lo necesita hasta el final
+
+def _top_level_keys(dist: Optional[dict], package: str) -> set:
+    """Claves de conflicto de un paquete: los directorios de primer nivel que toca.
+
+    Se obtienen del RECORD (o de top_level.txt en instalaciones *.egg-info). Los
+    archivos sueltos de primer nivel y de `__pycache__` cuentan por sí mismos, y las
+    rutas fuera de site-packages (scripts) por su ruta absoluta.
+    """
+    if dist is None:
+        return {canonicalize_name(package)}
+    keys = set()
+    record_path = os.path.join(dist["info_path"], "RECORD")
+    if dist["kind"] == "dist-info" and os.path.isfile(record_path):
+        import csv
+        try:
+            with open(record_path, 'r', encoding='utf-8', newline='') as record_file:
+                for row in csv.reader(record_file):
+                    if not row or not row[0]:
+                        continue
+                    parts = row[0].replace('\\', '/').split('/')
+                    if parts[0] == '..':
+                        keys.add(os.path.normcase(os.path.abspath(os.path.join(dist["location"], row[0]))))
+                    elif len(parts) == 1 or parts[0] == '__pycache__':
+                        keys.add('/'.join(parts))
+                    else:
+                        keys.add(parts[0])
+        except OSError:
+            pass
+    else:
+        try:
+            with open(os.path.join(dist["info_path"], "top_level.txt"), 'r', encoding='utf-8') as f:
+                keys.update(line.strip() for line in f if line.strip())
+        except OSError:
+            pass
+    keys.discard(os.path.basename(dist["info_path"]))
+    keys.add(dist["canonical_name"])
+    return keys
+
+class UninstallScheduler:
+    """Ejecuta desinstalaciones independientes en paralelo con un pool acotado y adaptativo.
+
+    Cada trabajo es un paquete (motor nativo) o un lote de pip. Nunca se ejecutan a la
+    vez dos trabajos que toquen los mismos directorios de primer nivel (p. ej. paquetes
+    de un mismo namespace), y setuptools, wheel y pip se desinstalan al final, en serie.
+
+    El número de trabajos simultáneos empieza en la mitad de `max_workers` y se ajusta
+    por rondas: sube mientras el rendimiento (paquetes/s) mejora y baja si empeora o si
+    hay timeouts.
+    """
+    
+    def __init__(self, python_executable: str, backend: str = "pip",
+                 chunk_size: int = DEFAULT_UNINSTALL_CHUNK_SIZE,
+                 max_workers: int = DEFAULT_UNINSTALL_WORKERS,
+                 on_chunk=None, on_chunk_done=None, on_result=None):
+        self.python_executable = python_executable
+        self.backend = backend
+        self.chunk_size = max(1, int(chunk_size))
+        self.max_workers = max(1, int(max_workers))
+        self.on_chunk = on_chunk
+        self.on_chunk_done = on_chunk_done
+        self.on_result = on_result
+        self.limit = max(1, self.max_workers // 2)
+        self.peak = 0
+    
+    def _build_jobs(self, packages: List[str]) -> Tuple[List[dict], List[dict]]:
+        """Agrupa los paquetes en trabajos y separa los que deben ir al final."""
+        by_name = {dist["canonical_name"]: dist
+                   for dist in PackageInventory(self.python_executable, use_cache=False).load().distributions}
+        native, pip_items, last = [], [], []
+        for package in packages:
+            dist = by_name.get(canonicalize_name(package))
+            keys = _top_level_keys(dist, package)
+            if canonicalize_name(package) in UNINSTALL_LAST:
+                last.append((package, dist, keys))
+            elif (self.backend == "nativo" and dist and dist["kind"] == "dist-info"
+                    and not dist["editable_location"]
+                    and os.path.exists(os.path.join(dist["info_path"], "RECORD"))):
+                native.append({"backend": "nativo", "packages": [package], "dists": [dist], "keys": keys})
+            else:
+                pip_items.append((package, dist, keys))
+        
+        jobs = list(native)
+        for i in range(0, len(pip_items), self.chunk_size):
+            chunk = pip_items[i:i + self.chunk_size]
+            jobs.append({"backend": "pip", "packages": [p for p, _, _ in chunk], "dists": [],
+                         "keys": set().union(*(k for _, _, k in chunk))})
+        
+        last.sort(key=lambda item: UNINSTALL_LAST.index(canonicalize_name(item[0])))
+        final = [{"backend": "pip", "packages": [p], "dists": [], "keys": k} for p, _, k in last]
+        return jobs, final
+    
+    def _run_job(self, job: dict) -> dict:
+        """Ejecuta un trabajo (en un hilo del pool) y devuelve sus estadísticas."""
+        start = time.perf_counter()
+        if job["backend"] == "nativo":
+            inner_workers = max(2, NATIVE_UNINSTALL_WORKERS // self.max_workers)
+            result = uninstall_distributions_native(self.python_executable, job["dists"], workers=inner_workers)
+            requested = {canonicalize_name(p): p for p in job["packages"]}
+            result["successful"] = [requested.get(canonicalize_name(n), n) for n in result["successful"]]
+            result["failed"] = [requested.get(canonicalize_name(n), n) for n in result["failed"]]
+            result["errors"] = {requested.get(canonicalize_name(n), n): e for n, e in result["errors"].items()}
+            result.update(pip_calls=0, retried=0, native=len(job["dists"]))
+        else:
+            result = uninstall_packages_batched(self.python_executable, job["packages"], len(job["packages"]))
+        result["elapsed"] = time.perf_counter() - start
+        return result
+    
+    def _adapt(self, round_rate: float, previous_rate: Optional[float], timed_out: bool) -> None:
+        """Ajusta el número de trabajos simultáneos según el rendimiento de la última ronda."""
+        if timed_out:
+            self.limit = max(1, self.limit - 1)
+        elif previous_rate is None or round_rate >= previous_rate * 1.05:
+            self.limit = min(self.max_workers, self.limit + 1)
+        elif round_rate < previous_rate * 0.9:
+            self.limit = max(1, self.limit - 1)
+    
+    def run(self, packages: List[str]) -> dict:
+        """Desinstala `packages` y devuelve las mismas estadísticas que uninstall_packages_batched()."""
+        from collections import deque
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        
+        start = time.perf_counter()
+        stats = {"successful": [], "failed": [], "errors": {}, "pip_calls": 0, "retried": 0,
+                 "chunk_size": self.chunk_size, "native": 0, "files_removed": 0}
+        jobs, final = self._build_jobs(packages)
+        total = len(jobs) + len(final)
+        for number, job in enumerate(jobs + final, 1):
+            job["index"] = number
+        
+        def finish(job: dict, result: dict) -> bool:
+            for key in ("pip_calls", "retried", "native", "files_removed"):
+                stats[key] += result.get(key, 0)
+            stats["errors"].update(result["errors"])
+            for package in job["packages"]:
+                ok = package in result["successful"]
+                (stats["successful"] if ok else stats["failed"]).append(package)
+                if self.on_result:
+                    self.on_result(package, ok, result["errors"].get(package, ""))
+            if self.on_chunk_done:
+                self.on_chunk_done(job["packages"], job["index"])
+            return any(message == "Timeout" for message in result["errors"].values())
+        
+        pending = deque(jobs)
+        active = {}
+        busy = set()
+        round_done, round_start, previous_rate = 0, time.perf_counter(), None
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or active:
+                # Lanzar en orden todo lo que quepa y no choque con trabajos en curso
+                blocked = deque()
+                while pending and len(active) < self.limit:
+                    job = pending.popleft()
+                    if job["keys"] & busy:
+                        blocked.append(job)
+                        continue
+                    busy |= job["keys"]
+                    if self.on_chunk:
+                        self.on_chunk(job["packages"], job["index"], total)
+                    active[pool.submit(self._run_job, job)] = job
+                pending.extendleft(reversed(blocked))
+                self.peak = max(self.peak, len(active))
+                
+                done, _ = wait(active, return_when=FIRST_COMPLETED)
+                timed_out = False
+                for future in done:
+                    job = active.pop(future)
+                    busy -= job["keys"]
+                    timed_out |= finish(job, future.result())
+                    round_done += len(job["packages"])
+                
+                if timed_out or round_done >= self.limit * self.chunk_size:
+                    rate = round_done / max(time.perf_counter() - round_start, 1e-6)
+                    self._adapt(rate, previous_rate, timed_out)
+                    previous_rate = rate
+                    round_done, round_start = 0, time.perf_counter()
+        
+        # setuptools, wheel y pip: en serie y al final
+        for job in final:
+            if self.on_chunk:
+                self.on_chunk(job["packages"], job["index"], total)
+            finish(job, self._run_job(job))
+        
+        stats["peak_workers"] = max(self.peak, 1 if final else 0)
+        stats["elapsed"] = time.perf_counter() - start
+        return stats
+
+def uninstall_packages(python_executable: str, packages: List[str], backend: str = "pip",
+                       chunk_size: int = DEFAULT_UNINSTALL_CHUNK_SIZE,
+                       on_chunk=None, on_result=None, on_chunk_done=None,
+                       max_workers: int = DEFAULT_UNINSTALL_WORKERS) -> dict:
+    """Desinstala paquetes con el motor elegido ('pip' o 'nativo') usando UninstallScheduler.
+
+    El motor nativo procesa las distribuciones *.dist-info con RECORD; las instalaciones
+    heredadas (*.egg-info), editables, sin RECORD o no encontradas se delegan a pip por lotes.
+    `on_chunk(paquetes, índice, total)` y `on_chunk_done(paquetes, índice)` marcan el inicio y
+    el fin de cada trabajo en curso. Devuelve las mismas estadísticas que uninstall_packages_batched().
+    """
+    scheduler = UninstallScheduler(python_executable, backend, chunk_size, max_workers,
+                                   on_chunk=on_chunk, on_chunk_done=on_chunk_done, on_result=on_result)
+    return scheduler.run(packages)
+
+# --- Recorrido Paralelo de Directorios ---
+WALK_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+WALK_SKIP_DIRS = frozenset(_VCS_MARKERS)
+
+def walk_parallel(roots: List[str], visit, on_result=None, workers: int = WALK_WORKERS) -> None:
+    """Recorre árboles de directorios en paralelo con os.scandir, sin construir listas de rutas.
+
+    Cada directorio es una tarea del pool: `visit(ruta, entradas)` se ejecuta en un hilo
+    y devuelve `(subdirectorios_a_recorrer, resultado)`; `on_result(resultado)` se llama
+    en el hilo que invoca, así que puede acumular sin bloqueos. En memoria solo viven
+    las entradas de los directorios en curso y la frontera de directorios pendientes.
+    Los enlaces simbólicos a directorios nunca se siguen.
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    
+    def scan(path: str):
+        try:
+            with os.scandir(path) as iterator:
+                entries = list(iterator)
+        except OSError:
+            return [], None
+        return visit(path, entries)
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {pool.submit(scan, root) for root in roots if os.path.isdir(root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirectories, result = future.result()
+                if result is not None and on_result:
+                    on_result(result)
+                pending.update(pool.submit(scan, path) for path in subdirectories)
+
+def _allocated_size(file_stat) -> int:
+    """Bytes realmente ocupados en disco (st_blocks; st_size donde no existe)."""
+    blocks = getattr(file_stat, "st_blocks", None)
+    return blocks * 512 if blocks is not None else file_stat.st_size
+
+# --- Limpieza de Bytecode ---
+_PYC_NAME_RE = re.compile(r"^(?P<stem>.+?)\.(?P<tag>[^.]+)(?:\.opt-\d+)?\.pyc$")
+
+def _tree_size(path: str) -> Tuple[int, int]:
+    """(archivos, bytes) de un directorio pequeño como __pycache__ (recorrido secuencial)."""
+    files = size = 0
+    try:
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    sub_files, sub_size = _tree_size(entry.path)
+                    files += sub_files
+                    size += sub_size
+                else:
+                    files += 1
+                    size += _allocated_size(entry.stat(follow_symlinks=False))
+    except OSError:
+        pass
+    return files, size
+
+def clean_bytecode(roots: List[str], cache_tag: str, dry_run: bool = True, stale_only: bool = False,
+                   workers: int = WALK_WORKERS) -> dict:
+    """Elimina bytecode de uno o varios árboles (proyecto, venv, site-packages).
+
+    Por defecto borra todos los directorios __pycache__. Con `stale_only` solo borra los
+    .pyc de __pycache__ cuyo .py ya no existe o compilados para otra etiqueta de
+    intérprete distinta de `cache_tag` (p. ej. cpython-311). Los .pyc/.pyo heredados
+    junto al código solo se borran si su .py existe: sin él son módulos sin fuente que
+    todavía se importan. Con `dry_run` no se borra nada y solo se cuenta.
+
+    Devuelve {'files', 'dirs', 'bytes', 'errors', 'examples'}.
+    """
+    import shutil
+    
+    def visit(path: str, entries: list):
+        names = {entry.name for entry in entries}
+        result = {"files": 0, "dirs": 0, "bytes": 0, "errors": 0, "examples": []}
+        subdirectories = []
+        
+        def remove(target: str, files: int, size: int, is_dir: bool) -> None:
+            if not dry_run:
+                try:
+                    if is_dir:
+                        shutil.rmtree(target)
+                    else:
+                        os.unlink(target)
+                except OSError:
+                    result["errors"] += 1
+                    return
+            result["files"] += files
+            result["dirs"] += 1 if is_dir else 0
+            result["bytes"] += size
+            if len(result["examples"]) < 5:
+                result["examples"].append(target)
+        
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if entry.name in WALK_SKIP_DIRS:
+                    continue
+                if entry.name != "__pycache__":
+                    subdirectories.append(entry.path)
+                elif not stale_only:
+                    files, size = _tree_size(entry.path)
+                    remove(entry.path, files, size, True)
+                else:
+                    removed = kept = 0
+                    try:
+                        with os.scandir(entry.path) as cache_entries:
+                            for cached in cache_entries:
+                                match = _PYC_NAME_RE.match(cached.name)
+                                if not match or not cached.is_file(follow_symlinks=False):
+                                    kept += 1
+                                    continue
+                                if match.group("tag") == cache_tag and f"{match.group('stem')}.py" in names:
+                                    kept += 1
+                                    continue
+                                remove(cached.path, 1, _allocated_size(cached.stat(follow_symlinks=False)), False)
+                                removed += 1
+                    except OSError:
+                        result["errors"] += 1
+                    if removed and not kept:
+                        try:
+                            if not dry_run:
+                                os.rmdir(entry.path)
+                            result["dirs"] += 1
+                        except OSError:
+                            pass
+            elif entry.name.endswith((".pyc", ".pyo")) and entry.name[:-4] + ".py" in names:
+                try:
+                    remove(entry.path, 1, _allocated_size(entry.stat(follow_symlinks=False)), False)
+                except OSError:
+                    result["errors"] += 1
+        return subdirectories, result
+    
+    totals = {"files": 0, "dirs": 0, "bytes": 0, "errors": 0, "examples": []}
+    
+    def accumulate(result: dict) -> None:
+        for key in ("files", "dirs", "bytes", "errors"):
+            totals[key] += result[key]
+        totals["examples"].extend(result["examples"][:max(0, 10 - len(totals["examples"]))])
+    
+    start = time.perf_counter()
+    walk_parallel([os.path.abspath(root) for root in roots], visit, accumulate, workers)
+    totals["elapsed"] = time.perf_counter() - start
+    return totals
+
+# --- Limpieza de Artefactos de Compilación ---
+BUILD_ARTIFACT_DIRS = frozenset({".pytest_cache", ".mypy_cache", ".ruff_cache", ".tox", ".nox", "htmlcov"})
+PROJECT_BUILD_DIRS = frozenset({"build", "dist"})  # Solo junto a pyproject.toml / setup.py / setup.cfg
+PROJECT_MARKERS = frozenset({"pyproject.toml", "setup.py", "setup.cfg"})
+ARTIFACT_SKIP_DIRS = WALK_SKIP_DIRS | {"site-packages", "dist-packages", "node_modules"}
+KEEP_RULES_FILE = ".pycleaner-keep"
+
+def _glob_to_regex(pattern: str) -> str:
+    """Traduce un patrón estilo .gitignore (*, ?, **, [..]) a una expresión regular."""
+    regex = ""
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            regex += "(?:.*/)?"
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            regex += ".*"
+            index += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = pattern.find("]", index + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                body = pattern[index + 1:end].replace("\\", "\\\\")
+                regex += "[" + ("^" + body[1:] if body.startswith("!") else body) + "]"
+                index = end
+        else:
+            regex += re.escape(char)
+        index += 1
+    return regex
+
+class KeepRules:
+    """Reglas de conservación con sintaxis de .gitignore, compiladas una sola vez.
+
+    Admite comentarios (#), negación (!), patrones anclados (/ inicial o con / interna),
+    solo directorios (/ final), *, ?, ** y clases [..]; gana la última regla que
+    coincide. Sin negaciones, todas las reglas se combinan en una única expresión.
+    """
+    
+    def __init__(self, patterns: List[str]):
+        self.rules = []
+        self.prefixes = []  # Rutas literales de reglas ancladas: protegen a sus directorios padre
+        for raw in patterns:
+            pattern = raw.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            negate = pattern.startswith("!")
+            pattern = pattern[1:] if negate else pattern
+            dir_only = pattern.endswith("/")
+            pattern = pattern.strip("/") if dir_only else pattern
+            anchored = raw.strip().lstrip("!").startswith("/") or "/" in pattern
+            pattern = pattern.lstrip("/")
+            if not pattern:
+                continue
+            regex = ("^" if anchored else "^(?:.*/)?") + _glob_to_regex(pattern) + "(?:/.*)?$"
+            self.rules.append((re.compile(regex), negate, dir_only))
+            if anchored and not negate:
+                literal = re.split(r"[*?\[]", pattern, 1)[0].rsplit("/", 1)[0]
+                if literal:
+                    self.prefixes.append(literal.rstrip("/") + "/")
+        self._combined = None
+        if self.rules and not any(negate for _, negate, _ in self.rules):
+            self._combined = [(re.compile("|".join(f"(?:{rule.pattern})" for rule, _, only in self.rules if only == dir_only)), dir_only)
+                              for dir_only in (False, True) if any(only == dir_only for _, _, only in self.rules)]
+    
+    @classmethod
+    def from_roots(cls, roots: List[str], extra: Optional[List[str]] = None) -> "KeepRules":
+        """Lee el archivo .pycleaner-keep de cada raíz y añade los patrones extra."""
+        patterns = list(extra or [])
+        for root in roots:
+            try:
+                with open(os.path.join(root, KEEP_RULES_FILE), 'r', encoding='utf-8') as keep_file:
+                    patterns += keep_file.read().splitlines()
+            except OSError:
+                pass
+        return cls(patterns)
+    
+    def matches(self, relative_path: str, is_dir: bool) -> bool:
+        """True si la ruta (relativa a la raíz, con /) debe conservarse."""
+        relative_path = relative_path.replace(os.sep, "/")
+        if self._combined is not None:
+            return any((is_dir or not dir_only) and regex.match(relative_path) for regex, dir_only in self._combined)
+        keep = False
+        for regex, negate, dir_only in self.rules:
+            if (is_dir or not dir_only) and regex.match(relative_path):
+                keep = not negate
+        return keep
+    
+    def protects_inside(self, relative_directory: str) -> bool:
+        """True si alguna regla anclada apunta dentro del directorio (no se puede borrar entero)."""
+        prefix = relative_directory.replace(os.sep, "/").rstrip("/") + "/"
+        return any(keep_prefix.startswith(prefix) for keep_prefix in self.prefixes)
+
+def _is_cython_output(name: str, names: set) -> bool:
+    """True si el archivo es un .c/.cpp/.so/.pyd generado a partir de un .pyx vecino."""
+    stem = name.partition(".")[0]
+    if name.endswith((".c", ".cpp")):
+        return name.rsplit(".", 1)[0] + ".pyx" in names
+    if name.endswith((".so", ".pyd")):
+        return f"{stem}.pyx" in names
+    return False
+
+def find_build_artifacts(roots: List[str], keep: Optional[KeepRules] = None, workers: int = WALK_WORKERS) -> List[dict]:
+    """Busca artefactos de compilación en uno o varios árboles, en paralelo.
+
+    Detecta cachés de herramientas (.pytest_cache, .mypy_cache, .ruff_cache, .tox, .nox,
+    htmlcov), *.egg-info, build/ y dist/ junto a un proyecto Python y los .c/.cpp/.so/.pyd
+    generados por Cython junto a su .pyx. Nunca entra en entornos virtuales
+    (pyvenv.cfg), site-packages ni control de versiones, y respeta las reglas `keep`.
+    Devuelve [{'path', 'kind', 'files', 'bytes'}] ordenado por ruta.
+    """
+    keep = keep or KeepRules([])
+    roots = sorted((os.path.abspath(root) for root in roots), key=len, reverse=True)
+    
+    def relative(path: str) -> str:
+        root = next(r for r in roots if path == r or _is_within(path, r))
+        return os.path.relpath(path, root)
+    
+    def visit(path: str, entries: list):
+        names = {entry.name for entry in entries}
+        if "pyvenv.cfg" in names:
+            return [], None  # Entorno virtual: sus build/ o dist/ son paquetes instalados
+        is_project = bool(names & PROJECT_MARKERS)
+        found = []
+        subdirectories = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if entry.name in ARTIFACT_SKIP_DIRS:
+                    continue
+                if (entry.name in BUILD_ARTIFACT_DIRS or entry.name.endswith(".egg-info")
+                        or (is_project and entry.name in PROJECT_BUILD_DIRS)):
+                    relative_path = relative(entry.path)
+                    if keep.matches(relative_path, True) or keep.protects_inside(relative_path):
+                        continue
+                    files, size = _tree_size(entry.path)
+                    found.append({"path": entry.path, "kind": entry.name if not entry.name.endswith(".egg-info") else "*.egg-info",
+                                  "files": files, "bytes": size, "is_dir": True})
+                else:
+                    subdirectories.append(entry.path)
+            elif _is_cython_output(entry.name, names) and not keep.matches(relative(entry.path), False):
+                try:
+                    size = _allocated_size(entry.stat(follow_symlinks=False))
+                except OSError:
+                    continue
+                found.append({"path": entry.path, "kind": "cython", "files": 1, "bytes": size, "is_dir": False})
+        return subdirectories, found or None
+    
+    artifacts = []
+    walk_parallel(roots, visit, artifacts.extend, workers)
+    return sorted(artifacts, key=lambda artifact: artifact["path"])
+
+def remove_build_artifacts(artifacts: List[dict], workers: int = WALK_WORKERS) -> dict:
+    """Elimina en paralelo los artefactos encontrados. Devuelve {'removed', 'bytes', 'errors'}."""
+    from concurrent.futures import ThreadPoolExecutor
+    import shutil
+    
+    def remove(artifact: dict) -> Optional[str]:
+        try:
+            if artifact["is_dir"]:
+                shutil.rmtree(artifact["path"])
+            else:
+                os.unlink(artifact["path"])
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            return f"{artifact['path']}: {e.strerror or e}"
+        return None
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        errors = list(pool.map(remove, artifacts))
+    removed = [artifact for artifact, error in zip(artifacts, errors) if not error]
+    return {"removed": len(removed), "bytes": sum(artifact["bytes"] for artifact in removed),
+            "errors": [error for error in errors if error]}
+
+# --- Cachés de Herramientas (pip, poetry, uv, pre-commit, mypy) ---
+# Profundidad de la unidad de desalojo bajo la raíz de cada caché: None = cada archivo,
+# 0 = la caché completa, N = cada entrada a N niveles, "buckets" = según el cubo (uv)
+TOOL_CACHE_UNIT_DEPTH = {"pip": None, "poetry": None, "uv": "buckets", "pre-commit": 0, "mypy": 1}
+# uv: prefijo del cubo -> (tiene directorio de índice, niveles de la unidad bajo él). Así la
+# unidad es un wheel descomprimido (archive-v0/<id>), una página del índice (simple-*/pypi/<pkg>),
+# una entrada de wheel (wheels-*/pypi/<pkg>/<wheel>) o una versión construida; los cubos
+# desconocidos se desalojan por entradas de primer nivel.
+UV_CACHE_BUCKET_DEPTH = {"archive-": (False, 1), "simple-": (True, 1), "wheels-": (True, 2),
+                         "built-wheels-": (True, 2), "sdists-": (True, 2), "git-": (True, 1)}
+# uv: directorios de índice dentro de un cubo -> niveles que ocupan (index/<hash>, url/<hash>...)
+UV_CACHE_INDEX_LEVELS = {"pypi": 1, "index": 2, "url": 2, "path": 2, "git": 2, "editable": 2,
+                         "checkouts": 1, "db": 1}
+# Archivos de control que nunca se desalojan sueltos
+TOOL_CACHE_KEEP_FILES = frozenset({"CACHEDIR.TAG", ".gitignore", ".lock", "db.db"})
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "KB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2,
+               "G": 1024 ** 3, "GB": 1024 ** 3, "T": 1024 ** 4, "TB": 1024 ** 4}
+
+def parse_size(text: str) -> int:
+    """Convierte '500MB', '2G' o '1024' en bytes (unidades binarias)."""
+    match = re.match(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?B?)\s*$", text, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Tamaño no válido: {text}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+def tool_cache_locations() -> List[Tuple[str, str]]:
+    """(herramienta, ruta) de las cachés existentes, respetando sus variables de entorno."""
+    home = os.path.expanduser("~")
+    if os.name == 'nt':  # Windows
+        local = os.environ.get('LOCALAPPDATA') or os.path.join(home, "AppData", "Local")
+        defaults = {"pip": os.path.join(local, "pip", "Cache"), "poetry": os.path.join(local, "pypoetry", "Cache"),
+                    "uv": os.path.join(local, "uv", "cache"), "pre-commit": os.path.join(home, ".cache", "pre-commit")}
+    elif sys.platform == "darwin":
+        caches = os.path.join(home, "Library", "Caches")
+        defaults = {"pip": os.path.join(caches, "pip"), "poetry": os.path.join(caches, "pypoetry"),
+                    "uv": os.path.join(home, ".cache", "uv"), "pre-commit": os.path.join(home, ".cache", "pre-commit")}
+    else:  # Linux/Unix (XDG)
+        xdg = os.environ.get('XDG_CACHE_HOME') or os.path.join(home, ".cache")
+        defaults = {"pip": os.path.join(xdg, "pip"), "poetry": os.path.join(xdg, "pypoetry"),
+                    "uv": os.path.join(xdg, "uv"), "pre-commit": os.path.join(xdg, "pre-commit")}
+    overrides = {"pip": "PIP_CACHE_DIR", "poetry": "POETRY_CACHE_DIR", "uv": "UV_CACHE_DIR", "pre-commit": "PRE_COMMIT_HOME"}
+    locations = [(tool, os.environ.get(overrides[tool]) or path) for tool, path in defaults.items()]
+    locations.append(("mypy", os.environ.get("MYPY_CACHE_DIR") or os.path.join(os.getcwd(), ".mypy_cache")))
+    return [(tool, os.path.abspath(path)) for tool, path in locations if os.path.isdir(path)]
+
+def _cache_unit_depth(tool: str, parts: List[str]) -> Optional[int]:
+    """Profundidad de la unidad de desalojo para la entrada `parts` (componentes bajo la raíz)."""
+    unit_depth = TOOL_CACHE_UNIT_DEPTH.get(tool)
+    if unit_depth != "buckets":
+        return unit_depth
+    bucket = next((prefix for prefix in UV_CACHE_BUCKET_DEPTH if parts[0].startswith(prefix)), None)
+    has_index, levels = UV_CACHE_BUCKET_DEPTH.get(bucket, (False, 1))
+    if not has_index:
+        return 1 + levels
+    if len(parts) == 1:
+        return 2 + levels  # Aún no se sabe qué índice: seguir bajando
+    index_levels = UV_CACHE_INDEX_LEVELS.get(parts[1])
+    return 1 + index_levels + levels if index_levels else 2
+
+def _tree_usage(path: str) -> Tuple[int, int, float]:
+    """(archivos, bytes, último uso) de un directorio; último uso = máximo de atime y mtime."""
+    files = size = 0
+    last_used = 0.0
+    try:
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    sub_files, sub_size, sub_used = _tree_usage(entry.path)
+                    files += sub_files
+                    size += sub_size
+                    last_used = max(last_used, sub_used)
+                else:
+                    entry_stat = entry.stat(follow_symlinks=False)
+                    files += 1
+                    size += _allocated_size(entry_stat)
+                    last_used = max(last_used, entry_stat.st_atime, entry_stat.st_mtime)
+    except OSError:
+        pass
+    return files, size, last_used
+
+def scan_tool_caches(locations: Optional[List[Tuple[str, str]]] = None, workers: int = WALK_WORKERS) -> List[dict]:
+    """Unidades de desalojo de las cachés: [{'tool', 'root', 'path', 'is_dir', 'files', 'bytes', 'last_used'}].
+
+    Se recorren en paralelo con walk_parallel; la granularidad de cada herramienta sale
+    de TOOL_CACHE_UNIT_DEPTH (en uv, de UV_CACHE_BUCKET_DEPTH). El último uso es el máximo
+    de atime y mtime (con noatime o relatime, el mtime garantiza al menos la fecha de descarga).
+    """
+    locations = tool_cache_locations() if locations is None else locations
+    units = []
+    whole = [(tool, root) for tool, root in locations if TOOL_CACHE_UNIT_DEPTH.get(tool) == 0]
+    for tool, root in whole:
+        files, size, last_used = _tree_usage(root)
+        units.append({"tool": tool, "root": root, "path": root, "is_dir": True,
+                      "files": files, "bytes": size, "last_used": last_used})
+    partial = {root: tool for tool, root in locations if TOOL_CACHE_UNIT_DEPTH.get(tool) != 0}
+    roots = sorted(partial, key=len, reverse=True)
+    
+    def visit(path: str, entries: list):
+        root = next(r for r in roots if path == r or _is_within(path, r))
+        tool = partial[root]
+        parts = [] if path == root else os.path.relpath(path, root).split(os.sep)
+        depth = len(parts)
+        found = []
+        subdirectories = []
+        for entry in entries:
+            try:
+                unit_depth = _cache_unit_depth(tool, parts + [entry.name])
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if unit_depth is not None and depth + 1 < unit_depth:
+                    if is_dir:
+                        subdirectories.append(entry.path)
+                    continue  # Archivos por encima de la unidad: control de la herramienta
+                if is_dir and unit_depth is None:
+                    subdirectories.append(entry.path)
+                    continue
+                if entry.name in TOOL_CACHE_KEEP_FILES:
+                    continue
+                if is_dir:
+                    files, size, last_used = _tree_usage(entry.path)
+                else:
+                    entry_stat = entry.stat(follow_symlinks=False)
+                    files, size, last_used = 1, _allocated_size(entry_stat), max(entry_stat.st_atime, entry_stat.st_mtime)
+            except OSError:
+                continue
+            found.append({"tool": tool, "root": root, "path": entry.path, "is_dir": is_dir,
+                          "files": files, "bytes": size, "last_used": last_used})
+        return subdirectories, found or None
+    
+    walk_parallel(roots, visit, units.extend, workers)
+    return units
+
+def plan_cache_eviction(units: List[dict], max_bytes: Optional[int] = None, max_age_days: Optional[float] = None,
+                        now: Optional[float] = None) -> List[dict]:
+    """Unidades a desalojar según la política: primero las más antiguas que `max_age_days`;
+    después, si el total sigue por encima de `max_bytes`, las menos usadas recientemente (LRU)."""
+    now = time.time() if now is None else now
+    ordered = sorted(units, key=lambda unit: unit["last_used"])
+    evicted = []
+    remaining = sum(unit["bytes"] for unit in units)
+    for unit in ordered:
+        too_old = max_age_days is not None and now - unit["last_used"] > max_age_days * 86400
+        too_big = max_bytes is not None and remaining > max_bytes
+        if not (too_old or too_big):
+            break  # Orden LRU: las siguientes son más recientes y el resto ya cabe
+        evicted.append(unit)
+        remaining -= unit["bytes"]
+    return evicted
+
+def prune_tool_caches(units: List[dict], workers: int = WALK_WORKERS) -> dict:
+    """Elimina las unidades indicadas y poda los directorios que queden vacíos bajo cada caché."""
+    result = remove_build_artifacts(units, workers)
+    roots = {os.path.normcase(unit["root"]) for unit in units}
+    parents = sorted({os.path.dirname(unit["path"]) for unit in units}, key=len, reverse=True)
+    for directory in parents:
+        directory = os.path.normcase(directory)
+        while directory not in roots and any(_is_within(directory, root) for root in roots):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break  # No vacío (o sin permisos): los padres tampoco lo estarán
+            directory = os.path.dirname(directory)
+    return result
+
+# --- Descubrimiento de Entornos Virtuales ---
+VENV_INDEX_FORMAT = 1
+VENV_INDEX_TTL = 24 * 3600  # Segundos antes de volver a recorrer las raíces
+VENV_DISCOVERY_MAX_DEPTH = 6
+# Directorios que nunca contienen entornos (o que cuestan mucho recorrer)
+VENV_DISCOVERY_SKIP_DIRS = WALK_SKIP_DIRS | {
+    "node_modules", "__pycache__", "site-packages", "dist-packages", ".cache", ".npm", ".cargo",
+    ".rustup", ".gradle", ".m2", ".Trash", "Library", "AppData", "proc", "sys", "dev",
+}
+
+def default_discovery_roots() -> List[str]:
+    """Raíces de búsqueda: el home, las de PYCLEANER_VENV_ROOTS y los directorios de pipx,
+    virtualenvwrapper, conda y pyenv (que suelen quedar fuera de la profundidad máxima)."""
+    home = os.path.expanduser("~")
+    roots = [home]
+    roots += [root for root in os.environ.get("PYCLEANER_VENV_ROOTS", "").split(os.pathsep) if root]
+    roots += [
+        os.environ.get("WORKON_HOME") or os.path.join(home, ".virtualenvs"),
+        os.path.join(os.environ.get("PIPX_HOME") or os.path.join(home, ".local", "pipx"), "venvs"),
+        os.path.join(home, ".local", "share", "pipx", "venvs"),
+        os.path.join(home, ".conda", "envs"),
+        os.path.join(home, ".pyenv", "versions"),
+    ]
+    if os.environ.get("CONDA_PREFIX"):
+        roots.append(os.environ["CONDA_PREFIX"])
+    unique = []
+    for root in roots:
+        root = os.path.abspath(os.path.expanduser(root))
+        if os.path.isdir(root) and root not in unique:
+            unique.append(root)
+    return unique
+
+def _venv_index_file() -> str:
+    """Ruta del índice persistente de entornos descubiertos."""
+    return os.path.join(get_cache_dir(), "venv-index.json")
+
+def _environment_kind(path: str, is_conda: bool) -> str:
+    """Clasifica un entorno por su ubicación: tox, nox, pipx, virtualenvwrapper, conda o venv."""
+    parent = os.path.basename(os.path.dirname(path))
+    if is_conda:
+        return "conda"
+    if parent in (".tox", ".nox"):
+        return parent[1:]
+    workon_home = os.path.abspath(os.environ.get("WORKON_HOME") or os.path.expanduser("~/.virtualenvs"))
+    if os.path.dirname(path) == workon_home:
+        return "virtualenvwrapper"
+    if parent == "venvs" and "pipx" in path:
+        return "pipx"
+    return "venv"
+
+def _environment_python(path: str, is_conda: bool) -> Optional[str]:
+    """Ejecutable Python de un entorno, o None si no tiene (p. ej. conda sin python)."""
+    if is_conda and os.name == 'nt':
+        candidates = [os.path.join(path, "python.exe")]
+    else:
+        candidates = [EnvironmentManager.venv_python(path), os.path.join(path, "bin", "python3")]
+    return next((candidate for candidate in candidates if os.path.exists(candidate)), None)
+
+def _environment_version(path: str, is_conda: bool) -> str:
+    """Versión de Python leída de pyvenv.cfg o de conda-meta/python-*.json, sin ejecutar nada."""
+    if is_conda:
+        try:
+            for name in os.listdir(os.path.join(path, "conda-meta")):
+                match = re.match(r"^python-(\d+\.\d+\.\d+)-", name)
+                if match:
+                    return match.group(1)
+        except OSError:
+            pass
+        return ""
+    try:
+        with open(os.path.join(path, "pyvenv.cfg"), 'r', encoding='utf-8') as config:
+            values = dict(line.split("=", 1) for line in config if "=" in line)
+    except (OSError, ValueError):
+        return ""
+    values = {key.strip(): value.strip() for key, value in values.items()}
+    return values.get("version_info") or values.get("version") or ""
+
+def _describe_environment(path: str, is_conda: bool) -> Optional[dict]:
+    """Entrada del índice para un entorno: ruta, tipo, ejecutable, versión y mtime del marcador."""
+    python_executable = _environment_python(path, is_conda)
+    if python_executable is None:
+        return None
+    try:
+        mtime = os.stat(os.path.join(path, "conda-meta" if is_conda else "pyvenv.cfg")).st_mtime
+    except OSError:
+        return None
+    return {"path": path, "kind": _environment_kind(path, is_conda), "python": python_executable,
+            "version": _environment_version(path, is_conda), "mtime": mtime, "last_seen": time.time()}
+
+def scan_environments(roots: List[str], max_depth: int = VENV_DISCOVERY_MAX_DEPTH, workers: int = WALK_WORKERS) -> List[dict]:
+    """Busca entornos (pyvenv.cfg o conda-meta) bajo las raíces con un recorrido paralelo.
+
+    Poda directorios ocultos salvo .tox, .nox, .venv y similares a venv, los de
+    VENV_DISCOVERY_SKIP_DIRS y todo lo que supere `max_depth`. Dentro de un entorno
+    solo se sigue buscando en envs/ (entornos anidados de una instalación conda).
+    """
+    roots = sorted((os.path.abspath(root) for root in roots), key=len, reverse=True)
+    
+    def depth(path: str) -> int:
+        root = next((r for r in roots if path == r or _is_within(path, r)), path)
+        return 0 if path == root else os.path.relpath(path, root).count(os.sep) + 1
+    
+    def visit(path: str, entries: list):
+        names = {entry.name for entry in entries}
+        is_conda = "conda-meta" in names
+        environment = _describe_environment(path, is_conda) if is_conda or "pyvenv.cfg" in names else None
+        if environment is not None:
+            nested = os.path.join(path, "envs")
+            return ([nested] if is_conda and "envs" in names else []), environment
+        if depth(path) >= max_depth:
+            return [], None
+        subdirectories = []
+        for entry in entries:
+            name = entry.name
+            if name in VENV_DISCOVERY_SKIP_DIRS:
+                continue
+            if name.startswith(".") and name not in (".tox", ".nox") and "env" not in name.lower():
+                continue  # .venv, .env, .virtualenvs sí; .config, .local... no
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+            except OSError:
+                continue
+        return subdirectories, None
+    
+    found = {}
+    walk_parallel(roots, visit, lambda environment: found.setdefault(environment["path"], environment), workers)
+    return sorted(found.values(), key=lambda environment: environment["path"])
+
+def discover_environments(roots: Optional[List[str]] = None, refresh: bool = False) -> List[dict]:
+    """Entornos conocidos según el índice persistente, recorriendo las raíces solo cuando hace falta.
+
+    Si el índice tiene las mismas raíces y es más reciente que VENV_INDEX_TTL, basta con
+    comprobar que cada entorno sigue existiendo (un stat por entrada) y actualizar su
+    mtime (se relee el entorno si cambió). Con `refresh`, raíces distintas o índice
+    caducado se vuelven a recorrer las raíces.
+    """
+    roots = [os.path.abspath(root) for root in (roots or default_discovery_roots())]
+    try:
+        with open(_venv_index_file(), 'r', encoding='utf-8') as index_file:
+            index = json.load(index_file)
+        if not isinstance(index, dict) or index.get("format") != VENV_INDEX_FORMAT:
+            index = {}
+    except (OSError, ValueError):
+        index = {}
+    
+    fresh = (not refresh and index.get("roots") == roots
+             and time.time() - index.get("scanned_at", 0) < VENV_INDEX_TTL)
+    if fresh:
+        environments = []
+        for environment in index.get("environments", []):
+            is_conda = environment.get("kind") == "conda"
+            marker = os.path.join(environment["path"], "conda-meta" if is_conda else "pyvenv.cfg")
+            try:
+                mtime = os.stat(marker).st_mtime
+            except OSError:
+                continue  # Entorno eliminado desde el último recorrido
+            if mtime != environment.get("mtime"):
+                environment = _describe_environment(environment["path"], is_conda) or environment
+            environment["last_seen"] = time.time()
+            environments.append(environment)
+        scanned_at = index["scanned_at"]
+    else:
+        environments = scan_environments(roots)
+        scanned_at = time.time()
+    
+    try:
+        index_path = _venv_index_file()
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as index_file:
+            json.dump({"format": VENV_INDEX_FORMAT, "roots": roots, "scanned_at": scanned_at,
+                       "environments": environments}, index_file)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        pass  # Sin índice en disco la próxima búsqueda vuelve a recorrer las raíces
+    return environments
+
+# --- Modo Flota (varios entornos) ---
+FLEET_OPERATIONS = ("report", "orphans", "cache-prune", "verify")
+FLEET_WORKERS = min(8, os.cpu_count() or 4)
+
+def load_fleet_file(path: str) -> List[str]:
+    """Lee una lista de entornos (una ruta de venv o de ejecutable por línea; '#' comenta)."""
+    with open(path, 'r', encoding='utf-8') as fleet_file:
+        return [line.strip() for line in fleet_file if line.strip() and not line.lstrip().startswith("#")]
+
+def resolve_fleet_python(target: str) -> Optional[str]:
+    """Ejecutable Python de una entrada de flota: el propio archivo o el python del venv/entorno conda."""
+    if os.path.isfile(target):
+        return os.path.abspath(target)
+    return _environment_python(os.path.abspath(target), os.path.isdir(os.path.join(target, "conda-meta")))
+
+def write_report_files(python_executable: str, environment: str, report_path: str = "pyREPORT.txt") -> int:
+    """Escribe el reporte con el mismo formato que la opción 2, su .jsonl y la instantánea del historial.
+
+    Devuelve el número de dependencias del reporte.
+    """
+    interpreter = probe_interpreter(python_executable)
+    fingerprint = get_site_fingerprint(python_executable)
+    freeze_ok, freeze_output, freeze_error = get_freeze_output(python_executable)
+    if not freeze_ok:
+        raise RuntimeError(freeze_error)
+    report_content = (f"# Reporte de Dependencias - py-cleaner\n"
+                      f"# Generado: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                      f"# Ambiente: {environment}\n"
+                      f"# Python: {'.'.join(str(part) for part in interpreter['version_info'])}\n"
+                      f"# Ejecutable: {python_executable}\n"
+                      f"# VENV Path: {interpreter['prefix']}\n"
+                      f"# Fingerprint: {fingerprint}\n"
+                      f"#\n" + freeze_output + disk_usage_report_section(python_executable))
+    with open(report_path, 'w', encoding='utf-8') as report_file:
+        report_file.write(report_content)
+    write_structured_report(python_executable, environment, os.path.splitext(report_path)[0] + ".jsonl")
+    record_history_snapshot(python_executable)
+    return len([line for line in freeze_output.splitlines() if line.strip() and not line.startswith('#')])
+
+def _fleet_report(python_executable: str, options: dict) -> dict:
+    """Escribe <salida>/<entorno>-pyREPORT.txt con el mismo formato que la opción 2."""
+    output_dir = options.get("output") or "fleet-reports"
+    os.makedirs(output_dir, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", probe_interpreter(python_executable)["prefix"]).strip("_") or "python"
+    report_path = os.path.join(output_dir, f"{slug}-pyREPORT.txt")
+    packages = write_report_files(python_executable, "fleet", report_path)
+    return {"ok": True, "packages": packages, "bytes": 0, "detail": report_path}
+
+def _fleet_orphans(python_executable: str, options: dict) -> dict:
+    """Desinstala (o con dry_run solo cuenta) los paquetes huérfanos del entorno."""
+    graph = get_dependency_graph(python_executable)
+    orphans = [graph.nodes[name]["name"] for names in graph.orphan_rounds() for name in names]
+    if not orphans:
+        return {"ok": True, "packages": 0, "bytes": 0, "detail": "sin huérfanos"}
+    prefix = probe_interpreter(python_executable)["prefix"]
+    usage = measure_disk_usage([graph.nodes[canonicalize_name(name)] for name in orphans], prefix)
+    size = sum(totals["bytes"] for totals in usage.values())
+    if options.get("dry_run"):
+        return {"ok": True, "packages": len(orphans), "bytes": size, "detail": "simulación: " + ", ".join(orphans[:5])}
+    successful, failed, _ = remove_orphans(python_executable, graph, orphans, options.get("backend", "pip"))
+    return {"ok": not failed, "packages": len(successful), "bytes": size if not failed else 0,
+            "detail": f"fallidos: {', '.join(failed)}" if failed else ", ".join(successful[:5])}
+
+def _fleet_cache_prune(python_executable: str, options: dict) -> dict:
+    """Elimina el bytecode obsoleto (sin fuente o de otro intérprete) bajo el prefijo del entorno."""
+    interpreter = probe_interpreter(python_executable)
+    result = clean_bytecode([interpreter["prefix"]], interpreter["cache_tag"],
+                            dry_run=bool(options.get("dry_run")), stale_only=True)
+    return {"ok": not result["errors"], "packages": 0, "bytes": result["bytes"],
+            "detail": f"{result['files']} .pyc, {result['dirs']} __pycache__"}
+
+def _fleet_verify(python_executable: str, options: dict) -> dict:
+    """Comprueba que el intérprete arranca y que no faltan dependencias (como 'pip check')."""
+    invalidate_inventory_cache(python_executable)
+    probe_interpreter(python_executable)
+    graph = get_dependency_graph(python_executable)
+    problems = [f"{name} requiere {', '.join(requirements)}" for name, requirements in sorted(graph.missing.items())]
+    problems += [f"{name}: requisito inválido {requirement}" for name, requirement in graph.invalid]
+    return {"ok": not problems, "packages": len(graph.nodes), "bytes": 0,
+            "detail": "; ".join(problems[:3]) + (f" (+{len(problems) - 3})" if len(problems) > 3 else "") if problems else "correcto"}
+
+_FLEET_TASKS = {"report": _fleet_report, "orphans": _fleet_orphans,
+                "cache-prune": _fleet_cache_prune, "verify": _fleet_verify}
+
+def _run_fleet_task(operation: str, target: str, options: dict) -> dict:
+    """Ejecuta una operación sobre un entorno dentro de un proceso del pool; nunca lanza excepciones."""
+    start = time.perf_counter()
+    result = {"target": target, "python": None, "ok": False, "packages": 0, "bytes": 0, "detail": ""}
+    try:
+        python_executable = resolve_fleet_python(target)
+        if python_executable is None:
+            raise RuntimeError("no se encontró un ejecutable Python")
+        result["python"] = python_executable
+        result.update(_FLEET_TASKS[operation](python_executable, options))
+    except (OSError, RuntimeError, ValueError, KeyError, subprocess.TimeoutExpired) as e:
+        result["detail"] = str(e) or type(e).__name__
+    result["elapsed"] = time.perf_counter() - start
+    return result
+
+def _reset_fleet_worker() -> None:
+    """Inicializador del pool: con fork el hijo hereda el bucle de subprocesos sin su hilo y
+    el helper de la sesión del padre; se sustituyen por estado nuevo (el helper del padre no
+    se cierra: sigue siendo suyo)."""
+    global subprocess_runner, _interpreter_helper
+    subprocess_runner = SubprocessRunner()
+    _interpreter_helper = None
+
+def run_fleet(operation: str, targets: List[str], options: Optional[dict] = None,
+              workers: int = FLEET_WORKERS, on_result=None) -> List[dict]:
+    """Ejecuta `operation` sobre muchos entornos con un pool de procesos acotado.
+
+    Cada entorno se procesa en un proceso aparte, así que las cachés y el estado global
+    (env_manager, inventarios, grafos) de uno no afectan a los demás, y un fallo queda
+    aislado en su fila del resultado. `on_result(resultado)` se llama en el proceso
+    principal a medida que terminan. Devuelve los resultados en el orden de `targets`.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    if operation not in FLEET_OPERATIONS:
+        raise ValueError(f"Operación de flota desconocida: {operation}")
+    options = options or {}
+    results = {}
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(targets) or 1)), initializer=_reset_fleet_worker) as pool:
+        futures = {pool.submit(_run_fleet_task, operation, target, options): target for target in targets}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:  # El proceso hijo murió (BrokenProcessPool, señal...)
+                result = {"target": futures[future], "python": None, "ok": False, "packages": 0,
+                          "bytes": 0, "detail": f"proceso interrumpido: {e}", "elapsed": 0.0}
+            results[futures[future]] = result
+            if on_result:
+                on_result(result)
+    return [results[target] for target in targets]
+
+# --- Búfer de Salida de la GUI ---
+def _env_int(name: str, default: int) -> int:
+    """Entero positivo de la variable de entorno `name`, o `default` si falta o no es válido."""
+    try:
+        return max(1, int(os.environ.get(name) or default))
+    except ValueError:
+        return default
+
+GUI_OUTPUT_FPS = 30
+GUI_MAX_LINES = _env_int("PYCLEANER_GUI_MAX_LINES", 10_000)
+
+class OutputBuffer:
+    """Salida de un widget de la GUI: cola pendiente, historial en anillo y volcado a disco.
+
+    push() se puede llamar desde cualquier hilo y no toca Qt; el widget vacía la cola con
+    drain() desde un QTimer a GUI_OUTPUT_FPS y pinta cada lote con una sola edición del
+    documento. Cola e historial guardan como mucho `max_lines` líneas (las anteriores
+    tampoco cabrían en un documento con ese máximo de bloques). La sesión completa se
+    escribe en un archivo temporal del directorio de caché, así que exportar un día de
+    logs no la carga en memoria. Si ese archivo no se puede crear o escribir, `spill_error`
+    guarda el motivo y export() avisa de que solo incluye el historial reciente.
+    """
+    
+    def __init__(self, max_lines: int = GUI_MAX_LINES):
+        import collections
+        import tempfile
+        import threading
+        self.max_lines = max_lines
+        self.history = collections.deque(maxlen=max_lines)
+        self._pending = collections.deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self.spill_error: Optional[str] = None
+        try:
+            self._spill = tempfile.TemporaryFile("w+", encoding="utf-8", prefix="py-cleaner-log-", dir=get_cache_dir())
+        except OSError as e:  # Sin disco utilizable: exportar se limita al historial en memoria
+            self._spill = None
+            self.spill_error = str(e)
+    
+    def push(self, display: str, text: Optional[str] = None) -> None:
+        """Encola `display` para pintarlo y guarda `text` (por defecto el mismo) en historial y disco."""
+        text = display if text is None else text
+        with self._lock:
+            self._pending.append(display)
+            self.history.append(text)
+            if self._spill is not None:
+                try:
+                    self._spill.write(text + "\n")
+                except OSError as e:  # Disco lleno: se sigue solo con el historial
+                    self.spill_error = str(e)
+                    self._close_spill()
+    
+    def drain(self) -> List[str]:
+        """Saca las líneas pendientes de pintar, en orden."""
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+        return lines
+    
+    def discard_pending(self) -> None:
+        """Descarta lo que aún no se ha pintado (al limpiar el widget)."""
+        with self._lock:
+            self._pending.clear()
+    
+    def export(self, file_path: str) -> Tuple[bool, Optional[str]]:
+        """Escribe la sesión completa en `file_path` copiando el volcado por bloques.
 
-# Instancia global del gestor de ambientes
-env_manager = EnvironmentManager()
+        Sin volcado (ver `spill_error`) se escriben las últimas líneas del historial con una
+        nota al principio y se devuelve (False, motivo) para que la exportación no pase por completa.
+        """
+        import shutil
+        try:
+            with open(file_path, "w", encoding="utf-8") as out, self._lock:
+                if self._spill is None:
+                    truncated = f"solo se exportaron las últimas {len(self.history)} líneas (volcado a disco no disponible: {self.spill_error})"
+                    out.write(f"# py-cleaner: {truncated}\n")
+                    out.writelines(line + "\n" for line in self.history)
+                    return False, truncated
+                else:
+                    self._spill.flush()
+                    self._spill.seek(0)
+                    try:
+                        shutil.copyfileobj(self._spill, out)
+                    finally:
+                        self._spill.seek(0, os.SEEK_END)
+            return True, None
+        except (OSError, ValueError) as e:
+            return False, str(e)
+    
+    def _close_spill(self) -> None:
+        spill, self._spill = self._spill, None
+        try:
+            spill.close()
+        except OSError:
+            pass
+    
+    def close(self) -> None:
+        """Cierra (y así borra) el archivo de volcado; los widgets lo llaman al destruirse."""
+        with self._lock:
+            if self._spill is not None:
+                self._close_spill()
+                self.spill_error = "sesión cerrada"
 
 # --- GUI Classes ---
-if GUI_AVAILABLE:
+def _define_gui_classes() -> None:
+    """Define las clases de la GUI que heredan de Qt; la llama load_gui() tras importar PySide6."""
+    global TrueEmbeddedConsole, ConsoleWidget
+    
     class TrueEmbeddedConsole(QWidget):
         """Consola embebida verdadera que maneja entornos virtuales de forma independiente."""
         
@@ -192,6 +3972,15 @@ if GUI_AVAILABLE:
                     padding: 8px;
                 }
             """)
+            self.console.setMaximumBlockCount(GUI_MAX_LINES)
+            
+            # La salida se acumula y se pinta por lotes a ritmo fijo
+            self.output = OutputBuffer()
+            self.destroyed.connect(lambda *_, output=self.output: output.close())
+            self.output_timer = QTimer(self)
+            self.output_timer.setInterval(1000 // GUI_OUTPUT_FPS)
+            self.output_timer.timeout.connect(self._flush_output)
+            self.output_timer.start()
             
             # Toolbar con comandos rápidos
             toolbar_layout = QHBoxLayout()
@@ -213,6 +4002,15 @@ if GUI_AVAILABLE:
             self.btn_clear.setToolTip("Limpiar consola")
             self.btn_clear.clicked.connect(self.clear_console)
             
+            self.btn_cancel = QPushButton("⛔ Cancelar")
+            self.btn_cancel.setToolTip("Detener los comandos en ejecución")
+            self.btn_cancel.setEnabled(False)
+            self.btn_cancel.clicked.connect(self.cancel_commands)
+            
+            self.btn_save = QPushButton("💾 Guardar")
+            self.btn_save.setToolTip("Guardar la salida completa de la sesión")
+            self.btn_save.clicked.connect(self.save_output)
+            
             # Estilo para botones
             button_style = """
                 QPushButton {
@@ -231,7 +4029,7 @@ if GUI_AVAILABLE:
                 }
             """
             
-            for btn in [self.btn_activate, self.btn_deactivate, self.btn_pip_list, self.btn_clear]:
+            for btn in [self.btn_activate, self.btn_deactivate, self.btn_pip_list, self.btn_clear, self.btn_cancel, self.btn_save]:
                 btn.setStyleSheet(button_style)
                 toolbar_layout.addWidget(btn)
             
@@ -282,6 +4080,7 @@ if GUI_AVAILABLE:
             self.venv_path = None
             self.python_executable = sys.executable
             self.pip_executable = sys.executable
+            self._running_commands = set()
             
             # Mostrar mensaje inicial
             self.append_output("🚀 Consola Embebida Avanzada iniciada")
@@ -291,15 +4090,24 @@ if GUI_AVAILABLE:
             self.update_env_display()
         
         def append_output(self, text, color=None):
-            """Añade texto a la consola de forma thread-safe."""
-            from PySide6.QtCore import QTimer
-            def _append():
-                if color:
-                    # Para futuras mejoras con colores
-                    self.console.appendPlainText(text)
-                else:
-                    self.console.appendPlainText(text)
-            QTimer.singleShot(0, _append)
+            """Añade texto a la consola de forma thread-safe (se pinta en el siguiente lote)."""
+            self.output.push(text)
+        
+        def _flush_output(self):
+            """Pinta de una vez las líneas acumuladas y refleja si quedan comandos en curso."""
+            lines = self.output.drain()
+            if lines:
+                self.console.appendPlainText("\n".join(lines))
+            self.btn_cancel.setEnabled(bool(self._running_commands))
+        
+        def save_output(self):
+            """Guarda en un archivo toda la salida de la sesión (no solo la visible)."""
+            from PySide6.QtWidgets import QFileDialog
+            file_path, _ = QFileDialog.getSaveFileName(self, "Guardar salida", "py-cleaner-consola.txt", "Archivos de texto (*.txt)")
+            if not file_path:
+                return
+            ok, err = self.output.export(file_path)
+            self.append_output(f"💾 Salida guardada en {file_path}" if ok else f"💥 ERROR al guardar: {err}")
         
         def update_env_display(self):
             """Actualiza la visualización del entorno activo."""
@@ -456,7 +4264,8 @@ if GUI_AVAILABLE:
                 pass
         
         def clear_console(self):
-            """Limpia la consola."""
+            """Limpia la consola (la sesión completa sigue disponible para Guardar)."""
+            self.output.discard_pending()
             self.console.clear()
             self.append_output("🧹 Consola limpiada")
             self.update_env_display()
@@ -492,64 +4301,69 @@ if GUI_AVAILABLE:
                 self.clear_console()
                 return
             
-            # Ejecutar comando en hilo separado para no bloquear UI
-            import threading
-            threading.Thread(target=self._execute_command_thread, args=(cmd,), daemon=True).start()
+            # La salida llega línea a línea desde el bucle de subprocesos; la UI no se bloquea
+            self._start_command(cmd)
         
-        def _execute_command_thread(self, cmd):
-            """Ejecuta el comando en un hilo separado."""
-            try:
-                # Preparar el comando
-                parts = cmd.strip().split()
-                
-                # Manejar comandos especiales de pip usando python -m pip para compatibilidad con venv
-                if parts[0] == "pip":
-                    # Cambiar "pip command" por "python -m pip command"
-                    parts = [self.python_executable, "-m", "pip"] + parts[1:]
-                elif parts[0] == "python":
-                    parts[0] = self.python_executable
-                
-                # Ejecutar con el entorno correcto
-                proc = subprocess.Popen(
-                    parts,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    shell=False,  # ✅ Cambiar a False para mejor compatibilidad
-                    env=self.current_env,  # ✅ Pasar entorno modificado
-                    cwd=os.getcwd()
-                )
-                
+        def _start_command(self, cmd):
+            """Lanza el comando y muestra stdout/stderr a medida que llegan.
+
+            No hay timeout: un 'pip install' de varios minutos sigue hasta terminar o hasta
+            que se pulse Cancelar.
+            """
+            # Preparar el comando
+            parts = cmd.strip().split()
+            
+            # Instalar/desinstalar desde la consola invalida la caché de inventario
+            modifies_env = "pip" in parts and any(p in ("install", "uninstall") for p in parts)
+            
+            # Manejar comandos especiales de pip usando python -m pip para compatibilidad con venv
+            if parts[0] == "pip":
+                # Cambiar "pip command" por "python -m pip command"
+                parts = [self.python_executable, "-m", "pip"] + parts[1:]
+            elif parts[0] == "python":
+                parts[0] = self.python_executable
+            
+            def on_stdout(line):
+                if line.strip():
+                    self.append_output(line)
+            
+            def on_stderr(line):
+                if line.strip():
+                    self.append_output(f"🔴 ERROR: {line}")
+            
+            # Ejecutar con el entorno correcto; sin búfer para que Python escriba cada línea al momento
+            future = subprocess_runner.submit(parts, on_stdout=on_stdout, on_stderr=on_stderr, limit=False,
+                                              env=dict(self.current_env, PYTHONUNBUFFERED="1"), cwd=os.getcwd())
+            self._running_commands.add(future)
+            self.btn_cancel.setEnabled(True)
+            python_executable = self.python_executable
+            future.add_done_callback(lambda done: self._command_finished(done, python_executable, modifies_env))
+        
+        def _command_finished(self, future, python_executable, modifies_env):
+            """Informa del resultado de un comando (se llama desde el hilo de subprocesos)."""
+            self._running_commands.discard(future)
+            if future.cancelled():
+                self.append_output("⛔ Comando cancelado")
+            else:
                 try:
-                    stdout, stderr = proc.communicate(timeout=60)
-                    
-                    # Mostrar salida estándar
-                    if stdout:
-                        for line in stdout.strip().split('\n'):
-                            if line.strip():
-                                self.append_output(line)
-                    
-                    # Mostrar errores
-                    if stderr:
-                        for line in stderr.strip().split('\n'):
-                            if line.strip():
-                                self.append_output(f"🔴 ERROR: {line}")
-                    
+                    result = future.result()
+                except Exception as e:
+                    self.append_output(f"💥 ERROR al ejecutar comando: {str(e)}")
+                else:
                     # Mostrar código de salida si no es exitoso
-                    if proc.returncode != 0:
-                        self.append_output(f"⚠️ Proceso terminado con código: {proc.returncode}")
+                    if result.returncode != 0:
+                        self.append_output(f"⚠️ Proceso terminado con código: {result.returncode}")
                     else:
                         self.append_output("✅ Comando ejecutado exitosamente")
-                
-                except subprocess.TimeoutExpired:
-                    proc.kill()
-                    self.append_output("⏰ ERROR: Comando excedió tiempo límite (60s)")
-                
-            except Exception as e:
-                self.append_output(f"💥 ERROR al ejecutar comando: {str(e)}")
-            
+            if modifies_env:
+                invalidate_inventory_cache(python_executable)
             self.append_output("")  # Línea en blanco para separar
         
+        def cancel_commands(self):
+            """Detiene los comandos en ejecución (el proceso se mata y se informa en la consola)."""
+            for future in list(self._running_commands):
+                future.cancel()
+        
         def show_venv_info(self):
             """Muestra información detallada del entorno actual."""
             self.append_output("📊 INFORMACIÓN DEL ENTORNO VIRTUAL")
@@ -613,6 +4427,7 @@ if GUI_AVAILABLE:
                     self.python_executable = python_path
                     self.pip_executable = python_path
                     self.update_env_display()
+                interpreter_helper(self.python_executable)
         
         def send_command_from_gui(self, cmd):
             """Compatibilidad con el sistema anterior - ejecuta comando desde GUI."""
@@ -633,7 +4448,7 @@ if GUI_AVAILABLE:
             self.python_executable = value
 
     # Alias para compatibilidad
-    ConsoleWidget = TrueEmbeddedConsole if GUI_AVAILABLE else None
+    ConsoleWidget = TrueEmbeddedConsole
 
 def is_venv_active() -> bool:
     """Verifica si un entorno virtual está activo."""
@@ -706,10 +4521,11 @@ def generate_report() -> bool:
             # Mostrar información del ambiente antes de generar el reporte
             console.print(f"[dim]🔧 Usando: {pip_executable}[/dim]")
             
-            result = subprocess.run([pip_executable, '-m', 'pip', 'freeze'], 
-                                  capture_output=True, text=True, timeout=30)
+            # La huella se toma antes del inventario para detectar cambios posteriores
+            fingerprint = get_site_fingerprint(pip_executable)
+            freeze_ok, freeze_output, freeze_error = get_freeze_output(pip_executable)
             
-            if result.returncode == 0:
+            if freeze_ok:
                 # Crear reporte con información del ambiente
                 report_content = f"# Reporte de Dependencias - py-cleaner\n"
                 report_content += f"# Generado: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
@@ -725,18 +4541,29 @@ def generate_report() -> bool:
                 elif env_info['env_type'] == 'system':
                     report_content += f"# Base Prefix: {env_info['base_prefix']}\n"
                 
+                report_content += f"# Fingerprint: {fingerprint}\n"
                 report_content += f"#\n"
-                report_content += result.stdout
+                report_content += freeze_output
+                report_content += disk_usage_report_section(pip_executable)
                 
                 with open('pyREPORT.txt', 'w', encoding='utf-8') as report_file:
                     report_file.write(report_content)
+                try:
+                    write_structured_report(pip_executable, env_info['env_type'])
+                    structured_line = f"🧾 Estructurado: [bold cyan]{STRUCTURED_REPORT_FILE}[/bold cyan]\n"
+                except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+                    structured_line = f"[yellow]⚠️ No se pudo generar {STRUCTURED_REPORT_FILE}: {e}[/yellow]\n"
+                snapshot_id = record_history_snapshot(pip_executable)
+                if snapshot_id is not None:
+                    structured_line += f"🕰️ Historial: instantánea [bold cyan]@{snapshot_id}[/bold cyan]\n"
                 
                 # Contar dependencias (excluyendo comentarios)
-                deps_count = len([line for line in result.stdout.split('\n') if line.strip() and not line.startswith('#')])
+                deps_count = len([line for line in freeze_output.split('\n') if line.strip() and not line.startswith('#')])
                 
                 console.print(Panel(
                     f"[bold green]✅ Reporte generado exitosamente[/bold green]\n\n"
                     f"📄 Archivo: [bold cyan]pyREPORT.txt[/bold cyan]\n"
+                    + structured_line +
                     f"📦 Dependencias encontradas: [bold yellow]{deps_count}[/bold yellow]\n"
                     f"🌍 Ambiente: [bold cyan]{env_info['env_type'].upper()}[/bold cyan]\n"
                     f"🐍 Python: [bold green]{env_info['python_version']}[/bold green]",
@@ -747,7 +4574,7 @@ def generate_report() -> bool:
             else:
                 console.print(Panel(
                     f"[bold red]❌ Error al generar reporte[/bold red]\n\n"
-                    f"[red]Error: {result.stderr}[/red]\n"
+                    f"[red]Error: {freeze_error}[/red]\n"
                     f"[yellow]Ambiente: {env_info['env_type']}[/yellow]\n"
                     f"[yellow]Ejecutable: {pip_executable}[/yellow]",
                     title="[bold red]⚠️ Error[/bold red]",
@@ -763,8 +4590,85 @@ def generate_report() -> bool:
             console.print(f"[dim]Ambiente: {env_info['env_type']}, Ejecutable: {pip_executable}[/dim]")
             return False
 
-def show_packages_table(packages: List[str]) -> None:
-    """Muestra una tabla estilizada de paquetes instalados."""
+def read_report(report_path: str = 'pyREPORT.txt') -> Tuple[dict, List[str]]:
+    """Lee un reporte y devuelve (cabecera, dependencias).
+
+    La cabecera son las líneas '# Clave: valor' con claves en minúsculas.
+    """
+    header = {}
+    dependencies = []
+    with open(report_path, 'r', encoding='utf-8') as report_file:
+        for line in report_file:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#'):
+                key, sep, value = line[1:].partition(':')
+                if sep and not dependencies:
+                    header.setdefault(key.strip().lower(), value.strip())
+                continue
+            dependencies.append(line)
+    return header, dependencies
+
+def verify_report_fingerprint(header: dict, python_executable: Optional[str] = None) -> Optional[bool]:
+    """Compara la huella del reporte con el estado actual del entorno.
+
+    Devuelve True si coincide, False si el reporte está desactualizado y None si
+    el reporte no tiene huella (generado por una versión anterior).
+    """
+    report_fingerprint = header.get("fingerprint")
+    if not report_fingerprint:
+        return None
+    try:
+        return report_fingerprint == get_site_fingerprint(python_executable)
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired):
+        return False
+
+def show_stale_report_warning(fresh: Optional[bool], header: dict) -> None:
+    """Muestra el aviso correspondiente cuando la huella de pyREPORT.txt no coincide."""
+    if fresh is None:
+        message = ("[yellow]pyREPORT.txt no contiene huella de site-packages (versión anterior).\n"
+                   "No es posible confirmar que refleje el estado actual del entorno.[/yellow]")
+    else:
+        message = ("[bold red]pyREPORT.txt está DESACTUALIZADO[/bold red]\n\n"
+                   "[yellow]El entorno cambió (instalaciones o desinstalaciones) desde que se generó el reporte.[/yellow]\n"
+                   f"[dim]Generado: {header.get('generado', 'desconocido')}[/dim]")
+    console.print(Panel(
+        message,
+        title="[bold yellow]🕒 Reporte Desactualizado[/bold yellow]",
+        border_style="yellow"
+    ))
+
+def _requirement_name(requirement: str) -> str:
+    """Nombre del paquete de una línea del reporte ('nombre==versión', 'nombre>=versión' o 'nombre @ url')."""
+    for separator in ('==', '>=', ' @ '):
+        if separator in requirement:
+            return requirement.split(separator, 1)[0].strip()
+    return requirement.strip()
+
+def sort_by_disk_usage(packages: List[str], usage: dict) -> List[str]:
+    """Ordena líneas del reporte de mayor a menor uso de disco (los desconocidos al final)."""
+    return sorted(packages, key=lambda p: usage.get(canonicalize_name(_requirement_name(p)), {}).get("bytes", -1),
+                  reverse=True)
+
+def disk_usage_summary(usage: dict, packages: List[str], top: int = 20) -> str:
+    """Texto 'total · los N mayores ocupan X%' para los títulos de las tablas."""
+    sizes = sorted((usage.get(canonicalize_name(_requirement_name(p)), {}).get("bytes", 0) for p in packages),
+                   reverse=True)
+    total = sum(sizes)
+    if not total:
+        return ""
+    return f" · {format_bytes(total)} · los {min(top, len(sizes))} mayores ocupan {sum(sizes[:top]) * 100 / total:.0f}%"
+
+def _usage_cells(usage: Optional[dict], name: str) -> List[str]:
+    """Celdas tamaño / archivos / inodos de un paquete ('?' si no hay datos)."""
+    totals = (usage or {}).get(canonicalize_name(name))
+    if totals is None:
+        return ["?", "?", "?"]
+    return [format_bytes(totals["bytes"]), str(totals["files"]), str(totals["inodes"])]
+
+def show_packages_table(packages: List[str], usage: Optional[dict] = None) -> None:
+    """Muestra una tabla estilizada de paquetes instalados (con uso de disco si se aporta `usage`)."""
     if not packages:
         console.print(Panel(
             "[yellow]ℹ️ No se encontraron dependencias instaladas[/yellow]",
@@ -777,6 +4681,10 @@ def show_packages_table(packages: List[str]) -> None:
     table.add_column("📦 Paquete", style="cyan", no_wrap=True)
     table.add_column("📌 Versión", style="green")
     table.add_column("📊 Estado", justify="center")
+    if usage is not None:
+        table.add_column("💾 Tamaño", justify="right", style="yellow")
+        table.add_column("📄 Archivos", justify="right")
+        table.add_column("🔢 Inodos", justify="right", style="dim")
     
     for i, package in enumerate(packages):
         if '==' in package:
@@ -792,14 +4700,39 @@ def show_packages_table(packages: List[str]) -> None:
         
         # Alternar colores de fila
         style = "on dark_blue" if i % 2 == 0 else ""
-        table.add_row(name, version, status, style=style)
+        extra_cells = _usage_cells(usage, name) if usage is not None else []
+        table.add_row(name, version, status, *extra_cells, style=style)
     
+    size_summary = disk_usage_summary(usage, packages) if usage is not None else ""
     console.print(Panel(
         table,
-        title=f"[bold cyan]📦 Dependencias Instaladas ({len(packages)})[/bold cyan]",
+        title=f"[bold cyan]📦 Dependencias Instaladas ({len(packages)}){size_summary}[/bold cyan]",
         border_style="cyan"
     ))
 
+def ask_uninstall_chunk_size() -> int:
+    """Pregunta cuántos paquetes enviar a pip en cada lote (1 = uno a uno, modo clásico)."""
+    while True:
+        answer = Prompt.ask(
+            "[bold cyan]📦 Paquetes por lote de pip (1 = uno a uno)[/bold cyan]",
+            default=str(DEFAULT_UNINSTALL_CHUNK_SIZE)
+        )
+        try:
+            chunk_size = int(answer)
+            if chunk_size >= 1:
+                return chunk_size
+        except ValueError:
+            pass
+        console.print("[red]❌ Introduzca un número entero mayor o igual a 1.[/red]")
+
+def ask_uninstall_backend() -> str:
+    """Pregunta qué motor usar: 'pip' (subprocesos por lotes) o 'nativo' (RECORD + hilos)."""
+    return Prompt.ask(
+        "[bold cyan]⚙️ Motor de desinstalación (nativo = RECORD en paralelo, sin pip)[/bold cyan]",
+        choices=list(UNINSTALL_BACKENDS),
+        default="pip"
+    )
+
 def parse_selection(selection: str, max_num: int) -> List[int]:
     """Parsea la selección del usuario y retorna lista de índices válidos."""
     if not selection or not selection.strip():
@@ -880,22 +4813,38 @@ def uninstall_dependencies():
             return
     
     try:
-        with open('pyREPORT.txt', 'r', encoding='utf-8') as report_file:
-            content = report_file.read()
-            
-        # Filtrar solo las líneas de dependencias (no comentarios)
-        dependencies = [line.strip() for line in content.split('\n') 
-                       if line.strip() and not line.startswith('#')]
+        report_header, dependencies = read_report()
     except Exception as e:
         console.print(f"[bold red]❌ Error al leer pyREPORT.txt: {e}[/bold red]")
         return
     
+    # Verificar que el reporte no esté desactualizado antes de una desinstalación masiva
+    report_fresh = verify_report_fingerprint(report_header, pip_executable)
+    if not report_fresh:
+        show_stale_report_warning(report_fresh, report_header)
+        if Confirm.ask("[bold yellow]¿Regenerar el reporte antes de continuar?[/bold yellow]", default=True):
+            if not generate_report():
+                return
+            try:
+                report_header, dependencies = read_report()
+            except Exception as e:
+                console.print(f"[bold red]❌ Error al leer pyREPORT.txt: {e}[/bold red]")
+                return
+        elif not Confirm.ask("[bold red]¿Continuar con el reporte desactualizado?[/bold red]", default=False):
+            console.print("[yellow]❌ Operación cancelada por el usuario.[/yellow]")
+            return
+    
     if not dependencies:
         console.print("[yellow]ℹ️ No se encontraron dependencias instaladas.[/yellow]")
         return
     
-    # Mostrar tabla de dependencias
-    show_packages_table(dependencies)
+    # Mostrar tabla de dependencias, de mayor a menor uso de disco
+    try:
+        with console.status("[bold green]💾 Calculando uso de disco...", spinner="dots"):
+            usage = get_disk_usage(pip_executable)
+        show_packages_table(sort_by_disk_usage(dependencies, usage), usage)
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired):
+        show_packages_table(dependencies)
     
     # Confirmación con advertencia
     warning_panel = Panel(
@@ -914,11 +4863,19 @@ def uninstall_dependencies():
         console.print("[yellow]❌ Operación cancelada por el usuario.[/yellow]")
         return
     
+    backend = ask_uninstall_backend()
+    chunk_size = ask_uninstall_chunk_size()
+    
     # Ejecutar desinstalación con progreso
     console.print(Rule(f"[bold green]🚀 Iniciando Desinstalación Masiva en {env_info['env_type'].upper()}[/bold green]"))
     
-    failed_packages = []
-    successful_packages = []
+    package_names = [_requirement_name(dep) for dep in dependencies]
+    
+    # Quienes dependen de otros paquetes se desinstalan antes que sus dependencias
+    try:
+        package_names = get_dependency_graph(pip_executable).uninstall_order(package_names)
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+        console.print(f"[yellow]⚠️ Sin grafo de dependencias ({e}); se mantiene el orden del reporte.[/yellow]")
     
     with Progress(
         SpinnerColumn(),
@@ -927,41 +4884,42 @@ def uninstall_dependencies():
         TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
     ) as progress:
         
-        task = progress.add_task("Desinstalando paquetes...", total=len(dependencies))
+        task = progress.add_task("Desinstalando paquetes...", total=len(package_names))
+        in_flight = {}
         
-        for i, dep in enumerate(dependencies):
-            package_name = dep.split('==')[0] if '==' in dep else dep.split('>=')[0] if '>=' in dep else dep
-            progress.update(task, description=f"Desinstalando {package_name}...")
-            
-            try:
-                result = subprocess.run(
-                    [pip_executable, '-m', 'pip', 'uninstall', '-y', package_name],
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                
-                if result.returncode == 0:
-                    successful_packages.append(package_name)
-                else:
-                    failed_packages.append(package_name)
-                    
-            except subprocess.TimeoutExpired:
-                failed_packages.append(package_name)
-            except Exception:
-                failed_packages.append(package_name)
-            
+        # Una fila por trabajo en curso; desaparece al terminar
+        def on_chunk(chunk, index, total):
+            label = chunk[0] if len(chunk) == 1 else f"{len(chunk)} paquetes"
+            in_flight[index] = progress.add_task(f"  [dim]↳ {index}/{total}: {label}[/dim]", total=None)
+            progress.update(task, description=f"Desinstalando paquetes ({len(in_flight)} en curso)...")
+        
+        def on_chunk_done(chunk, index):
+            progress.remove_task(in_flight.pop(index))
+            progress.update(task, description=f"Desinstalando paquetes ({len(in_flight)} en curso)...")
+        
+        def on_result(package, ok, message):
             progress.advance(task)
+        
+        stats = uninstall_packages(pip_executable, package_names, backend, chunk_size,
+                                   on_chunk=on_chunk, on_result=on_result, on_chunk_done=on_chunk_done)
+    
+    successful_packages = stats["successful"]
+    failed_packages = stats["failed"]
+    
+    # El entorno cambió: descartar el inventario cacheado
+    invalidate_inventory_cache(pip_executable)
     
     # Mostrar resumen final
-    show_uninstall_summary(successful_packages, failed_packages)
+    show_uninstall_summary(successful_packages, failed_packages, stats,
+                           estimate_sequential_time(pip_executable, stats, len(package_names)))
     
     # Regenerar reporte
     console.print(Rule("[bold blue]🔄 Regenerando Reporte[/bold blue]"))
     generate_report()
 
-def show_uninstall_summary(successful: List[str], failed: List[str]) -> None:
-    """Muestra un resumen estilizado de la desinstalación."""
+def show_uninstall_summary(successful: List[str], failed: List[str], stats: Optional[dict] = None,
+                           sequential_estimate: Optional[float] = None) -> None:
+    """Muestra un resumen estilizado de la desinstalación (con tiempos si se aportan `stats`)."""
     summary_table = Table(show_header=True, header_style="bold magenta", box=box.DOUBLE_EDGE)
     summary_table.add_column("📊 Resultado", style="bold")
     summary_table.add_column("📈 Cantidad", justify="center", style="bold")
@@ -989,6 +4947,24 @@ def show_uninstall_summary(successful: List[str], failed: List[str]) -> None:
         f"[red]{failed_list}[/red]" if failed else "[dim]Ninguno[/dim]"
     )
     
+    # Tiempo real y aceleración frente al bucle de un proceso pip por paquete
+    if stats:
+        timing = f"{stats['pip_calls']} procesos pip para {len(successful) + len(failed)} paquetes"
+        if stats.get("native"):
+            timing += f" ({stats['native']} por RECORD, {stats['files_removed']} archivos)"
+        if stats.get("peak_workers", 0) > 1:
+            timing += f" · hasta {stats['peak_workers']} en paralelo"
+        if stats.get("retried"):
+            timing += f" ({stats['retried']} reintentos individuales)"
+        if sequential_estimate:
+            timing += (f" · uno a uno ≈ {sequential_estimate:.1f}s → "
+                       f"[bold]{sequential_estimate / max(stats['elapsed'], 1e-6):.1f}x[/bold] más rápido (estimado)")
+        summary_table.add_row(
+            "[cyan]⏱️ Tiempo[/cyan]",
+            f"[cyan]{stats['elapsed']:.1f}s[/cyan]",
+            f"[cyan]{timing}[/cyan]"
+        )
+    
     # Mostrar panel de resumen
     success_rate = (len(successful) / (len(successful) + len(failed))) * 100 if (successful or failed) else 0
     
@@ -1006,6 +4982,31 @@ def show_uninstall_summary(successful: List[str], failed: List[str]) -> None:
             border_style="yellow"
         ))
 
+def show_uninstall_impact(impact: dict) -> int:
+    """Muestra qué se rompería al desinstalar la selección. Devuelve cuántos paquetes quedarían rotos."""
+    impact_table = Table(show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    impact_table.add_column("📦 Paquete", style="bright_white", no_wrap=True)
+    impact_table.add_column("💥 Rompe a", style="red")
+    impact_table.add_column("🧭 Instalado por", style="cyan")
+    impact_table.add_column("🗑️ Scripts que desaparecen", style="yellow")
+    
+    broken = set()
+    for package, details in impact.items():
+        breaks = ", ".join(details["breaks"][:5]) + (f" … y {len(details['breaks']) - 5} más" if len(details["breaks"]) > 5 else "")
+        if details["affected"]:
+            breaks += f" [dim](+{len(details['affected'])} indirectos)[/dim]"
+        path = " → ".join(details["path"]) if len(details["path"]) > 1 else "[dim]instalado directamente[/dim]"
+        scripts = ", ".join(details["scripts"][:5]) + (" …" if len(details["scripts"]) > 5 else "")
+        impact_table.add_row(package, breaks or "[green]—[/green]", path, scripts or "[dim]—[/dim]")
+        broken.update(details["breaks"])
+    
+    console.print(Panel(
+        impact_table,
+        title=f"[bold yellow]🔎 Análisis de Impacto ({len(broken)} paquetes instalados quedarían rotos)[/bold yellow]",
+        border_style="red" if broken else "green"
+    ))
+    return len(broken)
+
 def uninstall_dependencies_selective():
     """Desinstala dependencias de forma selectiva con interfaz Rich moderna y ambiente seguro."""
     console.print(Rule("[bold blue]🎯 DESINSTALACIÓN SELECTIVA DE DEPENDENCIAS[/bold blue]"))
@@ -1044,12 +5045,16 @@ def uninstall_dependencies_selective():
                 return
     
     try:
-        with open('pyREPORT.txt', 'r', encoding='utf-8') as report_file:
-            content = report_file.read()
-            
-        # Filtrar solo las líneas de dependencias (no comentarios)
-        dependencies = [line.strip() for line in content.split('\n') 
-                       if line.strip() and not line.startswith('#')]
+        report_header, dependencies = read_report()
+        
+        # Si el reporte está desactualizado, regenerarlo automáticamente
+        report_fresh = verify_report_fingerprint(report_header, pip_executable)
+        if not report_fresh:
+            show_stale_report_warning(report_fresh, report_header)
+            console.print("[yellow]🔄 Regenerando pyREPORT.txt con el estado actual...[/yellow]")
+            if not generate_report():
+                return
+            report_header, dependencies = read_report()
     except Exception as e:
         console.print(f"[bold red]❌ Error al leer pyREPORT.txt: {e}[/bold red]")
         return
@@ -1062,12 +5067,26 @@ def uninstall_dependencies_selective():
         ))
         return
     
+    # Uso de disco por paquete (la numeración sigue el orden elegido)
+    try:
+        with console.status("[bold green]💾 Calculando uso de disco...", spinner="dots"):
+            usage = get_disk_usage(pip_executable)
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired):
+        usage = None
+    if usage is not None and Prompt.ask("[bold cyan]↕️ Ordenar por[/bold cyan]",
+                                        choices=["nombre", "tamaño"], default="nombre") == "tamaño":
+        dependencies = sort_by_disk_usage(dependencies, usage)
+    
     # Mostrar dependencias con numeración en tabla moderna
     packages_table = Table(show_header=True, header_style="bold magenta", box=box.ROUNDED)
     packages_table.add_column("#", style="bold cyan", width=4, justify="right")
     packages_table.add_column("📦 Paquete", style="bright_white")
     packages_table.add_column("📌 Versión", style="green")
     packages_table.add_column("📊 Información", style="dim")
+    if usage is not None:
+        packages_table.add_column("💾 Tamaño", justify="right", style="yellow")
+        packages_table.add_column("📄 Archivos", justify="right")
+        packages_table.add_column("🔢 Inodos", justify="right", style="dim")
     
     for i, dep in enumerate(dependencies, 1):
         if '==' in dep:
@@ -1084,11 +5103,13 @@ def uninstall_dependencies_selective():
         
         # Alternar colores
         style = "on dark_blue" if i % 2 == 0 else ""
-        packages_table.add_row(str(i), package_name, version, info, style=style)
+        extra_cells = _usage_cells(usage, package_name) if usage is not None else []
+        packages_table.add_row(str(i), package_name, version, info, *extra_cells, style=style)
     
+    size_summary = disk_usage_summary(usage, dependencies) if usage is not None else ""
     console.print(Panel(
         packages_table,
-        title=f"[bold cyan]📦 Dependencias en {env_info['env_type'].upper()} ({len(dependencies)})[/bold cyan]",
+        title=f"[bold cyan]📦 Dependencias en {env_info['env_type'].upper()} ({len(dependencies)}){size_summary}[/bold cyan]",
         border_style="cyan"
     ))
     
@@ -1160,79 +5181,649 @@ def uninstall_dependencies_selective():
         selected_table.add_row(str(idx), package_name, version)
     
     console.print(Panel(
-        selected_table,
-        title=f"[bold red]🗑️ Paquetes Seleccionados para Desinstalación de {env_info['env_type'].upper()} ({len(packages_to_uninstall)})[/bold red]",
-        border_style="red"
+        selected_table,
+        title=f"[bold red]🗑️ Paquetes Seleccionados para Desinstalación de {env_info['env_type'].upper()} ({len(packages_to_uninstall)})[/bold red]",
+        border_style="red"
+    ))
+    
+    # Impacto calculado sobre el índice de dependencias inversas (sin volver a escanear)
+    broken_count = 0
+    try:
+        broken_count = show_uninstall_impact(get_dependency_graph(pip_executable).impact(packages_to_uninstall))
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+        console.print(f"[yellow]⚠️ No se pudo analizar el impacto: {e}[/yellow]")
+    
+    # Confirmación final estilizada
+    warning_text = Text()
+    warning_text.append("⚠️ ADVERTENCIA: ", style="bold red")
+    warning_text.append("Esta operación NO se puede deshacer.\n", style="yellow")
+    if broken_count:
+        warning_text.append(f"{broken_count} paquetes que no se desinstalan perderán dependencias.\n", style="bold red")
+    warning_text.append(f"Se desinstalarán {len(packages_to_uninstall)} paquetes del ambiente {env_info['env_type'].upper()}.", style="cyan")
+    
+    console.print(Panel(
+        Align.center(warning_text),
+        title="[bold red]🚨 Confirmación Final[/bold red]",
+        border_style="red"
+    ))
+    
+    if not Confirm.ask(f"\n[bold red]¿Confirma la desinstalación de estos paquetes del {env_info['env_type'].upper()}?[/bold red]"):
+        console.print("[yellow]❌ Operación cancelada por el usuario.[/yellow]")
+        return
+    
+    backend = ask_uninstall_backend()
+    chunk_size = ask_uninstall_chunk_size()
+    
+    # Ejecutar desinstalación con barra de progreso avanzada
+    console.print(Rule(f"[bold green]🚀 Iniciando Desinstalación de {len(packages_to_uninstall)} Paquetes de {env_info['env_type'].upper()}[/bold green]"))
+    
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(bar_width=40),
+        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+        TextColumn("([cyan]{task.completed}[/cyan]/[cyan]{task.total}[/cyan])"),
+    ) as progress:
+        
+        task = progress.add_task("Procesando...", total=len(packages_to_uninstall))
+        in_flight = {}
+        
+        # Una fila por trabajo en curso; desaparece al terminar
+        def on_chunk(chunk, index, total):
+            label = chunk[0] if len(chunk) == 1 else f"{len(chunk)} paquetes"
+            in_flight[index] = progress.add_task(f"  [yellow]↳ {index}/{total}: {label}[/yellow]", total=None)
+        
+        def on_chunk_done(chunk, index):
+            progress.remove_task(in_flight.pop(index))
+        
+        def on_result(package, ok, message):
+            if ok:
+                progress.update(task, description=f"[green]✅ {package}[/green]")
+            elif message == "Timeout":
+                progress.update(task, description=f"[red]⏰ Timeout: {package}[/red]")
+            else:
+                progress.update(task, description=f"[red]❌ {package}[/red]")
+            progress.advance(task)
+        
+        stats = uninstall_packages(pip_executable, packages_to_uninstall, backend, chunk_size,
+                                   on_chunk=on_chunk, on_result=on_result, on_chunk_done=on_chunk_done)
+    
+    successful_packages = stats["successful"]
+    failed_packages = stats["failed"]
+    
+    # El entorno cambió: descartar el inventario cacheado
+    invalidate_inventory_cache(pip_executable)
+    
+    # Mostrar resumen detallado
+    show_uninstall_summary(successful_packages, failed_packages, stats,
+                           estimate_sequential_time(pip_executable, stats, len(packages_to_uninstall)))
+    
+    # Regenerar reporte
+    console.print(Rule("[bold blue]🔄 Regenerando Reporte de Dependencias[/bold blue]"))
+    generate_report()
+    
+    console.print(f"[bold green]✅ uninstall_dependencies_selective() ejecutado correctamente en {env_info['env_type'].upper()}.[/bold green]")
+
+def remove_orphans(python_executable: str, graph: "DependencyGraph", orphans: List[str],
+                   backend: str = "pip") -> Tuple[List[str], List[str], dict]:
+    """Desinstala `orphans` en un lote y repite con los huérfanos que aparezcan después.
+
+    Cada paquete se intenta una sola vez. Devuelve (exitosos, fallidos, totales) con los
+    contadores acumulados de uninstall_packages() y el tiempo total en 'elapsed'.
+    """
+    successful, failed = [], []
+    totals = {"pip_calls": 0, "retried": 0, "native": 0, "files_removed": 0, "peak_workers": 0}
+    start = time.perf_counter()
+    
+    attempted = set()
+    while orphans:
+        attempted.update(canonicalize_name(name) for name in orphans)
+        stats = uninstall_packages(python_executable, graph.uninstall_order(orphans), backend)
+        successful += stats["successful"]
+        failed += stats["failed"]
+        for key in ("pip_calls", "retried", "native", "files_removed"):
+            totals[key] += stats.get(key, 0)
+        totals["peak_workers"] = max(totals["peak_workers"], stats.get("peak_workers", 0))
+        invalidate_inventory_cache(python_executable)
+        if not stats["successful"]:
+            break
+        graph = get_dependency_graph(python_executable)
+        orphans = [graph.nodes[name]["name"] for names in graph.orphan_rounds()
+                   for name in names if name not in attempted]
+    
+    totals["elapsed"] = time.perf_counter() - start
+    return successful, failed, totals
+
+def autoremove_orphans(dry_run: bool = False, assume_yes: bool = False) -> bool:
+    """Busca paquetes huérfanos y los desinstala en un solo lote, repitiendo hasta que no quede ninguno.
+
+    Un huérfano es una distribución sin marcador REQUESTED (instalada como dependencia por
+    pip o uv) de la que ningún otro paquete instalado depende. Con `dry_run` solo se
+    muestra la vista previa de archivos y bytes a liberar. Devuelve False si algo falló.
+    """
+    console.print(Rule("[bold magenta]🧽 AUTOELIMINACIÓN DE PAQUETES HUÉRFANOS[/bold magenta]"))
+    
+    env_info = env_manager.detect_environment()
+    pip_executable = env_manager.get_pip_executable()
+    
+    try:
+        graph = get_dependency_graph(pip_executable)
+        prefix = probe_interpreter(pip_executable)["prefix"]
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+        console.print(f"[bold red]❌ Error al construir el grafo de dependencias: {e}[/bold red]")
+        return False
+    
+    rounds = graph.orphan_rounds()
+    if not rounds:
+        console.print(Panel(
+            f"[green]✅ No hay paquetes huérfanos en {env_info['env_type'].upper()}.[/green]",
+            title="[bold green]🧽 Huérfanos[/bold green]",
+            border_style="green"
+        ))
+        return True
+    
+    # Vista previa: cada ronda queda huérfana al quitar las anteriores
+    preview_table = Table(show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    preview_table.add_column("🔁 Ronda", justify="center", style="bold cyan")
+    preview_table.add_column("📦 Paquete", style="bright_white")
+    preview_table.add_column("📌 Versión", style="green")
+    preview_table.add_column("🛠️ Instalador", style="dim")
+    preview_table.add_column("📄 Archivos", justify="right")
+    preview_table.add_column("💾 Tamaño", justify="right", style="yellow")
+    
+    orphans = []
+    usage = measure_disk_usage([graph.nodes[name] for names in rounds for name in names], prefix)
+    total_files = sum(totals["files"] for totals in usage.values())
+    total_bytes = sum(totals["bytes"] for totals in usage.values())
+    for round_number, names in enumerate(rounds, 1):
+        for name in names:
+            dist = graph.nodes[name]
+            orphans.append(dist["name"])
+            preview_table.add_row(str(round_number), dist["name"], dist["version"], dist["installer"] or "?",
+                                  str(usage[name]["files"]), format_bytes(usage[name]["bytes"]))
+    
+    console.print(Panel(
+        preview_table,
+        title=f"[bold magenta]🧽 {len(orphans)} Huérfanos en {env_info['env_type'].upper()} · "
+              f"{total_files} archivos · {format_bytes(total_bytes)}[/bold magenta]",
+        border_style="magenta"
+    ))
+    
+    if dry_run:
+        console.print("[dim]🔍 Simulación (--dry-run): no se desinstaló nada.[/dim]")
+        return True
+    
+    if not assume_yes and not Confirm.ask(f"[bold red]¿Desinstalar los {len(orphans)} paquetes huérfanos?[/bold red]"):
+        console.print("[yellow]❌ Operación cancelada por el usuario.[/yellow]")
+        return True
+    
+    backend = "pip" if assume_yes else ask_uninstall_backend()
+    with console.status(f"[bold green]🧽 Desinstalando {len(orphans)} huérfanos...", spinner="dots"):
+        successful, failed, totals = remove_orphans(pip_executable, graph, orphans, backend)
+    show_uninstall_summary(successful, failed, totals)
+    return not failed
+
+def clean_bytecode_menu():
+    """Limpia __pycache__ y bytecode obsoleto del proyecto y/o del entorno, con vista previa."""
+    console.print(Rule("[bold cyan]🧼 LIMPIEZA DE BYTECODE (__pycache__)[/bold cyan]"))
+    
+    pip_executable = env_manager.get_pip_executable()
+    try:
+        interpreter = probe_interpreter(pip_executable)
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+        console.print(f"[bold red]❌ No se pudo consultar el intérprete: {e}[/bold red]")
+        return
+    
+    roots_answer = Prompt.ask(
+        "[bold cyan]📁 Rutas a limpiar (separadas por espacios; 'venv' = prefijo del entorno)[/bold cyan]",
+        default="."
+    )
+    roots = [interpreter["prefix"] if root == "venv" else root for root in roots_answer.split()]
+    missing = [root for root in roots if not os.path.isdir(root)]
+    if missing:
+        console.print(f"[red]❌ No son directorios: {', '.join(missing)}[/red]")
+        return
+    
+    mode = Prompt.ask(
+        "[bold cyan]🧹 Qué eliminar (todo = todos los __pycache__, obsoleto = sin fuente u otro intérprete)[/bold cyan]",
+        choices=["todo", "obsoleto"],
+        default="todo"
+    )
+    stale_only = mode == "obsoleto"
+    cache_tag = interpreter["cache_tag"]
+    
+    with console.status("[bold green]🔍 Analizando bytecode...", spinner="dots"):
+        preview = clean_bytecode(roots, cache_tag, dry_run=True, stale_only=stale_only)
+    
+    details = (f"[bold cyan]📁 Rutas:[/bold cyan] {', '.join(roots)}\n"
+               f"[bold cyan]🏷️ Intérprete activo:[/bold cyan] {cache_tag}\n"
+               f"[bold cyan]📄 Archivos .pyc:[/bold cyan] {preview['files']}\n"
+               f"[bold cyan]📂 Directorios __pycache__:[/bold cyan] {preview['dirs']}\n"
+               f"[bold cyan]💾 Espacio a liberar:[/bold cyan] [bold yellow]{format_bytes(preview['bytes'])}[/bold yellow]\n"
+               f"[bold cyan]⏱️ Análisis:[/bold cyan] {preview['elapsed']:.2f}s")
+    for example in preview["examples"][:5]:
+        details += f"\n[dim]   • {example}[/dim]"
+    console.print(Panel(
+        details,
+        title="[bold cyan]🔍 Vista Previa (simulación)[/bold cyan]",
+        border_style="cyan"
+    ))
+    
+    if not preview["files"] and not preview["dirs"]:
+        console.print("[green]✅ No hay bytecode que limpiar.[/green]")
+        return
+    if not Confirm.ask("[bold yellow]¿Eliminar el bytecode mostrado?[/bold yellow]"):
+        console.print("[yellow]❌ Operación cancelada por el usuario.[/yellow]")
+        return
+    
+    with console.status("[bold green]🧼 Eliminando bytecode...", spinner="dots"):
+        result = clean_bytecode(roots, cache_tag, dry_run=False, stale_only=stale_only)
+    
+    console.print(Panel(
+        f"[bold green]✅ {result['files']} archivos y {result['dirs']} directorios eliminados[/bold green]\n"
+        f"💾 Liberado: [bold yellow]{format_bytes(result['bytes'])}[/bold yellow] en {result['elapsed']:.2f}s"
+        + (f"\n[red]❌ {result['errors']} elementos no se pudieron eliminar[/red]" if result["errors"] else ""),
+        title="[bold green]🧼 Limpieza Completada[/bold green]",
+        border_style="green"
+    ))
+
+def clean_project_artifacts_menu():
+    """Limpia artefactos de compilación y cachés de herramientas de un proyecto, con vista previa."""
+    console.print(Rule("[bold cyan]🏗️ LIMPIEZA DE ARTEFACTOS DEL PROYECTO[/bold cyan]"))
+    
+    roots_answer = Prompt.ask(
+        "[bold cyan]📁 Rutas a limpiar (separadas por espacios)[/bold cyan]",
+        default="."
+    )
+    roots = roots_answer.split()
+    missing = [root for root in roots if not os.path.isdir(root)]
+    if missing:
+        console.print(f"[red]❌ No son directorios: {', '.join(missing)}[/red]")
+        return
+    
+    extra_answer = Prompt.ask(
+        f"[bold cyan]🛡️ Patrones a conservar, estilo .gitignore (además de {KEEP_RULES_FILE})[/bold cyan]",
+        default=""
+    )
+    keep = KeepRules.from_roots(roots, extra_answer.split())
+    
+    start = time.perf_counter()
+    with console.status("[bold green]🔍 Buscando artefactos...", spinner="dots"):
+        artifacts = find_build_artifacts(roots, keep)
+    elapsed = time.perf_counter() - start
+    
+    if not artifacts:
+        console.print("[green]✅ No hay artefactos que limpiar.[/green]")
+        return
+    
+    by_kind = {}
+    for artifact in artifacts:
+        files, size = by_kind.get(artifact["kind"], (0, 0))
+        by_kind[artifact["kind"]] = (files + artifact["files"], size + artifact["bytes"])
+    
+    table = Table(title="🔍 Vista Previa (simulación)", show_header=True, header_style="bold magenta")
+    table.add_column("Tipo", style="cyan")
+    table.add_column("Archivos", justify="right", style="white")
+    table.add_column("Tamaño", justify="right", style="yellow")
+    for kind, (files, size) in sorted(by_kind.items(), key=lambda item: item[1][1], reverse=True):
+        table.add_row(kind, str(files), format_bytes(size))
+    console.print(table)
+    
+    total = sum(artifact["bytes"] for artifact in artifacts)
+    details = (f"[bold cyan]📁 Rutas:[/bold cyan] {', '.join(roots)}\n"
+               f"[bold cyan]🗂️ Elementos:[/bold cyan] {len(artifacts)}\n"
+               f"[bold cyan]💾 Espacio a liberar:[/bold cyan] [bold yellow]{format_bytes(total)}[/bold yellow]\n"
+               f"[bold cyan]🛡️ Reglas de conservación:[/bold cyan] {len(keep.rules)}\n"
+               f"[bold cyan]⏱️ Análisis:[/bold cyan] {elapsed:.2f}s")
+    for artifact in sorted(artifacts, key=lambda artifact: artifact["bytes"], reverse=True)[:5]:
+        details += f"\n[dim]   • {artifact['path']} ({format_bytes(artifact['bytes'])})[/dim]"
+    console.print(Panel(details, title="[bold cyan]🏗️ Artefactos Encontrados[/bold cyan]", border_style="cyan"))
+    
+    if not Confirm.ask("[bold yellow]¿Eliminar los artefactos mostrados?[/bold yellow]"):
+        console.print("[yellow]❌ Operación cancelada por el usuario.[/yellow]")
+        return
+    
+    start = time.perf_counter()
+    with console.status("[bold green]🏗️ Eliminando artefactos...", spinner="dots"):
+        result = remove_build_artifacts(artifacts)
+    elapsed = time.perf_counter() - start
+    
+    console.print(Panel(
+        f"[bold green]✅ {result['removed']} elementos eliminados[/bold green]\n"
+        f"💾 Liberado: [bold yellow]{format_bytes(result['bytes'])}[/bold yellow] en {elapsed:.2f}s"
+        + "".join(f"\n[red]❌ {error}[/red]" for error in result["errors"][:10]),
+        title="[bold green]🏗️ Limpieza Completada[/bold green]",
+        border_style="green"
+    ))
+
+def dedupe_environments_menu(dry_run: bool = False, assume_yes: bool = False) -> bool:
+    """Deduplica archivos idénticos entre los venvs conocidos con enlaces duros, con vista previa."""
+    console.print(Rule("[bold cyan]🔗 DEDUPLICACIÓN ENTRE VENVS (ENLACES DUROS)[/bold cyan]"))
+    
+    pythons = env_manager.known_environments()
+    if not assume_yes:
+        extra_answer = Prompt.ask(
+            "[bold cyan]📂 Otros venvs a incluir (rutas separadas por espacios)[/bold cyan]",
+            default=""
+        )
+        for venv_path in extra_answer.split():
+            python_exe = env_manager.venv_python(venv_path)
+            if os.path.exists(python_exe):
+                pythons.append(python_exe)
+                env_manager.remember_environment(venv_path)
+            else:
+                console.print(f"[red]❌ No se encontró Python ejecutable en: {python_exe}[/red]")
+    if len(pythons) < 2:
+        console.print("[yellow]⚠️ Se necesitan al menos dos venvs para deduplicar.[/yellow]")
+        return True
+    
+    with console.status("[bold green]🔍 Analizando archivos instalados...", spinner="dots"):
+        preview = dedupe_environments(pythons, dry_run=True)
+    
+    details = "\n".join(f"[dim]   • {python_exe}[/dim]" for python_exe in pythons)
+    details += (f"\n[bold cyan]📦 Distribuciones:[/bold cyan] {preview['distributions']} "
+                f"({preview['scanned']} nuevas, {preview['rehashed']} archivos rehasheados)\n"
+                f"[bold cyan]📄 Archivos analizados:[/bold cyan] {preview['files']}\n"
+                f"[bold cyan]🔗 Archivos a enlazar:[/bold cyan] {preview['linked']} en {preview['groups']} grupos\n"
+                f"[bold cyan]💾 Espacio a recuperar:[/bold cyan] [bold yellow]{format_bytes(preview['bytes'])}[/bold yellow]\n"
+                f"[bold cyan]⏱️ Análisis:[/bold cyan] {preview['elapsed']:.2f}s")
+    for error in preview["errors"][:5]:
+        details += f"\n[red]❌ {error}[/red]"
+    console.print(Panel(
+        details,
+        title=f"[bold cyan]🔍 Vista Previa ({len(pythons)} venvs)[/bold cyan]",
+        border_style="cyan"
     ))
     
-    # Confirmación final estilizada
-    warning_text = Text()
-    warning_text.append("⚠️ ADVERTENCIA: ", style="bold red")
-    warning_text.append("Esta operación NO se puede deshacer.\n", style="yellow")
-    warning_text.append(f"Se desinstalarán {len(packages_to_uninstall)} paquetes del ambiente {env_info['env_type'].upper()}.", style="cyan")
+    if dry_run or not preview["linked"]:
+        if not preview["linked"]:
+            console.print("[green]✅ No hay archivos nuevos que deduplicar.[/green]")
+        return not preview["errors"]
+    if not assume_yes and not Confirm.ask("[bold yellow]¿Sustituir los duplicados por enlaces duros?[/bold yellow]"):
+        console.print("[yellow]❌ Operación cancelada por el usuario.[/yellow]")
+        return True
+    
+    with console.status("[bold green]🔗 Enlazando archivos...", spinner="dots"):
+        result = dedupe_environments(pythons, dry_run=False)
     
     console.print(Panel(
-        Align.center(warning_text),
-        title="[bold red]🚨 Confirmación Final[/bold red]",
-        border_style="red"
+        f"[bold green]✅ {result['linked']} archivos sustituidos por enlaces duros[/bold green]\n"
+        f"💾 Recuperado: [bold yellow]{format_bytes(result['bytes'])}[/bold yellow] en {result['elapsed']:.2f}s"
+        + "".join(f"\n[red]❌ {error}[/red]" for error in result["errors"][:10]),
+        title="[bold green]🔗 Deduplicación Completada[/bold green]",
+        border_style="green"
     ))
-    
-    if not Confirm.ask(f"\n[bold red]¿Confirma la desinstalación de estos paquetes del {env_info['env_type'].upper()}?[/bold red]"):
-        console.print("[yellow]❌ Operación cancelada por el usuario.[/yellow]")
+    return not result["errors"]
+
+def show_fleet_summary(operation: str, results: List[dict]) -> None:
+    """Tabla combinada con el resultado de una operación de flota en cada entorno."""
+    table = Table(title=f"🚢 Flota · {operation}", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    table.add_column("📂 Entorno", style="bright_white")
+    table.add_column("🎯 Estado", justify="center")
+    table.add_column("📦 Paquetes", justify="right", style="cyan")
+    table.add_column("💾 Bytes", justify="right", style="yellow")
+    table.add_column("⏱️ Tiempo", justify="right", style="dim")
+    table.add_column("📝 Detalle", style="dim", overflow="fold")
+    for result in results:
+        table.add_row(result["target"], "[green]✅[/green]" if result["ok"] else "[red]❌[/red]",
+                      str(result["packages"]), format_bytes(result["bytes"]) if result["bytes"] else "-",
+                      f"{result['elapsed']:.1f}s", result["detail"])
+    failed = [result for result in results if not result["ok"]]
+    table.caption = (f"{len(results) - len(failed)}/{len(results)} correctos · "
+                     f"{sum(result['packages'] for result in results)} paquetes · "
+                     f"{format_bytes(sum(result['bytes'] for result in results))}")
+    console.print(table)
+
+def run_fleet_cli(operation: str, targets: List[str], options: dict, workers: int = FLEET_WORKERS) -> bool:
+    """Ejecuta una operación de flota con barra de progreso y muestra el resumen. True si todo fue bien."""
+    if not targets:
+        console.print("[yellow]⚠️ No hay entornos en la flota.[/yellow]")
+        return False
+    with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), BarColumn(),
+                  TextColumn("{task.completed}/{task.total}"), console=console) as progress:
+        task = progress.add_task(f"🚢 {operation} en {len(targets)} entornos ({workers} procesos)", total=len(targets))
+        results = run_fleet(operation, targets, options, workers,
+                            on_result=lambda result: progress.advance(task))
+    show_fleet_summary(operation, results)
+    return all(result["ok"] for result in results)
+
+def fleet_menu():
+    """Ejecuta informe, limpieza de huérfanos, poda de bytecode o verificación en muchos entornos."""
+    console.print(Rule("[bold cyan]🚢 MODO FLOTA (VARIOS ENTORNOS)[/bold cyan]"))
+    
+    operation = Prompt.ask("[bold cyan]🎯 Operación[/bold cyan]", choices=list(FLEET_OPERATIONS), default="verify")
+    source = Prompt.ask(
+        "[bold cyan]📂 Entornos ('indice' = entornos descubiertos, o ruta a un archivo con un venv por línea)[/bold cyan]",
+        default="indice"
+    )
+    try:
+        if source == "indice":
+            with console.status("[bold green]🔍 Buscando entornos virtuales...", spinner="dots"):
+                targets = [environment["path"] for environment in discover_environments()]
+        else:
+            targets = load_fleet_file(source)
+    except OSError as e:
+        console.print(f"[bold red]❌ No se pudo leer la lista de entornos: {e}[/bold red]")
         return
+    console.print(f"[cyan]🗂️ {len(targets)} entornos en la flota[/cyan]")
+    
+    options = {}
+    if operation in ("orphans", "cache-prune"):
+        options["dry_run"] = not Confirm.ask("[bold yellow]¿Aplicar los cambios? (No = solo simulación)[/bold yellow]", default=False)
+    if operation == "report":
+        options["output"] = Prompt.ask("[bold cyan]📁 Carpeta de reportes[/bold cyan]", default="fleet-reports")
+    workers = int(Prompt.ask("[bold cyan]⚙️ Procesos en paralelo[/bold cyan]", default=str(FLEET_WORKERS)))
+    run_fleet_cli(operation, targets, options, max(1, workers))
+
+def prune_tool_caches_menu(max_size: Optional[str] = None, max_age: Optional[str] = None,
+                           dry_run: bool = False, assume_yes: bool = False) -> bool:
+    """Analiza las cachés de pip, poetry, uv, pre-commit y mypy y desaloja por tamaño máximo y antigüedad."""
+    console.print(Rule("[bold cyan]🗄️ CACHÉS DE HERRAMIENTAS (pip, poetry, uv, pre-commit, mypy)[/bold cyan]"))
+    
+    locations = tool_cache_locations()
+    if not locations:
+        console.print("[green]✅ No se encontró ninguna caché de herramientas.[/green]")
+        return True
+    start = time.perf_counter()
+    with console.status("[bold green]🔍 Midiendo cachés...", spinner="dots"):
+        units = scan_tool_caches(locations)
+    elapsed = time.perf_counter() - start
+    
+    now = time.time()
+    usage_table = Table(title="🗄️ Cachés Encontradas", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    usage_table.add_column("🛠️ Herramienta", style="cyan")
+    usage_table.add_column("📂 Ruta", style="bright_white")
+    usage_table.add_column("🗂️ Entradas", justify="right")
+    usage_table.add_column("💾 Tamaño", justify="right", style="yellow")
+    usage_table.add_column("🕒 Más antigua", justify="right", style="dim")
+    for tool, root in locations:
+        tool_units = [unit for unit in units if unit["root"] == root]
+        oldest = min((unit["last_used"] for unit in tool_units), default=now)
+        usage_table.add_row(tool, root, str(len(tool_units)), format_bytes(sum(unit["bytes"] for unit in tool_units)),
+                            f"{(now - oldest) / 86400:.0f} días")
+    usage_table.caption = f"Total: {format_bytes(sum(unit['bytes'] for unit in units))} · análisis en {elapsed:.2f}s"
+    console.print(usage_table)
+    
+    if max_size is None and max_age is None and not assume_yes:
+        max_size = Prompt.ask("[bold cyan]💾 Tamaño máximo total (p. ej. 2GB; vacío = sin límite)[/bold cyan]", default="")
+        max_age = Prompt.ask("[bold cyan]🕒 Antigüedad máxima en días (vacío = sin límite)[/bold cyan]", default="")
+    try:
+        max_bytes = parse_size(max_size) if max_size else None
+        max_age_days = float(max_age) if max_age else None
+    except ValueError as e:
+        console.print(f"[bold red]❌ {e}[/bold red]")
+        return False
+    if max_bytes is None and max_age_days is None:
+        console.print("[yellow]⚠️ Sin política de desalojo: no se elimina nada.[/yellow]")
+        return True
     
-    # Ejecutar desinstalación con barra de progreso avanzada
-    console.print(Rule(f"[bold green]🚀 Iniciando Desinstalación de {len(packages_to_uninstall)} Paquetes de {env_info['env_type'].upper()}[/bold green]"))
+    evicted = plan_cache_eviction(units, max_bytes, max_age_days, now)
+    if not evicted:
+        console.print("[green]✅ Las cachés ya cumplen la política.[/green]")
+        return True
     
-    failed_packages = []
-    successful_packages = []
+    preview_table = Table(title="🔍 Vista Previa del Desalojo (LRU)", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    preview_table.add_column("🛠️ Herramienta", style="cyan")
+    preview_table.add_column("🗂️ Entradas", justify="right")
+    preview_table.add_column("💾 A liberar", justify="right", style="yellow")
+    preview_table.add_column("🕒 Uso más reciente desalojado", justify="right", style="dim")
+    for tool, _ in locations:
+        tool_units = [unit for unit in evicted if unit["tool"] == tool]
+        if tool_units:
+            newest = max(unit["last_used"] for unit in tool_units)
+            preview_table.add_row(tool, str(len(tool_units)), format_bytes(sum(unit["bytes"] for unit in tool_units)),
+                                  f"hace {(now - newest) / 86400:.0f} días")
+    total = sum(unit["bytes"] for unit in evicted)
+    preview_table.caption = f"{len(evicted)} entradas · {format_bytes(total)}"
+    console.print(preview_table)
+    
+    if dry_run:
+        console.print("[dim]🔍 Simulación (--dry-run): no se eliminó nada.[/dim]")
+        return True
+    if not assume_yes and not Confirm.ask("[bold yellow]¿Desalojar las entradas mostradas?[/bold yellow]"):
+        console.print("[yellow]❌ Operación cancelada por el usuario.[/yellow]")
+        return True
     
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(bar_width=40),
-        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-        TextColumn("([cyan]{task.completed}[/cyan]/[cyan]{task.total}[/cyan])"),
-    ) as progress:
-        
-        task = progress.add_task("Procesando...", total=len(packages_to_uninstall))
-        
-        for i, package in enumerate(packages_to_uninstall, 1):
-            progress.update(task, description=f"[yellow]Desinstalando[/yellow] [bold]{package}[/bold]")
+    start = time.perf_counter()
+    with console.status("[bold green]🗄️ Desalojando entradas...", spinner="dots"):
+        result = prune_tool_caches(evicted)
+    console.print(Panel(
+        f"[bold green]✅ {result['removed']} entradas eliminadas[/bold green]\n"
+        f"💾 Liberado: [bold yellow]{format_bytes(result['bytes'])}[/bold yellow] en {time.perf_counter() - start:.2f}s"
+        + "".join(f"\n[red]❌ {error}[/red]" for error in result["errors"][:10]),
+        title="[bold green]🗄️ Cachés Podadas[/bold green]",
+        border_style="green"
+    ))
+    return not result["errors"]
+
+def show_snapshot_diff(old_label: str, new_label: str, diff: dict, elapsed: float) -> None:
+    """Tabla de diferencias entre dos instantáneas."""
+    styles = {"added": ("➕ Añadido", "green"), "removed": ("➖ Eliminado", "red"),
+              "upgraded": ("⬆️ Actualizado", "cyan"), "downgraded": ("⬇️ Degradado", "yellow"),
+              "changed": ("🔀 Cambiado", "magenta")}
+    table = Table(show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    table.add_column("Cambio", style="bold")
+    table.add_column("📦 Paquete", style="bright_white")
+    table.add_column("Antes", style="dim")
+    table.add_column("Después", style="bright_white")
+    for kind, (label, style) in styles.items():
+        for name, old_version, new_version in diff[kind]:
+            table.add_row(f"[{style}]{label}[/{style}]", name, old_version or "-", new_version or "-")
+    summary = " · ".join(f"{len(diff[kind])} {label.split(' ', 1)[1].lower()}s" for kind, (label, _) in styles.items())
+    summary += f" · {diff['unchanged']} sin cambios · {elapsed * 1000:.1f} ms"
+    console.print(Panel(
+        table if table.row_count else Text("✅ Sin diferencias", style="bold green"),
+        title=f"[bold cyan]🔀 {old_label} → {new_label}[/bold cyan]",
+        subtitle=f"[dim]{summary}[/dim]",
+        border_style="cyan"
+    ))
+
+def diff_menu(old_source: Optional[str] = None, new_source: Optional[str] = None) -> Optional[bool]:
+    """Compara dos reportes, un reporte y el entorno en vivo, o dos entornos.
+
+    Devuelve True si hay diferencias, False si no y None si alguna fuente no se pudo cargar.
+    """
+    console.print(Rule("[bold cyan]🔀 COMPARAR REPORTES / ENTORNOS[/bold cyan]"))
+    if old_source is None:
+        console.print("[dim]Fuentes: pyREPORT.txt, pyREPORT.jsonl, 'live' (entorno activo), ruta a un venv o a un ejecutable Python[/dim]")
+        old_source = Prompt.ask("[bold cyan]📄 Antes[/bold cyan]", default="pyREPORT.txt")
+        new_source = Prompt.ask("[bold cyan]📄 Después[/bold cyan]", default="live")
+    start = time.perf_counter()
+    try:
+        (old_label, old_packages), (new_label, new_packages) = load_snapshot_pair(old_source, new_source or "live")
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+        console.print(f"[bold red]❌ No se pudo cargar la instantánea: {e}[/bold red]")
+        return None
+    diff = diff_snapshots(old_packages, new_packages)
+    show_snapshot_diff(old_label, new_label, diff, time.perf_counter() - start)
+    return any(diff[kind] for kind in ("added", "removed", "upgraded", "downgraded", "changed"))
+
+def _history_time(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+def history_menu(environment: Optional[str] = None, package: Optional[str] = None, days: Optional[str] = None,
+                 compact: bool = False) -> bool:
+    """Consulta el historial de instantáneas: tendencia de tamaño, cambios de un paquete y compactación."""
+    import sqlite3
+    console.print(Rule("[bold cyan]🕰️ HISTORIAL DE INSTANTÁNEAS[/bold cyan]"))
+    interactive = environment is None and package is None and days is None and not compact
+    try:
+        with SnapshotStore() as store:
+            if compact:
+                with console.status("[bold green]🗜️ Compactando historial...", spinner="dots"):
+                    stats = store.compact()
+                console.print(f"[green]✅ {stats['thinned']} instantáneas reducidas a una por día, {stats['expired']} caducadas, "
+                              f"{stats['sets']} conjuntos de paquetes sin uso, {format_bytes(stats['bytes'])} liberados.[/green]")
+                return True
+            environments = store.environments()
+            if not environments:
+                console.print("[yellow]⚠️ El historial está vacío: genere un reporte (opción 2) para guardar la primera instantánea.[/yellow]")
+                return True
             
-            try:
-                result = subprocess.run(
-                    [pip_executable, '-m', 'pip', 'uninstall', '-y', package], 
-                    capture_output=True, 
-                    text=True,
-                    timeout=30
-                )
-                
-                if result.returncode == 0:
-                    successful_packages.append(package)
-                    progress.update(task, description=f"[green]✅ {package}[/green]")
-                else:
-                    failed_packages.append(package)
-                    progress.update(task, description=f"[red]❌ {package}[/red]")
-                    
-            except subprocess.TimeoutExpired:
-                failed_packages.append(package)
-                progress.update(task, description=f"[red]⏰ Timeout: {package}[/red]")
-            except Exception:
-                failed_packages.append(package)
-                progress.update(task, description=f"[red]💥 Error: {package}[/red]")
+            if environment is None:
+                python_executable = env_manager.get_pip_executable()
+            else:
+                python_executable = resolve_fleet_python(environment)
+                if python_executable is None:
+                    console.print(f"[bold red]❌ No es un entorno Python: {environment}[/bold red]")
+                    return False
+            key = os.path.normcase(os.path.abspath(probe_interpreter(python_executable)["prefix"]))
+            current = next((index for index, entry in enumerate(environments, 1) if entry["key"] == key), None)
+            if interactive:
+                env_table = Table(title="🕰️ Entornos con Historial", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+                env_table.add_column("#", style="cyan", justify="right")
+                env_table.add_column("📂 Entorno", style="bright_white")
+                env_table.add_column("📸 Instantáneas", justify="right")
+                env_table.add_column("🕒 Última", style="dim")
+                for index, entry in enumerate(environments, 1):
+                    env_table.add_row(str(index), entry["label"], str(entry["snapshots"]),
+                                      _history_time(entry["last_seen"]) if entry["last_seen"] else "-")
+                console.print(env_table)
+                choice = Prompt.ask("[bold cyan]🎯 Entorno[/bold cyan]", choices=[str(index) for index in range(1, len(environments) + 1)],
+                                    default=str(current or 1))
+                current = int(choice)
+                days = Prompt.ask("[bold cyan]📅 Días de tendencia[/bold cyan]", default="90")
+                package = Prompt.ask("[bold cyan]📦 Paquete a rastrear (vacío = ninguno)[/bold cyan]", default="") or None
+            if current is None:
+                console.print(f"[yellow]⚠️ No hay instantáneas de {key}.[/yellow]")
+                return True
+            selected = environments[current - 1]
             
-            progress.advance(task)
-            time.sleep(0.1)  # Pequeña pausa para mejor visualización
-    
-    # Mostrar resumen detallado
-    show_uninstall_summary(successful_packages, failed_packages)
-    
-    # Regenerar reporte
-    console.print(Rule("[bold blue]🔄 Regenerando Reporte de Dependencias[/bold blue]"))
-    generate_report()
-    
-    console.print(f"[bold green]✅ uninstall_dependencies_selective() ejecutado correctamente en {env_info['env_type'].upper()}.[/bold green]")
+            trend_table = Table(title=f"📈 Tendencia de {selected['label']}", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+            trend_table.add_column("📸", style="cyan", justify="right")
+            trend_table.add_column("🕒 Desde", style="dim")
+            trend_table.add_column("🕒 Hasta", style="dim")
+            trend_table.add_column("📦 Paquetes", justify="right")
+            trend_table.add_column("💾 Tamaño", justify="right", style="yellow")
+            trend_table.add_column("Δ", justify="right")
+            previous = None
+            for snapshot in store.snapshots(selected["id"], time.time() - float(days or 90) * 86400):
+                size = snapshot["total_bytes"]
+                delta = ""
+                if size is not None and previous is not None:
+                    delta = ("+" if size >= previous else "-") + format_bytes(abs(size - previous))
+                trend_table.add_row(f"@{snapshot['id']}", _history_time(snapshot["taken_at"]), _history_time(snapshot["last_seen"]),
+                                    str(snapshot["packages"]), format_bytes(size) if size is not None else "-", delta)
+                previous = size if size is not None else previous
+            console.print(trend_table)
+            
+            if package:
+                changes = store.package_history(selected["id"], package)
+                if not changes:
+                    console.print(f"[yellow]⚠️ {package} no aparece en ninguna instantánea de este entorno.[/yellow]")
+                for taken_at, version in changes:
+                    if version is None:
+                        console.print(f"  [red]➖ {_history_time(taken_at)}: {package} desinstalado[/red]")
+                    else:
+                        console.print(f"  [green]➕ {_history_time(taken_at)}: {package} {version}[/green]")
+            if interactive and Confirm.ask("[bold yellow]🗜️ ¿Compactar el historial ahora?[/bold yellow]", default=False):
+                stats = store.compact()
+                console.print(f"[green]✅ {stats['thinned'] + stats['expired']} instantáneas eliminadas, "
+                              f"{format_bytes(stats['bytes'])} liberados.[/green]")
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired, sqlite3.Error) as e:
+        console.print(f"[bold red]❌ Error al consultar el historial: {e}[/bold red]")
+        return False
+    return True
 
 def check_environment():
     """Verifica y muestra el entorno de Python con interfaz moderna y ambiente correcto."""
@@ -1250,38 +5841,39 @@ def check_environment():
         try:
             console.print(f"[dim]🔧 Usando: {pip_executable}[/dim]")
             
-            result = subprocess.run([pip_executable, '-m', 'pip', 'list'], 
-                                  capture_output=True, text=True, timeout=30)
+            # Inventario en proceso (equivalente a 'pip list' sin lanzar pip)
+            package_rows = get_installed_packages(pip_executable)
             
-            if result.returncode == 0:
-                # Crear panel con información del ambiente
-                env_details = f"[bold cyan]Ambiente:[/bold cyan] {env_info['env_type'].upper()}\n"
-                env_details += f"[bold cyan]Python:[/bold cyan] {env_info['python_version']}\n"
-                env_details += f"[bold cyan]Ejecutable:[/bold cyan] {pip_executable}\n"
-                if env_info['venv_path']:
-                    env_details += f"[bold cyan]VENV Path:[/bold cyan] {env_info['venv_path']}\n"
-                
-                # Contar paquetes instalados
-                package_lines = [line for line in result.stdout.split('\n') if line.strip() and not line.startswith('Package') and not line.startswith('---')]
-                package_count = len(package_lines)
-                env_details += f"[bold cyan]Paquetes instalados:[/bold cyan] {package_count}"
-                
-                console.print(Panel(
-                    env_details + "\n\n" + Syntax(result.stdout, "text", theme="monokai", line_numbers=True),
-                    title=f"[bold green]📦 Paquetes Instalados en {env_info['env_type'].upper()}[/bold green]",
-                    border_style="green"
-                ))
-            else:
-                console.print(Panel(
-                    f"[bold red]❌ Error al verificar entorno: {result.stderr}[/bold red]\n\n"
-                    f"[yellow]Ambiente: {env_info['env_type']}[/yellow]\n"
-                    f"[yellow]Ejecutable: {pip_executable}[/yellow]",
-                    title="[bold red]⚠️ Error de Verificación[/bold red]",
-                    border_style="red"
-                ))
+            # Crear panel con información del ambiente
+            env_details = f"[bold cyan]Ambiente:[/bold cyan] {env_info['env_type'].upper()}\n"
+            env_details += f"[bold cyan]Python:[/bold cyan] {env_info['python_version']}\n"
+            env_details += f"[bold cyan]Ejecutable:[/bold cyan] {pip_executable}\n"
+            if env_info['venv_path']:
+                env_details += f"[bold cyan]VENV Path:[/bold cyan] {env_info['venv_path']}\n"
+            
+            # Contar paquetes instalados
+            package_count = len(package_rows)
+            env_details += f"[bold cyan]Paquetes instalados:[/bold cyan] {package_count}"
+            
+            console.print(Panel(
+                Group(
+                    Text.from_markup(env_details + "\n"),
+                    Syntax(format_pip_list(package_rows), "text", theme="monokai", line_numbers=True)
+                ),
+                title=f"[bold green]📦 Paquetes Instalados en {env_info['env_type'].upper()}[/bold green]",
+                border_style="green"
+            ))
                 
         except subprocess.TimeoutExpired:
             console.print(f"[bold red]⏰ Timeout al verificar entorno {env_info['env_type']}[/bold red]")
+        except (OSError, RuntimeError) as e:
+            console.print(Panel(
+                f"[bold red]❌ Error al verificar entorno: {e}[/bold red]\n\n"
+                f"[yellow]Ambiente: {env_info['env_type']}[/yellow]\n"
+                f"[yellow]Ejecutable: {pip_executable}[/yellow]",
+                title="[bold red]⚠️ Error de Verificación[/bold red]",
+                border_style="red"
+            ))
         except Exception as e:
             console.print(f"[bold red]❌ Error inesperado: {e}[/bold red]")
             console.print(f"[dim]Ambiente: {env_info['env_type']}, Ejecutable: {pip_executable}[/dim]")
@@ -1305,65 +5897,95 @@ def list_pip_packages():
         border_style="blue"
     ))
     
-    # Ejecutar pip list
+    # Obtener el inventario en proceso (sin lanzar 'pip list')
     with console.status(f"[bold green]📦 Obteniendo lista de paquetes desde {env_info['env_type'].upper()}...", spinner="dots"):
         try:
-            result = subprocess.run([pip_executable, '-m', 'pip', 'list'], 
-                                  capture_output=True, text=True, timeout=30)
+            package_rows = get_installed_packages(pip_executable)
             
-            if result.returncode == 0:
-                # Procesar la salida para crear una tabla estilizada
-                lines = result.stdout.strip().split('\n')
+            if package_rows:
+                # Crear tabla de paquetes
+                packages_table = Table(show_header=True, header_style="bold magenta", box=box.ROUNDED)
+                packages_table.add_column("📦 Paquete", style="cyan", no_wrap=True)
+                packages_table.add_column("📌 Versión", style="green")
+                packages_table.add_column("📊 Estado", justify="center")
                 
-                # Omitir las primeras dos líneas (header y separador)
-                package_lines = [line for line in lines[2:] if line.strip()]
-                
-                if package_lines:
-                    # Crear tabla de paquetes
-                    packages_table = Table(show_header=True, header_style="bold magenta", box=box.ROUNDED)
-                    packages_table.add_column("📦 Paquete", style="cyan", no_wrap=True)
-                    packages_table.add_column("📌 Versión", style="green")
-                    packages_table.add_column("📊 Estado", justify="center")
-                    
-                    for i, line in enumerate(package_lines):
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            package_name = parts[0]
-                            version = parts[1]
-                            status = "✅ Instalado"
-                            
-                            # Alternar colores de fila
-                            style = "on dark_blue" if i % 2 == 0 else ""
-                            packages_table.add_row(package_name, version, status, style=style)
+                for i, (package_name, version) in enumerate(package_rows):
+                    status = "✅ Instalado"
                     
-                    console.print(Panel(
-                        packages_table,
-                        title=f"[bold green]📦 Paquetes Instalados en {env_info['env_type'].upper()} ({len(package_lines)})[/bold green]",
-                        border_style="green"
-                    ))
-                else:
-                    console.print(Panel(
-                        "[yellow]ℹ️ No se encontraron paquetes instalados[/yellow]",
-                        title="[bold yellow]📦 Estado[/bold yellow]",
-                        border_style="yellow"
-                    ))
+                    # Alternar colores de fila
+                    style = "on dark_blue" if i % 2 == 0 else ""
+                    packages_table.add_row(package_name, version, status, style=style)
+                
+                console.print(Panel(
+                    packages_table,
+                    title=f"[bold green]📦 Paquetes Instalados en {env_info['env_type'].upper()} ({len(package_rows)})[/bold green]",
+                    border_style="green"
+                ))
             else:
                 console.print(Panel(
-                    f"[bold red]❌ Error al listar paquetes: {result.stderr}[/bold red]\n\n"
-                    f"[yellow]Ambiente: {env_info['env_type']}[/yellow]\n"
-                    f"[yellow]Ejecutable: {pip_executable}[/yellow]",
-                    title="[bold red]⚠️ Error[/bold red]",
-                    border_style="red"
+                    "[yellow]ℹ️ No se encontraron paquetes instalados[/yellow]",
+                    title="[bold yellow]📦 Estado[/bold yellow]",
+                    border_style="yellow"
                 ))
                 
         except subprocess.TimeoutExpired:
             console.print(f"[bold red]⏰ Timeout al listar paquetes desde {env_info['env_type']}[/bold red]")
+        except (OSError, RuntimeError) as e:
+            console.print(Panel(
+                f"[bold red]❌ Error al listar paquetes: {e}[/bold red]\n\n"
+                f"[yellow]Ambiente: {env_info['env_type']}[/yellow]\n"
+                f"[yellow]Ejecutable: {pip_executable}[/yellow]",
+                title="[bold red]⚠️ Error[/bold red]",
+                border_style="red"
+            ))
         except Exception as e:
             console.print(f"[bold red]❌ Error inesperado: {e}[/bold red]")
             console.print(f"[dim]Ambiente: {env_info['env_type']}, Ejecutable: {pip_executable}[/dim]")
     
     console.print(f"[bold green]✅ list_pip_packages() ejecutado correctamente en {env_info['env_type'].upper()}.[/bold green]")
 
+def export_dependency_graph():
+    """Exporta el grafo de dependencias del entorno actual a JSON o DOT (Graphviz)."""
+    console.print(Rule("[bold cyan]🕸️ GRAFO DE DEPENDENCIAS[/bold cyan]"))
+    
+    env_info = env_manager.detect_environment()
+    pip_executable = env_manager.get_pip_executable()
+    
+    try:
+        start = time.perf_counter()
+        graph = get_dependency_graph(pip_executable)
+        elapsed = time.perf_counter() - start
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+        console.print(f"[bold red]❌ Error al construir el grafo: {e}[/bold red]")
+        return
+    
+    cycles = graph.find_cycles()
+    summary = (f"[bold cyan]📦 Paquetes:[/bold cyan] {len(graph.nodes)}\n"
+               f"[bold cyan]🔗 Dependencias:[/bold cyan] {graph.edge_count()}\n"
+               f"[bold cyan]🔁 Ciclos:[/bold cyan] {len(cycles)}\n"
+               f"[bold cyan]❓ Requisitos no instalados:[/bold cyan] {sum(len(r) for r in graph.missing.values())}\n"
+               f"[bold cyan]⏱️ Construcción:[/bold cyan] {elapsed * 1000:.1f} ms")
+    for cycle in cycles[:5]:
+        summary += f"\n[red]   ↻ {' → '.join(cycle)} → {cycle[0]}[/red]"
+    console.print(Panel(
+        summary,
+        title=f"[bold green]🕸️ Grafo de {env_info['env_type'].upper()}[/bold green]",
+        border_style="green"
+    ))
+    
+    export_format = Prompt.ask("[bold cyan]📤 Formato de exportación[/bold cyan]", choices=["json", "dot"], default="json")
+    output_path = Prompt.ask("[bold cyan]📄 Archivo de salida[/bold cyan]", default=f"pyDEPS.{export_format}")
+    try:
+        with open(output_path, 'w', encoding='utf-8') as output_file:
+            output_file.write(graph.to_json() if export_format == "json" else graph.to_dot())
+    except OSError as e:
+        console.print(f"[bold red]❌ No se pudo escribir {output_path}: {e}[/bold red]")
+        return
+    
+    console.print(f"[bold green]✅ Grafo exportado a {output_path}[/bold green]")
+    if export_format == "dot":
+        console.print(f"[dim]💡 Renderizar con Graphviz: dot -Tsvg {output_path} -o pyDEPS.svg[/dim]")
+
 def execute_activator():
     """Ejecuta el script activador con interfaz moderna."""
     console.print(Rule("[bold blue]⚡ ACTIVADOR DE ENTORNO VIRTUAL[/bold blue]"))
@@ -1551,7 +6173,7 @@ def environment_manager_menu():
         
         # Detectar qué ambientes están disponibles
         local_venv_path = os.path.join(os.getcwd(), ".venv")
-        local_available = "✅ Disponible" if os.path.exists(os.path.join(local_venv_path, "Scripts", "python.exe")) else "❌ No encontrado"
+        local_available = "✅ Disponible" if os.path.exists(EnvironmentManager.venv_python(local_venv_path)) else "❌ No encontrado"
         current_indicator = "🟢 ACTIVO" if env_info['env_type'] == 'local_venv' else ""
         
         options_table.add_row(
@@ -1710,6 +6332,41 @@ def handle_switch_to_global():
     console.print("\n[dim]Presione Enter para continuar...[/dim]")
     input()
 
+def show_environments_table(environments: List[dict]) -> None:
+    """Tabla numerada de entornos descubiertos."""
+    table = Table(title="🗂️ Entornos Descubiertos", show_header=True, header_style="bold magenta", box=box.ROUNDED)
+    table.add_column("#", style="bold cyan", justify="right")
+    table.add_column("📂 Ruta", style="bright_white")
+    table.add_column("🏷️ Tipo", style="cyan")
+    table.add_column("🐍 Python", style="green")
+    table.add_column("🕒 Modificado", style="dim")
+    for number, environment in enumerate(environments, 1):
+        table.add_row(str(number), environment["path"], environment["kind"], environment["version"] or "?",
+                      time.strftime("%Y-%m-%d %H:%M", time.localtime(environment["mtime"])))
+    console.print(table)
+
+def pick_environment_cli() -> str:
+    """Muestra los entornos del índice y devuelve la ruta elegida (número, 'r' para volver a buscar o ruta)."""
+    refresh = False
+    while True:
+        with console.status("[bold green]🔍 Buscando entornos virtuales...", spinner="dots"):
+            start = time.perf_counter()
+            environments = discover_environments(refresh=refresh)
+            elapsed = time.perf_counter() - start
+        if environments:
+            show_environments_table(environments)
+        console.print(f"[dim]{len(environments)} entornos en {elapsed:.2f}s · raíces extra: PYCLEANER_VENV_ROOTS[/dim]")
+        answer = Prompt.ask(
+            "\n[bold cyan]📂 Número del entorno, 'r' para volver a buscar o ruta completa al VENV externo[/bold cyan]",
+            default=""
+        ).strip()
+        if answer.lower() == "r":
+            refresh = True
+            continue
+        if answer.isdigit() and 1 <= int(answer) <= len(environments):
+            return environments[int(answer) - 1]["path"]
+        return answer
+
 def handle_switch_to_external_venv():
     """Maneja el cambio a un VENV externo."""
     console.print(Rule("[bold blue]📂 Configuración de VENV EXTERNO[/bold blue]"))
@@ -1726,12 +6383,9 @@ def handle_switch_to_external_venv():
         border_style="blue"
     ))
     
-    # Solicitar ruta manualmente (ya que no tenemos tkinter disponible)
+    # Selector a partir del índice de entornos descubiertos, o ruta manual
     try:
-        venv_path = Prompt.ask(
-            "\n[bold cyan]📂 Ingrese la ruta completa al directorio del VENV externo[/bold cyan]",
-            default=""
-        ).strip()
+        venv_path = pick_environment_cli()
         
         if not venv_path:
             console.print("[yellow]❌ Operación cancelada.[/yellow]")
@@ -1865,6 +6519,15 @@ def show_main_menu() -> None:
     left_column.add_row("3", "📦 Listar Paquetes Pip")
     left_column.add_row("4", "🧹 Desinstalar Todo en pyREPORT.txt")
     left_column.add_row("5", "🎯 Desinstalar Dependencias (Selectivo)")
+    left_column.add_row("10", "🕸️ Exportar Grafo de Dependencias")
+    left_column.add_row("11", "🧽 Autoeliminar Paquetes Huérfanos")
+    left_column.add_row("12", "🧼 Limpiar Bytecode (__pycache__)")
+    left_column.add_row("13", "🏗️ Limpiar Artefactos del Proyecto")
+    left_column.add_row("14", "🔗 Deduplicar Archivos entre VENVs")
+    left_column.add_row("15", "🚢 Modo Flota (varios entornos)")
+    left_column.add_row("16", "🗄️ Podar Cachés (pip, uv, poetry...)")
+    left_column.add_row("17", "🔀 Comparar Reportes / Entornos")
+    left_column.add_row("18", "🕰️ Historial de Instantáneas")
     
     # Opciones del menú - Columna derecha
     right_column.add_row("6", "🔄 Gestionar Ambientes Python")
@@ -1891,6 +6554,15 @@ def show_main_menu() -> None:
     info_text.append("Tip: ", style="bold yellow")
     info_text.append(f"Ambiente actual: {env_info['env_type'].upper()}. ", style="cyan")
     info_text.append("Use la opción 6 para cambiar entre ambientes de forma segura.", style="cyan")
+    
+    # El grafo se reconstruye en cada refresco (se reutiliza si site-packages no cambió)
+    try:
+        graph = get_dependency_graph(env_manager.get_pip_executable())
+        info_text.append(f"\n🕸️ {len(graph.nodes)} paquetes · {graph.edge_count()} dependencias", style="dim")
+        if graph.find_cycles():
+            info_text.append(f" · {len(graph.find_cycles())} ciclos", style="yellow")
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired):
+        pass
     if env_warning:
         info_text.append(env_warning, style="red")
     
@@ -1903,8 +6575,9 @@ def show_main_menu() -> None:
 def main():
     """Función principal con interfaz CLI moderna usando Rich."""
     try:
-        # Inicializar el gestor de ambientes
+        # Inicializar el gestor de ambientes y el helper persistente del intérprete objetivo
         env_manager.detect_environment()
+        interpreter_helper(env_manager.get_pip_executable())
         
         # Mensaje de bienvenida inicial
         welcome_text = Text()
@@ -1927,7 +6600,7 @@ def main():
             try:
                 choice = Prompt.ask(
                     "\n[bold cyan]🎯 Seleccione una opción[/bold cyan]",
-                    choices=["1", "2", "3", "4", "5", "6", "7", "8", "9"],
+                    choices=["1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11", "12", "13", "14", "15", "16", "17", "18"],
                     default="9"
                 )
                 
@@ -1953,9 +6626,29 @@ def main():
                 elif choice == '9':
                     show_goodbye_message()
                     raise SystemExit
+                elif choice == '10':
+                    export_dependency_graph()
+                elif choice == '11':
+                    if autoremove_orphans():
+                        console.print(Rule("[bold blue]🔄 Regenerando Reporte[/bold blue]"))
+                        generate_report()
+                elif choice == '12':
+                    clean_bytecode_menu()
+                elif choice == '13':
+                    clean_project_artifacts_menu()
+                elif choice == '14':
+                    dedupe_environments_menu()
+                elif choice == '15':
+                    fleet_menu()
+                elif choice == '16':
+                    prune_tool_caches_menu()
+                elif choice == '17':
+                    diff_menu()
+                elif choice == '18':
+                    history_menu()
                 
                 # Pausa para que el usuario pueda leer la salida
-                if choice in ['1', '2', '3', '4', '5', '7']:
+                if choice in ['1', '2', '3', '4', '5', '7', '10', '11', '12', '13', '14', '15', '16', '17', '18']:
                     console.print("\n[dim]Presione Enter para continuar...[/dim]")
                     input()
                     
@@ -2000,6 +6693,8 @@ def show_goodbye_message():
 
 def signal_handler(sig, frame):
     """Maneja las señales del sistema de forma elegante."""
+    subprocess_runner.cancel_all()
+    shutdown_interpreter_helper()
     console.print("\n[yellow]🔄 Regresando al menú principal...[/yellow]")
     time.sleep(1)
     main()
@@ -2007,7 +6702,7 @@ def signal_handler(sig, frame):
 # --- GUI con PySide6 ---
 def iniciar_gui():
     """Inicia la interfaz gráfica principal."""
-    if not GUI_AVAILABLE:
+    if not load_gui():
         console.print("[red]❌ PySide6 no está disponible. Ejecute en modo CLI.[/red]")
         return
     
@@ -2027,10 +6722,115 @@ def iniciar_gui():
         def set_off(self):
             self.setStyleSheet(f"background-color: {self.color_off.name()}; border-radius: {self.size//2}px; border: 1px solid #333;")
 
+    class PackageTableModel(QAbstractTableModel):
+        """Paquetes del diálogo de desinstalación con la casilla guardada en el propio modelo.
+
+        Las filas se parsean una vez y la vista solo pide las celdas visibles; el estado de
+        selección es un bytearray y `checked_count` se mantiene al marcar, así que contar o
+        marcar todos no recorre widgets. Ordenar se hace aquí con sorted(): en el proxy cada
+        comparación volvería a llamar a data() desde C++.
+        """
+        HEADERS = ["Seleccionar", "Paquete", "Versión", "Tamaño"]
+        
+        def __init__(self, packages, usage=None, parent=None):
+            super().__init__(parent)
+            self.rows = []
+            for package in packages:
+                # Parsear nombre y versión
+                if '==' in package:
+                    name, version = package.split('==', 1)
+                elif '>=' in package:
+                    name, version = package.split('>=', 1)
+                    version = f">= {version}"
+                else:
+                    name, version = package, "N/A"
+                # Tamaño real en disco (ordenable por bytes)
+                totals = (usage or {}).get(canonicalize_name(name))
+                self.rows.append((package, name, version, totals))
+            self.checked = bytearray(len(self.rows))
+            self.checked_count = 0
+        
+        def rowCount(self, parent=QModelIndex()):
+            return 0 if parent.isValid() else len(self.rows)
+        
+        def columnCount(self, parent=QModelIndex()):
+            return 0 if parent.isValid() else len(self.HEADERS)
+        
+        def headerData(self, section, orientation, role=Qt.DisplayRole):
+            if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+                return self.HEADERS[section]
+            return None
+        
+        def flags(self, index):
+            flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+            return flags | Qt.ItemIsUserCheckable if index.column() == 0 else flags
+        
+        def data(self, index, role=Qt.DisplayRole):
+            if not index.isValid():
+                return None
+            row, column = index.row(), index.column()
+            _, name, version, totals = self.rows[row]
+            if column == 0 and role == Qt.CheckStateRole:
+                return Qt.Checked if self.checked[row] else Qt.Unchecked
+            if column == 1 and role == Qt.DisplayRole:
+                return name
+            if column == 2 and role == Qt.DisplayRole:
+                return version
+            if column == 3:
+                if role == Qt.DisplayRole:
+                    return format_bytes(totals["bytes"]) if totals else "?"
+                if role == Qt.ToolTipRole and totals:
+                    return f"{totals['files']} archivos · {totals['inodes']} inodos"
+                if role == Qt.TextAlignmentRole:
+                    return Qt.AlignRight | Qt.AlignVCenter
+            return None
+        
+        def setData(self, index, value, role=Qt.EditRole):
+            if role != Qt.CheckStateRole or index.column() != 0:
+                return False
+            self.set_checked([index.row()], Qt.CheckState(value) == Qt.Checked)
+            return True
+        
+        def set_checked(self, rows, checked):
+            """Marca o desmarca `rows` (índices del modelo) con una sola notificación a la vista."""
+            flag = 1 if checked else 0
+            if len(rows) == len(self.rows):  # Todas las filas: una sola asignación del bytearray
+                self.checked[:] = bytes([flag]) * len(self.rows)
+                self.checked_count = len(self.rows) * flag
+                first, last = 0, len(self.rows) - 1
+            else:
+                changed = [row for row in rows if self.checked[row] != flag]
+                for row in changed:
+                    self.checked[row] = flag
+                self.checked_count += len(changed) if checked else -len(changed)
+                first, last = (min(changed), max(changed)) if changed else (0, -1)
+            if last >= 0:
+                self.dataChanged.emit(self.index(first, 0), self.index(last, 0), [Qt.CheckStateRole])
+        
+        def sort(self, column, order=Qt.AscendingOrder):
+            keys = [lambda i: self.checked[i], lambda i: self.rows[i][1].lower(), lambda i: self.rows[i][2],
+                    lambda i: self.rows[i][3]["bytes"] if self.rows[i][3] else -1]
+            if not 0 <= column < len(keys):
+                return
+            self.layoutAboutToBeChanged.emit()
+            new_order = sorted(range(len(self.rows)), key=keys[column], reverse=order == Qt.DescendingOrder)
+            position = {old: new for new, old in enumerate(new_order)}
+            persistent = self.persistentIndexList()
+            self.rows = [self.rows[i] for i in new_order]
+            self.checked = bytearray(self.checked[i] for i in new_order)
+            self.changePersistentIndexList(persistent, [self.index(position[index.row()], index.column()) for index in persistent])
+            self.layoutChanged.emit()
+        
+        def checked_packages(self):
+            """Especificaciones originales de los paquetes marcados."""
+            return [row[0] for row, flag in zip(self.rows, self.checked) if flag]
+
     class PackageSelectionDialog(QDialog):
-        def __init__(self, packages, parent=None):
+        def __init__(self, packages, parent=None, graph=None, usage=None):
             super().__init__(parent)
             self.packages = packages
+            self.graph = graph  # Grafo ya construido: el impacto se recalcula sin reescanear
+            self.usage = usage  # Uso de disco por nombre normalizado (columna ordenable)
             self.selected_packages = []
             self.init_ui()
             
@@ -2074,13 +6874,19 @@ def iniciar_gui():
             
             layout.addLayout(controls_layout)
             
-            # Lista de paquetes con checkboxes
-            self.package_list = QTableWidget()
-            self.package_list.setColumnCount(3)
-            self.package_list.setHorizontalHeaderLabels(["Seleccionar", "Paquete", "Versión"])
+            # Lista de paquetes: modelo con las casillas + proxy para filtrar y ordenar
+            self.model = PackageTableModel(self.packages, self.usage, self)
+            self.proxy = QSortFilterProxyModel(self)
+            self.proxy.setSourceModel(self.model)
+            self.proxy.setFilterKeyColumn(1)
+            self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+            self.proxy.setDynamicSortFilter(False)  # Marcar no reordena ni refiltra
+            
+            self.package_list = QTableView()
+            self.package_list.setModel(self.proxy)
             self.package_list.horizontalHeader().setStretchLastSection(True)
             self.package_list.setAlternatingRowColors(True)
-            self.package_list.setSelectionBehavior(QTableWidget.SelectRows)
+            self.package_list.setSelectionBehavior(QTableView.SelectRows)
             
             self.populate_package_list()
             layout.addWidget(self.package_list)
@@ -2090,8 +6896,20 @@ def iniciar_gui():
             self.selection_label.setStyleSheet("font-weight: bold; color: #4CAF50;")
             layout.addWidget(self.selection_label)
             
+            # Análisis de impacto de la selección actual
+            self.impact_view = QTextEdit()
+            self.impact_view.setReadOnly(True)
+            self.impact_view.setMaximumHeight(130)
+            self.impact_view.setStyleSheet("background: #222; color: #eee; font-size: 12px;")
+            self.impact_view.setPlaceholderText("🔎 Selecciona paquetes para ver qué dependientes se romperían.")
+            self.impact_view.setVisible(self.graph is not None)
+            layout.addWidget(self.impact_view)
+            
             # Botones de acción
             button_layout = QHBoxLayout()
+            self.chk_native = QCheckBox("⚙️ Motor nativo (RECORD en paralelo, sin pip)")
+            self.chk_native.setToolTip("Elimina los archivos listados en RECORD con varios hilos. "
+                                       "Las instalaciones *.egg-info o editables se desinstalan con pip.")
             self.btn_ok = QPushButton("🗑️ Desinstalar Seleccionados")
             self.btn_cancel = QPushButton("❌ Cancelar")
             
@@ -2101,6 +6919,7 @@ def iniciar_gui():
             self.btn_ok.clicked.connect(self.accept_selection)
             self.btn_cancel.clicked.connect(self.reject)
             
+            button_layout.addWidget(self.chk_native)
             button_layout.addStretch()
             button_layout.addWidget(self.btn_ok)
             button_layout.addWidget(self.btn_cancel)
@@ -2109,67 +6928,79 @@ def iniciar_gui():
             self.setLayout(layout)
             
         def populate_package_list(self):
-            self.package_list.setRowCount(len(self.packages))
-            self.checkboxes = []
-            
-            for i, package in enumerate(self.packages):
-                # Checkbox
-                checkbox = QCheckBox()
-                checkbox.stateChanged.connect(self.update_selection_count)
-                self.checkboxes.append(checkbox)
-                self.package_list.setCellWidget(i, 0, checkbox)
-                
-                # Parsear nombre y versión
-                if '==' in package:
-                    name, version = package.split('==', 1)
-                elif '>=' in package:
-                    name, version = package.split('>=', 1)
-                    version = f">= {version}"
-                else:
-                    name, version = package, "N/A"
-                
-                # Nombre del paquete
-                name_item = QTableWidgetItem(name)
-                name_item.setFlags(name_item.flags() & ~Qt.ItemIsEditable)
-                self.package_list.setItem(i, 1, name_item)
-                
-                # Versión
-                version_item = QTableWidgetItem(version)
-                version_item.setFlags(version_item.flags() & ~Qt.ItemIsEditable)
-                self.package_list.setItem(i, 2, version_item)
-            
-            self.package_list.resizeColumnsToContents()
+            # Anchos calculados con el texto más largo: medir celda a celda pediría data() a cada fila
+            header = self.package_list.horizontalHeader()
+            metrics = self.package_list.fontMetrics()
+            for column in (1, 2):
+                longest = max((row[column] for row in self.model.rows), key=len, default="")
+                self.package_list.setColumnWidth(column, min(metrics.horizontalAdvance(longest) + 24, 320))
             self.package_list.setColumnWidth(0, 100)
+            self.package_list.verticalHeader().setDefaultSectionSize(metrics.height() + 8)
+            # La cabecera ordena el modelo (no el proxy); hasta pulsarla se conserva el orden original
+            header.setSortIndicator(-1, Qt.AscendingOrder)
+            header.setSortIndicatorShown(True)
+            header.setSectionsClickable(True)
+            header.sortIndicatorChanged.connect(self.model.sort)
+            
+            # El impacto se recalcula una vez por ráfaga de cambios
+            self.impact_timer = QTimer(self)
+            self.impact_timer.setSingleShot(True)
+            self.impact_timer.setInterval(150)
+            self.impact_timer.timeout.connect(self.update_impact)
+            self.model.dataChanged.connect(self.update_selection_count)
+            self.model.dataChanged.connect(lambda *_: self.impact_timer.start())
             
         def filter_packages(self):
-            filter_text = self.filter_input.text().lower()
-            for i in range(self.package_list.rowCount()):
-                package_name = self.package_list.item(i, 1).text().lower()
-                should_show = filter_text in package_name
-                self.package_list.setRowHidden(i, not should_show)
+            self.proxy.setFilterFixedString(self.filter_input.text())
                 
+        def _visible_rows(self):
+            """Filas del modelo que pasan el filtro actual."""
+            if not self.filter_input.text():
+                return range(self.model.rowCount())
+            return [self.proxy.mapToSource(self.proxy.index(row, 0)).row() for row in range(self.proxy.rowCount())]
+        
         def select_all(self):
-            for checkbox in self.checkboxes:
-                if not self.package_list.isRowHidden(self.checkboxes.index(checkbox)):
-                    checkbox.setChecked(True)
+            self.model.set_checked(self._visible_rows(), True)
                     
         def select_none(self):
-            for checkbox in self.checkboxes:
-                checkbox.setChecked(False)
+            self.model.set_checked(range(self.model.rowCount()), False)
                 
         def update_selection_count(self):
-            count = sum(1 for cb in self.checkboxes if cb.isChecked())
+            count = self.model.checked_count
             self.selection_label.setText(f"📊 Seleccionados: {count} paquetes")
             self.btn_ok.setEnabled(count > 0)
             
+        def _package_name(self, package):
+            return _requirement_name(package)
+        
+        def update_impact(self):
+            if self.graph is None:
+                return
+            selected = [self._package_name(package) for package in self.model.checked_packages()]
+            if not selected:
+                self.impact_view.clear()
+                return
+            impact = self.graph.impact(selected)
+            broken = sorted({name for details in impact.values() for name in details["breaks"]})
+            color = "#ff5555" if broken else "#50fa7b"
+            lines = [f'<b style="color:{color}">💥 {len(broken)} paquetes instalados quedarían rotos'
+                     + (f": {', '.join(broken[:10])}" + (" …" if len(broken) > 10 else "") if broken else "") + "</b>"]
+            for package, details in list(impact.items())[:20]:
+                parts = []
+                if details["breaks"]:
+                    parts.append(f'<span style="color:#ff5555">rompe {", ".join(details["breaks"][:5])}</span>')
+                if len(details["path"]) > 1:
+                    parts.append(f'<span style="color:#8be9fd">por {" → ".join(details["path"])}</span>')
+                if details["scripts"]:
+                    parts.append(f'<span style="color:#f1fa8c">quita {", ".join(details["scripts"][:5])}</span>')
+                lines.append(f"• <b>{package}</b>: " + (" · ".join(parts) or "sin impacto"))
+            if len(impact) > 20:
+                lines.append(f"… y {len(impact) - 20} paquetes más")
+            self.impact_view.setHtml("<br>".join(lines))
+        
         def accept_selection(self):
-            self.selected_packages = []
-            for i, checkbox in enumerate(self.checkboxes):
-                if checkbox.isChecked():
-                    package = self.packages[i]
-                    # Extraer solo el nombre del paquete
-                    package_name = package.split('==')[0] if '==' in package else package.split('>=')[0] if '>=' in package else package
-                    self.selected_packages.append(package_name)
+            # Extraer solo el nombre del paquete
+            self.selected_packages = [_requirement_name(package) for package in self.model.checked_packages()]
             
             if not self.selected_packages:
                 QMessageBox.warning(self, "Advertencia", "No has seleccionado ningún paquete para desinstalar.")
@@ -2191,28 +7022,44 @@ def iniciar_gui():
             
         def get_selected_packages(self):
             return self.selected_packages
+        
+        def get_backend(self):
+            return "nativo" if self.chk_native.isChecked() else "pip"
 
     class LogWidget(QTextEdit):
         def __init__(self, parent=None):
             super().__init__(parent)
             self.setReadOnly(True)
             self.setStyleSheet("background: #222; color: #eee; font-family: Consolas, monospace; font-size: 13px;")
-            self._log_history = []
+            self.document().setMaximumBlockCount(GUI_MAX_LINES)
+            self.output = OutputBuffer()
+            self.destroyed.connect(lambda *_, output=self.output: output.close())
+            self.output_timer = QTimer(self)
+            self.output_timer.setInterval(1000 // GUI_OUTPUT_FPS)
+            self.output_timer.timeout.connect(self._flush_output)
+            self.output_timer.start()
         def log(self, msg, level="info"):
             color = {"info": "#8be9fd", "ok": "#50fa7b", "warn": "#f1fa8c", "err": "#ff5555"}.get(level, "#fff")
             emoji = {"info": "ℹ️", "ok": "✅", "warn": "⚠️", "err": "❌"}.get(level, "")
             timestamp = QDateTime.currentDateTime().toString("HH:mm:ss")
             html = f'<span style="color:{color}">{emoji} [{timestamp}] {msg}</span>'
-            self.append(html)
-            self._log_history.append(f"[{timestamp}] {emoji} {msg}")
+            self.output.push(html, f"[{timestamp}] {emoji} {msg}")
+        def _flush_output(self):
+            # Un único bloque de edición por lote: un solo relayout aunque lleguen miles de líneas
+            lines = self.output.drain()
+            if not lines:
+                return
+            cursor = QTextCursor(self.document())
+            cursor.movePosition(QTextCursor.End)
+            cursor.beginEditBlock()
+            for index, html in enumerate(lines):
+                if index or not self.document().isEmpty():
+                    cursor.insertBlock()
+                cursor.insertHtml(html)
+            cursor.endEditBlock()
+            self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
         def export_log(self, file_path):
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    for line in self._log_history:
-                        f.write(line + '\n')
-                return True, None
-            except Exception as e:
-                return False, str(e)
+            return self.output.export(file_path)
 
     class MoveCornerWidget(QWidget):
         def __init__(self, parent=None):
@@ -2290,6 +7137,8 @@ def iniciar_gui():
                 # Aquí podrías cerrar conexiones, guardar logs, liberar recursos, etc.
                 self.log_widget.log("Cerrando la aplicación de forma segura...", "info")
                 self.status_bar.showMessage("Cerrando la aplicación...", 2000)
+                subprocess_runner.cancel_all()
+                shutdown_interpreter_helper()
                 QApplication.quit()
             except Exception as e:
                 self.log_widget.log(f"Error al cerrar: {e}", "err")
@@ -2381,6 +7230,7 @@ def iniciar_gui():
             log_layout.addWidget(self.log_widget)
             self.tab_log.setLayout(log_layout)
             self.tab_console = ConsoleWidget(self)  # Pasar self como parent para sincronización
+            interpreter_helper(self.tab_console.python_executable)
             self.tabs.addTab(self.tab_log, "Log de Operaciones")
             self.tabs.addTab(self.tab_console, "Consola")
             main_layout.addWidget(self.tabs)
@@ -2468,10 +7318,7 @@ def iniciar_gui():
             
             # Verificar si existe el venv local
             local_venv_path = os.path.join(os.getcwd(), ".venv")
-            if os.name == 'nt':  # Windows
-                python_exe = os.path.join(local_venv_path, "Scripts", "python.exe")
-            else:  # Unix/Linux/Mac
-                python_exe = os.path.join(local_venv_path, "bin", "python")
+            python_exe = EnvironmentManager.venv_python(local_venv_path)
             
             if not os.path.exists(python_exe):
                 QMessageBox.warning(self, "Error", f"No se encontró VENV local en:\n{local_venv_path}\n\nPor favor, cree un entorno virtual primero.")
@@ -2492,9 +7339,36 @@ def iniciar_gui():
             self.log_widget.log(f"Cambiado a VENV LOCAL: {local_venv_path}", "info")
             self.status_bar.showMessage("VENV LOCAL activo.", 4000)
 
+        def elegir_venv_descubierto(self) -> Optional[str]:
+            """Selector de entornos del índice; devuelve la ruta, "" para examinar carpeta o None si se cancela."""
+            from PySide6.QtWidgets import QInputDialog
+            examinar = "📂 Examinar carpeta..."
+            buscar = "🔍 Volver a buscar entornos"
+            refresh = False
+            while True:
+                try:
+                    environments = discover_environments(refresh=refresh)
+                except (OSError, RuntimeError, ValueError) as e:
+                    self.log_widget.log(f"No se pudieron descubrir entornos: {e}", "warn")
+                    return ""
+                self.log_widget.log(f"Entornos descubiertos: {len(environments)}", "info")
+                etiquetas = [f"{env['path']}  [{env['kind']}, Python {env['version'] or '?'}]" for env in environments]
+                elegido, ok = QInputDialog.getItem(self, "Seleccionar VENV externo", "Entornos descubiertos:",
+                                                   etiquetas + [examinar, buscar], 0, False)
+                if not ok:
+                    return None
+                if elegido == buscar:
+                    refresh = True
+                    continue
+                if elegido == examinar:
+                    return ""
+                return environments[etiquetas.index(elegido)]["path"]
+        
         def cargar_venv_externo(self):
             from PySide6.QtWidgets import QFileDialog
-            venv_dir = QFileDialog.getExistingDirectory(self, "Selecciona la carpeta del VENV")
+            venv_dir = self.elegir_venv_descubierto()
+            if venv_dir == "":
+                venv_dir = QFileDialog.getExistingDirectory(self, "Selecciona la carpeta del VENV")
             if not venv_dir:
                 self.status_bar.showMessage("Carga de VENV externo cancelada.", 3000)
                 self.log_widget.log("Carga de VENV externo cancelada por el usuario.", "warn")
@@ -2507,7 +7381,8 @@ def iniciar_gui():
                 if os.path.exists(python_path):
                     # Validar estructura de venv
                     reqs = ["pyvenv.cfg", "Scripts", "Lib"] if os.name == "nt" else ["pyvenv.cfg", "bin", "lib"]
-                    valid = all(os.path.exists(os.path.join(venv_dir, r)) for r in reqs)
+                    valid = (all(os.path.exists(os.path.join(venv_dir, r)) for r in reqs)
+                             or os.path.isdir(os.path.join(venv_dir, "conda-meta")))
                     if not valid:
                         self.lbl_venv_path.setText("Estructura de VENV inválida")
                         self.log_widget.log(f"La carpeta seleccionada no tiene estructura válida de VENV: {venv_dir}", "err")
@@ -2606,21 +7481,20 @@ def iniciar_gui():
                 env_type = self.entorno_activo
                 python_executable = self.tab_console.current_python
                 
-                # Ejecutar pip freeze y capturar resultado
-                result = subprocess.run([python_executable, '-m', 'pip', 'freeze'], 
-                                      capture_output=True, text=True, timeout=30)
+                # Inventario en proceso con formato 'pip freeze' (huella tomada antes del escaneo)
+                fingerprint = get_site_fingerprint(python_executable)
+                freeze_ok, freeze_output, freeze_error = get_freeze_output(python_executable)
                 
-                if result.returncode == 0:
+                if freeze_ok:
                     # Crear reporte con información correcta del ambiente GUI
                     report_content = f"# Reporte de Dependencias pyREPORT - py-cleaner\n"
                     report_content += f"# Generado: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
                     report_content += f"# Ambiente: {env_type}\n"
                     
-                    # Obtener versión de Python
+                    # Obtener versión de Python (sonda cacheada del intérprete)
                     try:
-                        version_result = subprocess.run([python_executable, '--version'], 
-                                                      capture_output=True, text=True, timeout=10)
-                        python_version = version_result.stdout.strip() if version_result.returncode == 0 else "Desconocido"
+                        version_info = probe_interpreter(python_executable)["version_info"]
+                        python_version = "Python " + ".".join(str(n) for n in version_info)
                     except:
                         python_version = "Desconocido"
                     
@@ -2635,23 +7509,34 @@ def iniciar_gui():
                         local_venv_path = os.path.join(os.getcwd(), ".venv")
                         report_content += f"# VENV Path: {local_venv_path}\n"
                     
+                    report_content += f"# Fingerprint: {fingerprint}\n"
                     report_content += f"#\n"
-                    report_content += result.stdout
+                    report_content += freeze_output
+                    report_content += disk_usage_report_section(python_executable)
                     
                     # Escribir archivo
                     with open('pyREPORT.txt', 'w', encoding='utf-8') as report_file:
                         report_file.write(report_content)
+                    try:
+                        write_structured_report(python_executable, env_type)
+                    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+                        self.log_widget.log(f"No se pudo generar {STRUCTURED_REPORT_FILE}: {e}", "warn")
+                    snapshot_id = record_history_snapshot(python_executable)
+                    if snapshot_id is not None:
+                        self.log_widget.log(f"Instantánea @{snapshot_id} guardada en el historial", "info")
                     
-                    # Mostrar resultado en consola embebida
-                    self.tab_console.send_command_from_gui(f"{self.tab_console.current_python} -m pip freeze")
+                    # Mostrar resultado en consola embebida (sin relanzar pip freeze)
+                    self.tab_console.append_output(f"❯ {python_executable} -m pip freeze")
+                    for line in freeze_output.splitlines():
+                        self.tab_console.append_output(line)
                     
                     # Contar dependencias (excluyendo comentarios)
-                    deps_count = len([line for line in result.stdout.split('\n') if line.strip() and not line.startswith('#')])
+                    deps_count = len([line for line in freeze_output.split('\n') if line.strip() and not line.startswith('#')])
                     
                     self.log_widget.log(f"Reporte generado: pyREPORT.txt ({deps_count} dependencias, ambiente: {env_type})", "ok")
                     self.status_bar.showMessage(f"Reporte pyREPORT.txt generado correctamente - {deps_count} dependencias encontradas.", 4000)
                 else:
-                    self.log_widget.log(f"Error al generar reporte: {result.stderr}", "err")
+                    self.log_widget.log(f"Error al generar reporte: {freeze_error}", "err")
                     self.status_bar.showMessage("Error al generar reporte.", 4000)
                     
             except subprocess.TimeoutExpired:
@@ -2668,20 +7553,15 @@ def iniciar_gui():
             
             # Obtener lista de paquetes instalados
             try:
-                result = subprocess.run(
-                    [self.tab_console.current_python, '-m', 'pip', 'freeze'], 
-                    capture_output=True, 
-                    text=True,
-                    timeout=30
-                )
+                freeze_ok, freeze_output, freeze_error = get_freeze_output(self.tab_console.current_python)
                 
-                if result.returncode != 0:
-                    self.log_widget.log(f"Error al obtener lista de paquetes: {result.stderr}", "err")
+                if not freeze_ok:
+                    self.log_widget.log(f"Error al obtener lista de paquetes: {freeze_error}", "err")
                     self.status_bar.showMessage("Error al obtener lista de paquetes.", 4000)
                     QMessageBox.warning(self, "Error", "No se pudo obtener la lista de paquetes instalados.")
                     return
                 
-                packages = [line.strip() for line in result.stdout.split('\n') if line.strip()]
+                packages = [line.strip() for line in freeze_output.split('\n') if line.strip() and not line.startswith('#')]
                 
                 if not packages:
                     self.log_widget.log("No se encontraron paquetes instalados.", "warn")
@@ -2702,8 +7582,21 @@ def iniciar_gui():
                 QMessageBox.critical(self, "Error", f"Error inesperado: {e}")
                 return
             
+            # Grafo de dependencias para el análisis de impacto (se construye una sola vez)
+            try:
+                graph = get_dependency_graph(self.tab_console.current_python)
+            except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+                self.log_widget.log(f"Sin análisis de impacto: {e}", "warn")
+                graph = None
+            
+            try:
+                usage = get_disk_usage(self.tab_console.current_python)
+            except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+                self.log_widget.log(f"Sin uso de disco: {e}", "warn")
+                usage = None
+            
             # Mostrar diálogo de selección
-            dialog = PackageSelectionDialog(packages, self)
+            dialog = PackageSelectionDialog(packages, self, graph, usage)
             
             if dialog.exec() == QDialog.Accepted:
                 selected_packages = dialog.get_selected_packages()
@@ -2716,39 +7609,47 @@ def iniciar_gui():
                 self.log_widget.log(f"Iniciando desinstalación de {len(selected_packages)} paquetes seleccionados.", "warn")
                 self.status_bar.showMessage(f"Desinstalando {len(selected_packages)} paquetes...", 5000)
                 
-                # Ejecutar desinstalación
-                failed_packages = []
-                successful_packages = []
+                # Ejecutar desinstalación con el motor elegido en el diálogo
+                python_executable = self.tab_console.current_python
+                
+                in_flight = set()
                 
-                for i, package in enumerate(selected_packages, 1):
-                    try:
-                        self.log_widget.log(f"[{i}/{len(selected_packages)}] Desinstalando {package}...", "info")
-                        
-                        result = subprocess.run(
-                            [self.tab_console.current_python, '-m', 'pip', 'uninstall', '-y', package],
-                            capture_output=True,
-                            text=True,
-                            timeout=30
-                        )
-                        
-                        if result.returncode == 0:
-                            self.log_widget.log(f"✅ {package} desinstalado correctamente", "ok")
-                            successful_packages.append(package)
-                        else:
-                            error_msg = result.stderr.strip() or "Error desconocido"
-                            self.log_widget.log(f"❌ Error al desinstalar {package}: {error_msg}", "err")
-                            failed_packages.append(package)
-                            
-                    except subprocess.TimeoutExpired:
+                def on_chunk(chunk, index, total):
+                    in_flight.add(index)
+                    self.log_widget.log(f"▶️ [{index}/{total}] En curso ({len(in_flight)} activos): {', '.join(chunk)}", "info")
+                    self.status_bar.showMessage(f"Desinstalando... {len(in_flight)} trabajos en curso")
+                    QApplication.processEvents()
+                
+                def on_chunk_done(chunk, index):
+                    in_flight.discard(index)
+                    self.status_bar.showMessage(f"Desinstalando... {len(in_flight)} trabajos en curso")
+                    QApplication.processEvents()
+                
+                def on_result(package, ok, message):
+                    if ok:
+                        self.log_widget.log(f"✅ {package} desinstalado correctamente", "ok")
+                    elif message == "Timeout":
                         self.log_widget.log(f"⏰ Timeout al desinstalar {package}", "err")
-                        failed_packages.append(package)
-                    except Exception as e:
-                        self.log_widget.log(f"❌ Error inesperado al desinstalar {package}: {e}", "err")
-                        failed_packages.append(package)
+                    else:
+                        self.log_widget.log(f"❌ Error al desinstalar {package}: {message}", "err")
+                
+                stats = uninstall_packages(python_executable, selected_packages, dialog.get_backend(),
+                                           DEFAULT_UNINSTALL_CHUNK_SIZE,
+                                           on_chunk=on_chunk, on_result=on_result, on_chunk_done=on_chunk_done)
+                successful_packages = stats["successful"]
+                failed_packages = stats["failed"]
+                
+                # El entorno cambió: descartar el inventario cacheado
+                invalidate_inventory_cache(self.tab_console.current_python)
                 
                 # Mostrar resumen
                 self.log_widget.log("=" * 50, "info")
                 self.log_widget.log(f"📊 RESUMEN: Exitosos: {len(successful_packages)} | Fallidos: {len(failed_packages)}", "info")
+                self.log_widget.log(
+                    f"⏱️ {stats['elapsed']:.1f}s con {stats['pip_calls']} procesos pip "
+                    f"({stats['retried']} reintentos individuales"
+                    + (f", {stats['native']} por RECORD" if stats.get("native") else "")
+                    + f", hasta {stats['peak_workers']} en paralelo)", "info")
                 
                 if successful_packages:
                     self.log_widget.log(f"✅ Paquetes desinstalados: {', '.join(successful_packages)}", "ok")
@@ -3039,6 +7940,41 @@ def show_help():
         "Ejecuta la interfaz gráfica (GUI) con PySide6",
         "python py-cleaner.py --gui"
     )
+    commands_table.add_row(
+        "python py-cleaner.py --autoremove",
+        "Desinstala los paquetes huérfanos (--dry-run: solo vista previa, --yes: sin confirmar)",
+        "python py-cleaner.py --autoremove --dry-run"
+    )
+    commands_table.add_row(
+        "python py-cleaner.py --dedup",
+        "Enlaza archivos idénticos entre los venvs conocidos (--dry-run: solo vista previa, --yes: sin confirmar)",
+        "python py-cleaner.py --dedup --yes"
+    )
+    commands_table.add_row(
+        "python py-cleaner.py --fleet OPERACIÓN",
+        "Ejecuta report, orphans, cache-prune o verify en muchos venvs (--venvs ARCHIVO, --workers N, --dry-run, --output DIR)",
+        "python py-cleaner.py --fleet verify --venvs venvs.txt"
+    )
+    commands_table.add_row(
+        "python py-cleaner.py --prune-caches",
+        "Poda las cachés de pip, poetry, uv, pre-commit y mypy (--max-size, --max-age DÍAS, --dry-run, --yes)",
+        "python py-cleaner.py --prune-caches --max-size 5GB --max-age 30"
+    )
+    commands_table.add_row(
+        "python py-cleaner.py --diff A [B]",
+        "Compara reportes (.txt/.jsonl), 'live' o venvs; B por defecto es el entorno activo (salida 0/1/2 como diff)",
+        "python py-cleaner.py --diff pyREPORT.txt live"
+    )
+    commands_table.add_row(
+        "python py-cleaner.py --history",
+        "Historial de instantáneas del entorno (--env RUTA, --days N, --package NOMBRE, --compact)",
+        "python py-cleaner.py --history --package numpy"
+    )
+    commands_table.add_row(
+        "python py-cleaner.py SUBCOMANDO",
+        "report, list, uninstall, clean, diff o env sin menús (--python/--venv, --json; salida 0/1/2)",
+        "python py-cleaner.py list --venv .venv --json"
+    )
     commands_table.add_row(
         "python py-cleaner.py --help",
         "Muestra esta ayuda de uso y sale",
@@ -3136,6 +8072,11 @@ def show_help():
         border_style="blue"
     ))
 
+def command_line_option(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Valor que sigue a una opción de línea de comandos (p. ej. --workers 8), o `default`."""
+    args = sys.argv[1:]
+    return args[args.index(name) + 1] if name in args and args.index(name) + 1 < len(args) else default
+
 def parse_command_line_args():
     """Parsea los argumentos de línea de comandos y ejecuta acciones correspondientes."""
     args = sys.argv[1:]  # Excluir el nombre del script
@@ -3153,11 +8094,213 @@ def parse_command_line_args():
     if "--gui" in args:
         return "gui"
     
+    if "--autoremove" in args:
+        return "autoremove"
+    
+    if "--dedup" in args:
+        return "dedup"
+    
+    if "--fleet" in args:
+        return "fleet"
+    
+    if "--prune-caches" in args:
+        return "prune-caches"
+    
+    if "--diff" in args:
+        return "diff"
+    
+    if "--history" in args:
+        return "history"
+    
     # Si no hay argumentos especiales, modo CLI normal
     return "cli"
 
+# --- Subcomandos No Interactivos ---
+SUBCOMMANDS = ("report", "list", "uninstall", "clean", "diff", "env")
+
+def _subcommand_python(args) -> str:
+    """Intérprete objetivo de un subcomando: --python, --venv o el entorno detectado."""
+    if args.python:
+        if not os.path.isfile(args.python):
+            raise ValueError(f"No existe el ejecutable: {args.python}")
+        return os.path.abspath(args.python)
+    if args.venv:
+        python_executable = resolve_fleet_python(args.venv)
+        if python_executable is None:
+            raise ValueError(f"No es un entorno Python: {args.venv}")
+        return python_executable
+    env_manager.detect_environment()
+    return env_manager.get_pip_executable()
+
+def _command_report(args, python_executable: str) -> Tuple[int, dict, List[str]]:
+    packages = write_report_files(python_executable, args.label, args.output)
+    structured = os.path.splitext(args.output)[0] + ".jsonl"
+    return 0, {"python": python_executable, "report": args.output, "structured": structured, "packages": packages}, \
+        [f"{args.output}: {packages} dependencias", structured]
+
+def _command_list(args, python_executable: str) -> Tuple[int, list, List[str]]:
+    rows = get_installed_packages(python_executable)
+    return 0, [{"name": name, "version": version} for name, version in rows], [f"{name}=={version}" for name, version in rows]
+
+def _command_uninstall(args, python_executable: str) -> Tuple[int, dict, List[str]]:
+    packages = list(args.packages)
+    if args.from_report:
+        header, dependencies = read_report(args.from_report)
+        if verify_report_fingerprint(header, python_executable) is False and not args.force:
+            raise ValueError(f"{args.from_report} está desactualizado respecto al entorno (use --force o regenérelo)")
+        packages += [_requirement_name(requirement) for requirement in dependencies]
+    if not packages:
+        raise ValueError("Indique paquetes o --from-report")
+    if args.dry_run:
+        installed = {canonicalize_name(name) for name, _ in get_installed_packages(python_executable)}
+        selected = [name for name in packages if canonicalize_name(name) in installed]
+        missing = [name for name in packages if canonicalize_name(name) not in installed]
+        return 0, {"python": python_executable, "dry_run": True, "would_uninstall": selected, "not_installed": missing}, \
+            [f"se desinstalaría: {name}" for name in selected] + [f"no instalado: {name}" for name in missing]
+    stats = uninstall_packages(python_executable, packages, backend=args.backend, chunk_size=args.chunk_size)
+    invalidate_inventory_cache(python_executable)
+    payload = {"python": python_executable, "successful": stats["successful"], "failed": stats["failed"],
+               "errors": stats["errors"], "elapsed": round(stats["elapsed"], 3)}
+    lines = [f"desinstalado: {name}" for name in stats["successful"]]
+    lines += [f"fallido: {name}" + (f" ({stats['errors'][name]})" if stats["errors"].get(name) else "")
+              for name in stats["failed"]]
+    return (1 if stats["failed"] else 0), payload, lines
+
+def _command_clean(args, python_executable: str) -> Tuple[int, dict, List[str]]:
+    if args.artifacts:
+        artifacts = find_build_artifacts(args.artifacts, KeepRules.from_roots(args.artifacts))
+        total = sum(artifact["bytes"] for artifact in artifacts)
+        result = {"removed": 0, "bytes": 0, "errors": []} if args.dry_run else remove_build_artifacts(artifacts)
+        payload = {"dry_run": args.dry_run, "artifacts": [artifact["path"] for artifact in artifacts], "found_bytes": total,
+                   "removed": result["removed"], "bytes": result["bytes"], "errors": result["errors"]}
+        lines = [artifact["path"] for artifact in artifacts]
+        lines.append(f"{len(artifacts)} artefactos, {format_bytes(total)}" + (" (simulación)" if args.dry_run else ""))
+        return (1 if result["errors"] else 0), payload, lines
+    interpreter = probe_interpreter(python_executable)
+    result = clean_bytecode([interpreter["prefix"]], interpreter["cache_tag"], dry_run=args.dry_run, stale_only=args.stale)
+    payload = {"python": python_executable, "dry_run": args.dry_run, "stale_only": args.stale, "files": result["files"],
+               "dirs": result["dirs"], "bytes": result["bytes"], "errors": result["errors"]}
+    return (1 if result["errors"] else 0), payload, [
+        f"{result['files']} .pyc, {result['dirs']} __pycache__, {format_bytes(result['bytes'])}"
+        + (" (simulación)" if args.dry_run else "")]
+
+def _command_diff(args, python_executable: str) -> Tuple[int, dict, List[str]]:
+    sources = [python_executable if source == "live" else source for source in (args.old, args.new)]
+    (old_label, old_packages), (new_label, new_packages) = load_snapshot_pair(*sources)
+    diff = diff_snapshots(old_packages, new_packages)
+    kinds = ("added", "removed", "upgraded", "downgraded", "changed")
+    payload = {"old": old_label, "new": new_label, "unchanged": diff["unchanged"]}
+    payload.update({kind: [{"name": name, "old": old, "new": new} for name, old, new in diff[kind]] for kind in kinds})
+    symbols = {"added": "+", "removed": "-", "upgraded": "↑", "downgraded": "↓", "changed": "~"}
+    lines = [f"{symbols[kind]} {name} " + (f"{old} -> {new}" if old and new else old or new)
+             for kind in kinds for name, old, new in diff[kind]]
+    return (1 if any(diff[kind] for kind in kinds) else 0), payload, lines
+
+def _command_env(args, python_executable: str) -> Tuple[int, object, List[str]]:
+    if args.imports or args.metadata:
+        helper = session_helper(python_executable) or InterpreterHelper(python_executable)
+        try:
+            payload = {"python": python_executable}
+            if args.imports:
+                payload["imports"] = helper.request("imports", timeout=120, modules=args.imports)
+            if args.metadata:
+                payload["metadata"] = helper.request("inventory", names=args.metadata,
+                                                     fields=["Summary", "Requires-Dist", "License"])
+        finally:
+            if helper is not session_helper(python_executable):
+                helper.close()
+        lines = [f"import {module}: " + (result["error"] if not result["ok"] else
+                                          "ok (ya cargado al arrancar el intérprete)" if result.get("preloaded") else
+                                          f"ok ({result['seconds'] * 1000:.0f} ms" + (", proceso aparte)" if result.get("isolated") else ")"))
+                 for module, result in payload.get("imports", {}).items()]
+        lines += [f"{entry['name']}=={entry['version']}  {' '.join(entry['Summary'])}" for entry in payload.get("metadata", [])]
+        failed = any(not result["ok"] for result in payload.get("imports", {}).values())
+        return (1 if failed else 0), payload, lines
+    if args.discover:
+        environments = discover_environments(refresh=args.refresh)
+        return 0, environments, [f"{entry['path']}\t{entry['kind']}\t{entry['version'] or '?'}" for entry in environments]
+    interpreter = probe_interpreter(python_executable)
+    inventory = PackageInventory(python_executable).load()
+    payload = {"python": python_executable, "version": ".".join(str(part) for part in interpreter["version_info"]),
+               "prefix": interpreter["prefix"], "base_prefix": interpreter["base_prefix"],
+               "is_venv": os.path.normcase(interpreter["prefix"]) != os.path.normcase(interpreter["base_prefix"]),
+               "cache_tag": interpreter["cache_tag"], "packages": len(inventory.distributions),
+               "fingerprint": inventory.fingerprint}
+    return 0, payload, [f"{key}: {value}" for key, value in payload.items()]
+
+_SUBCOMMAND_HANDLERS = {"report": _command_report, "list": _command_list, "uninstall": _command_uninstall,
+                        "clean": _command_clean, "diff": _command_diff, "env": _command_env}
+
+def build_subcommand_parser():
+    """Parser de los subcomandos no interactivos (report, list, uninstall, clean, diff, env)."""
+    import argparse
+    target = argparse.ArgumentParser(add_help=False)
+    group = target.add_mutually_exclusive_group()
+    group.add_argument("--python", help="ejecutable Python objetivo")
+    group.add_argument("--venv", help="directorio del venv o entorno conda objetivo")
+    target.add_argument("--json", action="store_true", help="salida JSON en stdout")
+    
+    parser = argparse.ArgumentParser(prog="py-cleaner.py", description="Subcomandos no interactivos de py-cleaner "
+                                     "(salida 0 = correcto, 1 = fallo o diferencias, 2 = error de uso o de carga).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    report = commands.add_parser("report", parents=[target], help="genera pyREPORT.txt, pyREPORT.jsonl y la instantánea")
+    report.add_argument("--output", default="pyREPORT.txt", help="ruta del reporte de texto")
+    report.add_argument("--label", default="cli", help="valor de la cabecera 'Ambiente'")
+    commands.add_parser("list", parents=[target], help="lista los paquetes instalados")
+    uninstall = commands.add_parser("uninstall", parents=[target], help="desinstala paquetes sin confirmación")
+    uninstall.add_argument("packages", nargs="*", help="paquetes a desinstalar")
+    uninstall.add_argument("--from-report", metavar="REPORTE", help="desinstala las dependencias de un pyREPORT.txt")
+    uninstall.add_argument("--force", action="store_true", help="acepta un reporte desactualizado")
+    uninstall.add_argument("--backend", choices=UNINSTALL_BACKENDS, default="pip")
+    uninstall.add_argument("--chunk-size", type=int, default=DEFAULT_UNINSTALL_CHUNK_SIZE)
+    uninstall.add_argument("--dry-run", action="store_true")
+    clean = commands.add_parser("clean", parents=[target], help="limpia bytecode del entorno o artefactos de proyectos")
+    clean.add_argument("--stale", action="store_true", help="solo bytecode sin fuente o de otro intérprete")
+    clean.add_argument("--artifacts", nargs="+", metavar="DIR", help="limpia artefactos de compilación bajo estos proyectos")
+    clean.add_argument("--dry-run", action="store_true")
+    diff = commands.add_parser("diff", parents=[target], help="compara reportes, instantánea @N, 'live' o venvs")
+    diff.add_argument("old", nargs="?", default="pyREPORT.txt")
+    diff.add_argument("new", nargs="?", default="live")
+    env = commands.add_parser("env", parents=[target], help="describe el entorno objetivo")
+    env.add_argument("--discover", action="store_true", help="lista los entornos descubiertos")
+    env.add_argument("--refresh", action="store_true", help="vuelve a escanear en lugar de usar el índice")
+    env.add_argument("--imports", nargs="+", metavar="MÓDULO", help="comprueba que los módulos se importan en el entorno")
+    env.add_argument("--metadata", nargs="+", metavar="PAQUETE", help="metadatos de los paquetes vistos por el intérprete")
+    return parser
+
+def run_subcommand(argv: List[str]) -> int:
+    """Ejecuta un subcomando sin menús ni pausas y devuelve el código de salida.
+
+    La salida va a stdout como texto plano o JSON (--json); los errores van a stderr.
+    Ctrl+C devuelve 130 sin escribir nada en stdout.
+    """
+    args = build_subcommand_parser().parse_args(argv)
+    try:
+        python_executable = _subcommand_python(args)
+        code, payload, lines = _SUBCOMMAND_HANDLERS[args.command](args, python_executable)
+    except KeyboardInterrupt:
+        subprocess_runner.cancel_all()
+        shutdown_interpreter_helper()
+        print(f"py-cleaner {args.command}: interrumpido", file=sys.stderr)
+        return 130
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+        if args.json:
+            print(json.dumps({"error": str(e)}, ensure_ascii=False))
+        print(f"py-cleaner {args.command}: {e}", file=sys.stderr)
+        return 2
+    if args.json:
+        print(json.dumps(payload, ensure_ascii=False, indent=2))
+    elif lines:
+        print("\n".join(lines))
+    return code
+
 # --- Arranque híbrido CLI/GUI ---
 if __name__ == "__main__":
+    # Subcomandos no interactivos (cron/CI): sin banner, menús ni pausas. Se despachan antes
+    # de instalar signal_handler, que volvería al menú; Ctrl+C sale con código 130
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        sys.exit(run_subcommand(sys.argv[1:]))
+    
     # Configurar manejo de señales
     signal.signal(signal.SIGINT, signal_handler)
     
@@ -3170,6 +8313,46 @@ if __name__ == "__main__":
     elif mode == "gui":
         console.print("[bold green]🖥️ Iniciando interfaz gráfica...[/bold green]")
         iniciar_gui()
+    elif mode == "autoremove":
+        env_manager.detect_environment()
+        ok = autoremove_orphans(dry_run="--dry-run" in sys.argv, assume_yes="--yes" in sys.argv or "-y" in sys.argv)
+        sys.exit(0 if ok else 1)
+    elif mode == "diff":
+        # Mismos códigos de salida que diff(1): 0 iguales, 1 diferentes, 2 error
+        env_manager.detect_environment()
+        position = sys.argv.index("--diff")
+        operands = []
+        for argument in sys.argv[position + 1:position + 3]:
+            if argument.startswith("--"):
+                break
+            operands.append(argument)
+        operands += ["pyREPORT.txt", "live"][len(operands):]
+        differs = diff_menu(operands[0], operands[1])
+        sys.exit(2 if differs is None else int(differs))
+    elif mode == "history":
+        env_manager.detect_environment()
+        ok = history_menu(environment=command_line_option("--env"), package=command_line_option("--package"),
+                          days=command_line_option("--days", "90"), compact="--compact" in sys.argv)
+        sys.exit(0 if ok else 1)
+    elif mode == "prune-caches":
+        ok = prune_tool_caches_menu(max_size=command_line_option("--max-size"), max_age=command_line_option("--max-age"),
+                                    dry_run="--dry-run" in sys.argv, assume_yes="--yes" in sys.argv or "-y" in sys.argv)
+        sys.exit(0 if ok else 1)
+    elif mode == "fleet":
+        args = sys.argv[1:]
+        operation = command_line_option("--fleet", "verify")
+        if operation not in FLEET_OPERATIONS:
+            console.print(f"[bold red]❌ Operación de flota desconocida: {operation} (use {', '.join(FLEET_OPERATIONS)})[/bold red]")
+            sys.exit(2)
+        venvs_file = command_line_option("--venvs")
+        targets = load_fleet_file(venvs_file) if venvs_file else [environment["path"] for environment in discover_environments()]
+        options = {"dry_run": "--dry-run" in args, "output": command_line_option("--output", "fleet-reports")}
+        ok = run_fleet_cli(operation, targets, options, int(command_line_option("--workers", str(FLEET_WORKERS))))
+        sys.exit(0 if ok else 1)
+    elif mode == "dedup":
+        env_manager.detect_environment()
+        ok = dedupe_environments_menu(dry_run="--dry-run" in sys.argv, assume_yes="--yes" in sys.argv or "-y" in sys.argv)
+        sys.exit(0 if ok else 1)
     else:
         # Verificar si Rich está disponible para CLI moderno
         try: